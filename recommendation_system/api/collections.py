@@ -1,7 +1,11 @@
 """
 Collection API endpoints with CSV adapter.
+The games of each collection are held in a separate, append-only collection_games table
+(see utilities/association.py), so adding or removing a game appends a single row, and only the
+rows of the collection changed are selected to check its games.
 Supported calls:
 """
+from .utilities import association
 from .config import *
 
 
@@ -73,17 +77,21 @@ def collections_usage(parsed_args):
     if parsed_args.verb == "GET":
         df = get_collections(parsed_args.id, parsed_args.user_id)
     if parsed_args.verb == "PATCH":
-        df = get_collections()
+        df = get_collections(parsed_args.id)
         df = add_game_to_collection(df, parsed_args.id, parsed_args.game_id)
     if parsed_args.verb == "DELETE":
-        df = get_collections()
         if parsed_args.id and parsed_args.game_id:
+            df = get_collections(parsed_args.id)
             df = remove_game_from_collection(
                     df,
                     parsed_args.id,
                     parsed_args.game_id
                 )
         elif parsed_args.id:
+            # only the collections of the deleted collection's owner are read and returned
+            df = get_collections(parsed_args.id)
+            if len(df) > 0:
+                df = get_collections(user_id=df["user_id"].iloc[0])
             df = delete_collection(df, parsed_args.id)
 
     return df
@@ -97,15 +105,48 @@ def get_collections(collection_id=None, user_id=None):
     :param user_id: (str) Optional user id to return information on a single user's collections.
     :return: (pd.DataFrame)
     """
-    df = validate_data_store(collection_file, collection_terms)
+    # collections are selected on int32 codes of ids, so only those selected are decoded
+    codes = ["collection_id", "user_id"]
     if collection_id is not None:
-        df = df.loc[df['collection_id'] == collection_id]
+        df = select_data_store(collection_file, collection_terms, "collection_id", collection_id, codes=codes)
     elif user_id is not None:
-        df = df.loc[df['user_id'] == user_id]
+        df = select_data_store(collection_file, collection_terms, "user_id", user_id, codes=codes)
+    else:
+        df = validate_data_store(collection_file, collection_terms, codes=codes)
+    df = decode_ids(df, codes)
 
+    # game ids are joined back into a single string per collection for display, selecting only
+    # the games of the collections returned unless every collection is
+    if collection_id is None and user_id is None:
+        index = get_collection_game_index()
+        indexes = [index] * len(df)
+    else:
+        indexes = [get_collection_membership(collection) for collection in df["collection_id"]]
+    df["game_ids"] = [
+        ", ".join(index.by_left.get(collection, {}))
+        for collection, index in zip(df["collection_id"], indexes)
+    ]
+    df["row_updated_time_utc"] = [
+        max(updated, index.updated.get(collection, updated))
+        for collection, updated, index in zip(
+            df["collection_id"], df["row_updated_time_utc"].astype(str), indexes
+        )
+    ]
     return df
 
 
+def get_collection_games(collection_id=None, game_id=None):
+    """
+    Return the current games of each collection, one row per game within a collection.
+    :param collection_id: (str) Optional collection id to return the games of a single collection.
+    :param game_id: (str) Optional game id to return the collections of a single game.
+    :return: (pd.DataFrame) collection_id, game_id and added_at
+    """
+    if collection_id is not None:
+        return association.current(get_collection_membership(collection_id), collection_id)
+    return association.current(get_collection_game_index(), collection_id, game_id)
+
+
 def add_game_to_collection(input_df, collection_id, game_id):
     """
     adds an existing game to an existing collection_id.
@@ -114,28 +155,25 @@ def add_game_to_collection(input_df, collection_id, game_id):
         :param game_id: (str) game_id of the game that will be added to the collection.
         :return: None
     """
-    game_ids = input_df.loc[input_df.collection_id == collection_id, 'game_ids']
-    # check if game already exists in collection, if so no need to add it again.
-    games_array = game_ids.values[0].replace(" ", "").split(",")
-    if game_id in games_array:
-        print("Game with game_id: %s already exists"% game_id
-            + " in this collection (collection_id: %s)"% collection_id)
+    if collection_id not in input_df.collection_id.values:
+        print("Collection with collection_id: %s does not exist"% collection_id)
         return
+    # the membership check and append hold the lock, so a concurrent change is never lost
+    with lock_data_store(collection_game_file):
+        # check if game already exists in collection, if so no need to add it again.
+        if association.is_member(get_collection_membership(collection_id), collection_id, game_id):
+            print("Game with game_id: %s already exists"% game_id
+                + " in this collection (collection_id: %s)"% collection_id)
+            return
 
-    input_df.loc[input_df.collection_id == collection_id, 'game_ids'] = game_ids + ", " + game_id
-    # TODO currently the whole collection_df is rewritten
-    # to make it easier to change game_ids string arrays,
-    # this should be changed to a more scalable approach
-    # once database tables are used
-    input_df.to_csv(
-          collection_file,
-          mode='w',
-          index=False,
-          header=True
-    )
+        write_collection_games(
+            [collection_id],
+            [game_id],
+            added_at=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        )
     print("game with game_id: %s was successfully added"% game_id
         + " to collection with collection_id: %s"% collection_id)
-    return input_df.loc[input_df.collection_id == collection_id]
+    return get_collections(collection_id)
 
 
 def remove_game_from_collection(input_df, collection_id, game_id):
@@ -146,30 +184,20 @@ def remove_game_from_collection(input_df, collection_id, game_id):
         :param game_id: (str) game_id of the game that will be removed from the collection.
         :return: None
     """
-    collections_df = input_df
+    with lock_data_store(collection_game_file):
+        if not association.is_member(get_collection_membership(collection_id), collection_id, game_id):
+            print("Game with game_id: %s does not exists"% game_id
+                + " in this collection (collection_id: %s)"% collection_id)
+            return
 
-    game_ids = collections_df.loc[collections_df.collection_id == collection_id, 'game_ids']
-    games_array = game_ids.values[0].replace(" ", "").split(",")
-    if game_id not in games_array:
-        print("Game with game_id: %s does not exists"% game_id
-            + " in this collection (collection_id: %s)"% collection_id)
-        return
-    games_array.remove(game_id)
-    collections_df.loc[collections_df.collection_id == collection_id,'game_ids'
-        ] = ', '.join(games_array)
-    # TODO currently the whole collection_df is rewritten
-    # to make it easier to change game_ids string arrays,
-    # this should be changed to a more scalable approach
-    # once database tables are used
-    collections_df.to_csv(
-          collection_file,
-          mode='w',
-          index=False,
-          header=True
-    )
+        write_collection_games(
+            [collection_id],
+            [game_id],
+            removed_at=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        )
     print("game with game_id: %s was successfully removed" % game_id
     + " from collection with collection_id: %s"%collection_id)
-    return collections_df.loc[collections_df.collection_id == collection_id]
+    return get_collections(collection_id)
 
 
 def delete_collection(input_df, collection_id):
@@ -179,26 +207,125 @@ def delete_collection(input_df, collection_id):
         :param collection_id: (str) collection_id of the collection that will be removed.
         :return: None.
     """
-    collections_df = input_df
+    collections_df = input_df.drop(columns=["game_ids"], errors="ignore")
 
     row_index = collections_df[collections_df.collection_id == collection_id].index
     collections_df = collections_df.drop(row_index)
 
-    # TODO currently the whole collection_df is rewritten
-    # to make it easier to change game_ids string arrays,
-    # this should be changed to a more scalable approach
-    # once database tables are used
-    collections_df.to_csv(
-        collection_file,
-        mode='w',
-        index = False,
-        header=True
-    )
+    with lock_data_store(collection_file), lock_data_store(collection_game_file):
+        delete_data_store(collection_file, "collection_id", [collection_id])
+        game_ids = list(get_collection_membership(collection_id).by_left.get(collection_id, {}))
+        if game_ids:
+            write_collection_games(
+                [collection_id] * len(game_ids),
+                game_ids,
+                removed_at=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+            )
     print("collection with collection_id: %s was successfully deleted"%(collection_id))
     return collections_df
 
 
-# GAME DATA STORE
+def get_collection_game_index():
+    """
+    Return the index of current collection games on both collection_id and game_id.
+    The index is cached until collection_games changes, so must not be modified by the caller.
+    :return: (association.AssociationIndex)
+    """
+    return cached_derivation(
+        "collection_game_index",
+        [collection_game_file],
+        lambda: association.build_index(
+            validate_data_store(collection_game_file, collection_game_terms),
+            collection_game_keys
+        )
+    )
+
+
+def get_collection_membership(collection_id):
+    """
+    Return the index of the current games of a single collection, or a list of collections, built
+    from only their own rows of collection_games (see select_data_store), so other collections are
+    never read by indexed backends, nor copied by others.
+    :param collection_id: (str) collection id, or (list) collection ids, to index the games of
+    :return: (association.AssociationIndex)
+    """
+    return association.build_index(
+        select_data_store(collection_game_file, collection_game_terms, "collection_id", collection_id),
+        collection_game_keys
+    )
+
+
+def write_collection_games(collection_ids, game_ids, added_at=None, removed_at=None):
+    """
+    Append games added to or removed from collections to collection_games,
+    keeping an index already cached in step rather than rebuilding it. The index is read and
+    updated while holding the lock of collection_games, so it cannot miss another process's changes.
+    :param collection_ids: (str list) collection_id of each change
+    :param game_ids: (str list) game_id of each change
+    :param added_at: optional (str) time the games were added
+    :param removed_at: optional (str) time the games were removed
+    :return: (pd.DataFrame) appended rows
+    """
+    rows_df = pd.DataFrame({
+        "collection_id": collection_ids,
+        "game_id": game_ids,
+        "added_at": added_at,
+        "removed_at": removed_at
+    }, columns=collection_game_terms)
+    with lock_data_store(collection_game_file):
+        index = peek_derivation("collection_game_index", [collection_game_file])
+        write_data_store(rows_df, collection_game_file, mode='a')
+        if index is not None:
+            update_derivation(
+                "collection_game_index",
+                [collection_game_file],
+                association.apply(index, rows_df)
+            )
+    return rows_df
+
+
+def migrate_collection_games():
+    """
+    One-off migration of collection games from the comma-joined game_ids column of collections
+    (the original format, still used by the sample data) into the collection_games table.
+    Run once as the data store is initialised, as the test is whether collection_games exists,
+    without reading either table.
+    :return: (bool) True if a migration was required
+    """
+    if data_store_exists(collection_game_file):
+        return False
+
+    with lock_data_store(collection_file), lock_data_store(collection_game_file):
+        # another process may have migrated while waiting for the locks
+        if data_store_exists(collection_game_file):
+            return False
+        collections_df = validate_data_store(collection_file, [])
+        if "game_ids" in collections_df.columns:
+            collected = collections_df.assign(
+                game_id=collections_df["game_ids"].fillna("").astype(str).str.split(",")
+            ).explode("game_id")
+            collected["game_id"] = collected["game_id"].str.strip()
+            collected = collected.loc[collected["game_id"] != ""]
+        else:
+            collected = pd.DataFrame(columns=["collection_id", "game_id", "row_updated_time_utc"])
+        rows_df = pd.DataFrame({
+            "collection_id": collected["collection_id"].to_numpy(),
+            "game_id": collected["game_id"].to_numpy(),
+            "added_at": collected["row_updated_time_utc"].to_numpy(),
+            "removed_at": None
+        }, columns=collection_game_terms)
+        # collections are rewritten last, so if interrupted the game_ids column is left behind,
+        # where it is ignored, rather than lost before collection_games is written
+        write_data_store(rows_df, collection_game_file, mode='w')
+        write_data_store(
+            collections_df.drop(columns=["game_ids"], errors="ignore"),
+            collection_file,
+            mode='w'
+        )
+    return True
+
+
+# COLLECTION DATA STORE
 collection_file = os.path.join(
     os.path.abspath(os.path.dirname(__file__)),
     API_DATA_STORE + COLLECTION_DATA
@@ -207,7 +334,20 @@ collection_file = os.path.join(
 collection_terms = [
     "collection_id",
     "user_id",
-    "game_ids"
+    "row_updated_time_utc"
+]
+# COLLECTION GAMES DATA STORE
+collection_game_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    API_DATA_STORE + COLLECTION_GAME_DATA
+)
+# required columns
+collection_game_keys = ASSOCIATION_DATA_KEYS[COLLECTION_GAME_DATA]
+collection_game_terms = [
+    "collection_id",
+    "game_id",
+    "added_at",
+    "removed_at"
 ]
 
 
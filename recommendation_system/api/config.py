@@ -4,7 +4,10 @@ Config Values and common imports.
 from datetime import datetime
 import errno
 import os
+import time
+import numpy as np
 import pandas as pd
+from .utilities import association, cache, encoding, lock, oplog, sequence, storage
 
 # HTTP / RESTful VERBS
 REST_GET = "GET"        # Read
@@ -25,11 +28,15 @@ GAME_OBJECT = "GAMES"
 USER_OBJECT = "USERS"
 COLLECTION_OBJECT = "COLLECTIONS"
 RECOMMENDATIONS_OBJECT = "RECOMMENDATIONS"
+REVIEW_OBJECT = "REVIEWS"
+DATA_STORE_OBJECT = "DATA_STORE"
 VALID_OBJECTS_TO_FETCH = [
     GAME_OBJECT,
     USER_OBJECT,
     COLLECTION_OBJECT,
-    RECOMMENDATIONS_OBJECT
+    RECOMMENDATIONS_OBJECT,
+    REVIEW_OBJECT,
+    DATA_STORE_OBJECT
 ]
 
 # DATA STORE
@@ -47,30 +54,784 @@ REQUIRED_DATA_FILES = [
     REVIEW_DATA,
     USER_DATA
 ]
+# collection membership, one row per game added to or removed from a collection,
+# migrated from the game_ids column of COLLECTION_DATA as the data store is initialised
+COLLECTION_GAME_DATA = "collection_games.csv"
+# derived from REVIEW_DATA, rebuilt on demand
+REVIEW_AGGREGATE_DATA = "review_aggregates.csv"
+# derived from REVIEW_DATA per reviewer, rebuilt on demand
+USER_AGGREGATE_DATA = "user_aggregates.csv"
+# derived from REVIEW_DATA, a binary user x game matrix of a review score (see
+# utilities/sparse.py) named by the score or its weighting, rebuilt on demand
+RATING_MATRIX_DATA = "rating_matrix_{}.npz"
+# derived from REVIEW_DATA, latent factors of every user and game of a review score (see
+# utilities/factorisation.py), retrained from the last model on demand
+FACTOR_MODEL_DATA = "factor_model_{}.npz"
+# latent factors per user and game, and the regularisation of their size
+ALS_FACTORS = 16
+ALS_REGULARISATION = 0.1
+# training iterations of a new model, and of a model warm started from the last model
+ALS_ITERATIONS = 15
+ALS_WARM_ITERATIONS = 3
+# derived from REVIEW_DATA and COLLECTION_DATA, rebuilt on demand
+GAME_NEIGHBOUR_DATA = "game_neighbours.csv"
+# number of most similar games kept per game
+GAME_NEIGHBOURS = 20
+# registered ids of each encoded id column in the order first seen, whose positions are their
+# int32 codes (see encode_ids), appended to whenever an id is first written to one of the
+# REGISTERED_ID_DATA tables. Ids are never registered by reads.
+ID_CODE_DATA = "id_codes.csv"
+REGISTERED_ID_DATA = [COLLECTION_DATA, COLLECTION_GAME_DATA, GAME_DATA, REVIEW_DATA, USER_DATA]
+# codes of ids read but not registered are held by a single process, from this code up, so they
+# never collide with registered codes
+LOCAL_ID_CODE_START = 2 ** 30
+# id columns which can be encoded, mapped to the column whose ids they hold
+ENCODED_ID_COLUMNS = {
+    "user_id": "user_id",
+    "game_id": "game_id",
+    "collection_id": "collection_id",
+    "neighbour_id": "game_id"
+}
 
+# STORAGE BACKEND
+# tables are read and written through the backend selected here (see utilities/storage.py),
+# which can be overridden by the DATA_STORE_BACKEND environment variable.
+CSV_BACKEND = "CSV"
+NPY_BACKEND = "NPY"
+SQLITE_BACKEND = "SQLITE"
+VALID_BACKENDS = [CSV_BACKEND, NPY_BACKEND, SQLITE_BACKEND]
+DATA_STORE_BACKEND = os.environ.get("DATA_STORE_BACKEND", CSV_BACKEND).upper()
 
-def validate_data_store(file, terms):
+# OPERATION LOG
+# inserts to and deletes from these tables are appended to an operation log alongside the
+# table (see utilities/oplog.py) rather than rewriting it, mapped to their unique key column.
+# Indexed backends (see storage.INDEXED_BACKENDS) insert and delete rows in place instead.
+LOGGED_DATA_KEYS = {
+    COLLECTION_DATA: "collection_id",
+    COLLECTION_GAME_DATA: None,
+    REVIEW_DATA: "review_id",
+    USER_DATA: "user_id",
+    ID_CODE_DATA: None
+}
+# association tables (see utilities/association.py) mapped to their pair of key columns. Rows
+# superseded by later changes, e.g. games since removed from a collection, are dropped when compacted.
+ASSOCIATION_DATA_KEYS = {
+    COLLECTION_GAME_DATA: ("collection_id", "game_id")
+}
+# a table's log is compacted into a new snapshot of the table once it grows beyond this size
+OPLOG_COMPACT_BYTES = 1024 * 1024
+
+# writes held in memory while deferred (see defer_writes), None when not deferring
+_deferred = None
+# encodings of ids read by this process but not registered when first read (see encode_ids)
+_local_id_encodings = {}
+
+# STREAMED READS
+# rows per chunk of tables read in chunks (see stream_data_store)
+STREAM_CHUNK_ROWS = 100000
+# worker processes a table is read by in parallel (see map_data_store)
+PARALLEL_WORKERS = int(os.environ.get("PARALLEL_WORKERS", os.cpu_count() or 1))
+# tables are split into shards of at least this size, as smaller shards are read faster by a
+# single process than by starting workers
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+# tables smaller than this are processed whole rather than in chunks (see map_data_store), as a
+# table read at once is parsed faster, and is served from the table cache once read
+STREAM_MIN_BYTES = 64 * 1024 * 1024
+
+# TABLE CACHE
+# parsed tables are kept in memory until their file changes, up to this many bytes in total
+TABLE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+cache.resize(TABLE_CACHE_MAX_BYTES)
+
+
+def validate_data_store(file, terms, columns=None, dtypes=None, codes=None):
     """
-    Utility function to ensure csv data is accessible and can be read into a panda's DataFrame
-    :param file: (str) file location to read as csv data
+    Utility function to ensure table data is accessible and can be read into a panda's DataFrame
+    :param file: (str) csv file location of the table to read from the configured backend
     :param terms: (str list) list of column names required in given file
+    :param columns: optional (str list) list of column names to read, all columns if None.
+    Columns not required by the caller are then never parsed.
+    :param dtypes: optional (dict) column name to dtype of columns which are not to be inferred,
+    e.g. "category" for repeated strings or "int8" for scores. Columns not read are ignored.
+    :param codes: optional (str list) id columns to read as int32 codes rather than ids (see
+    encode_ids), for joins and masks on integers. Ids are decoded again with decode_ids, and
+    reading never registers ids.
+    Tables are parsed once and served from cache until their file changes, so the returned
+    DataFrame is a copy which the caller is free to modify.
     :return: df: (pd.DataFrame)
     :raises FileNotFoundError: if given file is not accessible
-    :raises ValueError: if given file cannot be read as csv data into panda's DataFrame
+    :raises ValueError: if given file cannot be read as table data into panda's DataFrame
+    """
+    return _cached_data_store(file, terms, columns, dtypes, codes).copy()
+
+
+def stream_data_store(file, terms, columns=None, dtypes=None, chunk_rows=None):
+    """
+    Utility function to read a table in chunks of rows, e.g. to aggregate a table larger than
+    memory, holding a single chunk at a time. Chunks are read from the configured backend with
+    logged operations and deferred writes applied, rather than from the table cache.
+    :param file: (str) csv file location of the table to read from the configured backend
+    :param terms: (str list) list of column names required in given file
+    :param columns: optional (str list) list of column names to read, all columns if None
+    :param dtypes: optional (dict) column name to dtype of columns which are not to be inferred.
+    Categories are converted per chunk, so chunks may hold different categories.
+    :param chunk_rows: optional (int) rows per chunk, STREAM_CHUNK_ROWS if None
+    :return: (generator) of pd.DataFrame chunks, in table order
+    :raises FileNotFoundError: if given file is not accessible
+    :raises ValueError: if given file cannot be read as table data into panda's DataFrame
+    """
+    if not data_store_exists(file):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file)
+    chunk_rows = STREAM_CHUNK_ROWS if chunk_rows is None else chunk_rows
+    if columns is not None:
+        terms = [term for term in terms if term in columns]
+
+    if _deferred is not None and file in _deferred["tables"]:
+        # a deferred table is already held in memory
+        df = _read_data_store(file, columns, dtypes)
+        chunks = (df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows))
+    else:
+        key = _table_key(file)
+        operations = oplog.read(file, DATA_STORE_BACKEND)[0] if _logged(file) else []
+        operations = operations + ([] if _deferred is None else _deferred["operations"].get(file, []))
+        read_columns = _read_columns(columns, operations, key)
+        chunks = oplog.replay_chunks(
+            storage.read_chunks(file, read_columns, DATA_STORE_BACKEND, dtypes, chunk_rows),
+            operations,
+            key
+        )
+    return _stream(chunks, terms, columns, dtypes)
+
+
+def map_data_store(file, terms, mapper, columns=None, dtypes=None, workers=None, chunk_rows=None):
+    """
+    Utility function to process a table in parallel, e.g. to aggregate a large table on every core.
+    Tables of a sharded backend (see storage.SHARDED_BACKENDS) are split into a shard per worker,
+    which a worker process reads in chunks with logged deletes applied and passes to mapper.
+    Rows inserted by the log are passed to mapper in a last shard of their own. Other tables, and
+    tables too small to split, are read as a single shard: whole if smaller than STREAM_MIN_BYTES
+    (see validate_data_store), otherwise in chunks (see stream_data_store).
+    :param file: (str) csv file location of the table to read from the configured backend
+    :param terms: (str list) list of column names required in given file
+    :param mapper: (function) of an iterable of pd.DataFrame chunks, returning a partial result
+    which can be combined with those of other shards. Must be defined at module level, so it can
+    be sent to worker processes.
+    :param columns: optional (str list) list of column names to read, all columns if None
+    :param dtypes: optional (dict) column name to dtype of columns which are not to be inferred
+    :param workers: optional (int) number of worker processes, PARALLEL_WORKERS if None
+    :param chunk_rows: optional (int) rows per chunk, STREAM_CHUNK_ROWS if None
+    :return: (list) result of mapper for each shard, in table order
+    :raises FileNotFoundError: if given file is not accessible
+    :raises ValueError: if given file cannot be read as table data into panda's DataFrame
+    :raises TypeError: if workers is not a positive int
+    """
+    workers = PARALLEL_WORKERS if workers is None else workers
+    if type(workers) != int or workers < 1:
+        raise TypeError("workers must be a positive int")
+    if not data_store_exists(file):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file)
+    chunk_rows = STREAM_CHUNK_ROWS if chunk_rows is None else chunk_rows
+    deferred_table = _deferred is not None and file in _deferred["tables"]
+    if deferred_table or _table_bytes(file) < STREAM_MIN_BYTES:
+        # a deferred table is already held in memory
+        return [mapper([validate_data_store(file, terms, columns, dtypes)])]
+    if workers == 1 or DATA_STORE_BACKEND not in storage.SHARDED_BACKENDS:
+        return [mapper(stream_data_store(file, terms, columns, dtypes, chunk_rows))]
+    shards = storage.shards(file, workers, DATA_STORE_BACKEND, PARALLEL_MIN_BYTES)
+    if len(shards) == 1:
+        return [mapper(stream_data_store(file, terms, columns, dtypes, chunk_rows))]
+
+    key = _table_key(file)
+    operations = oplog.read(file, DATA_STORE_BACKEND)[0] if _logged(file) else []
+    operations = operations + ([] if _deferred is None else _deferred["operations"].get(file, []))
+    if columns is not None:
+        terms = [term for term in terms if term in columns]
+    # imported once first used, so as not to slow the start up of every command
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(len(shards)) as executor:
+        futures = [
+            executor.submit(
+                _map_shard,
+                file, shard, terms, columns, dtypes, chunk_rows, operations, key, mapper
+            )
+            for shard in shards
+        ]
+        results = [future.result() for future in futures]
+    # inserts are applied once every shard is read, as they depend on the whole snapshot
+    inserted_df = oplog.inserted_rows(
+        [existing_df for _, existing in results for existing_df in existing], operations, key
+    )
+    results = [result for result, _ in results]
+    if inserted_df is not None and len(inserted_df) > 0:
+        results.append(mapper(_stream([inserted_df], terms, columns, dtypes)))
+    return results
+
+
+def select_data_store(file, terms, column, value, columns=None, dtypes=None, codes=None):
+    """
+    Utility function to look up the rows of a table holding a given value, e.g. a single id.
+    Indexed backends (see storage.INDEXED_BACKENDS) select the rows by index without reading
+    the table, otherwise they are looked up in the cached table (see validate_data_store) by an
+    index of its rows on column, built once and cached alongside it, so only the rows selected
+    are copied.
+    :param file: (str) csv file location of the table to select from
+    :param terms: (str list) list of column names required in given file
+    :param column: (str) column to match rows on
+    :param value: (*) value of column to select rows of, or a list of values to select the rows
+    of any, in table order
+    :param columns: optional (str list) list of column names to read, all columns if None
+    :param dtypes: optional (dict) column name to dtype of columns which are not to be inferred
+    :param codes: optional (str list) id columns to return as int32 codes (see encode_ids)
+    :return: df: (pd.DataFrame)
+    :raises FileNotFoundError: if given file is not accessible
+    :raises ValueError: if given file cannot be read as table data into panda's DataFrame
+    """
+    values = list(value) if isinstance(value, list) else [value]
+    if not data_store_queryable(file):
+        df = _cached_data_store(file, terms, columns, dtypes, codes)
+        if column in (codes or []):
+            values = [encode_id(column, value) for value in values]
+        rows = cache.get(
+            _data_store_key(file, columns, dtypes, codes) + (column,),
+            data_store_signature(file),
+            lambda: df.groupby(column, observed=True, sort=False).indices
+        )
+        positions = [rows[value] for value in dict.fromkeys(values) if value in rows]
+        return df.iloc[np.sort(np.concatenate(positions)) if positions else []]
+
+    if not data_store_exists(file):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file)
+    df = storage.select(file, column, values, columns, DATA_STORE_BACKEND, dtypes)
+    if columns is not None:
+        terms = [term for term in terms if term in columns]
+    if not set(terms).issubset(df.columns):
+        raise ValueError("Invalid Data Store. Missing Columns: {}".format(", ".join(terms)))
+    return encode_ids(df, codes or [])
+
+
+def query_data_store(file, statement, parameters=()):
+    """
+    Utility function to run a SQL query against a table of an indexed backend (see
+    storage.INDEXED_BACKENDS), e.g. to aggregate a table within the backend rather than reading it.
+    :param file: (str) csv file location of the table, named {table} within the statement
+    :param statement: (str) SQL select statement
+    :param parameters: optional (tuple) values of ? placeholders within the statement
+    :return: (pd.DataFrame) result of the query
+    :raises FileNotFoundError: if given file is not accessible
+    :raises ValueError: if the configured backend does not support queries, or the query fails
+    """
+    return storage.query(file, statement, parameters, DATA_STORE_BACKEND)
+
+
+def data_store_queryable(file):
+    """
+    Utility function to test if a table can be queried in place, by select_data_store and
+    query_data_store, which requires an indexed backend and no deferred writes to the table.
+    :param file: (str) csv file location of the table
+    :return: (bool)
+    """
+    # deferred writes are only seen by reads of the whole table
+    return DATA_STORE_BACKEND in storage.INDEXED_BACKENDS and (
+        _deferred is None or (file not in _deferred["tables"] and file not in _deferred["operations"])
+    )
+
+
+def write_data_store(input_df, file, mode="w"):
+    """
+    Utility function to write a panda's DataFrame to a table of the configured backend
+    Rows appended to a logged table (see LOGGED_DATA_KEYS) are written to its operation log, and
+    ids written to a REGISTERED_ID_DATA table of the data store are registered (see encode_ids).
+    Writes hold the table's lock (see lock_data_store), so they are never interleaved with
+    another process's writes or compaction of the table.
+    :param input_df: (pd.DataFrame) rows to write
+    :param file: (str) csv file location of the table to write
+    :param mode: optional (str) "w" to replace the table, or "a" to append rows to it
+    :return: None
+    """
+    if _registers_ids(file):
+        # ids are registered as they are written, so they are given the same code by every process
+        _register_ids(input_df)
+    if _deferred is not None:
+        _defer_write(input_df, file, mode)
+        return
+    with lock_data_store(file):
+        if mode == "a" and _logged(file):
+            _log_written(file, oplog.insert(file, input_df, DATA_STORE_BACKEND))
+            return
+        storage.write(input_df, file, mode, DATA_STORE_BACKEND)
+        if mode == "w" and _logged(file):
+            # the replaced table already holds the result of every logged operation
+            oplog.truncate(file, None, DATA_STORE_BACKEND)
+    # signatures would also change, though not always within the file system's mtime resolution
+    cache.invalidate(file)
+
+
+def delete_data_store(file, column, values):
+    """
+    Utility function to delete rows from a table of the configured backend.
+    Deletes from a logged table (see LOGGED_DATA_KEYS) are written to its operation log,
+    otherwise rows are deleted in place by indexed backends, or the table rewritten without them.
+    :param file: (str) csv file location of the table to delete from
+    :param column: (str) column to match rows on
+    :param values: (list) values of column to delete rows of
+    :return: None
+    """
+    if _deferred is not None and _logged(file):
+        _defer_operation(file, oplog.delete_operation(column, list(values)))
+        return
+    with lock_data_store(file):
+        if _logged(file):
+            _log_written(file, oplog.delete(file, column, list(values), DATA_STORE_BACKEND))
+            return
+        if data_store_queryable(file):
+            storage.delete(file, column, values, DATA_STORE_BACKEND)
+            cache.invalidate(file)
+            return
+        df = validate_data_store(file, [column])
+        write_data_store(df.loc[~df[column].isin(values)], file, mode="w")
+
+
+def compact_data_store(file, backend=None):
+    """
+    Utility function to compact a table's operation log into a new snapshot of the table.
+    Superseded rows of an association table (see ASSOCIATION_DATA_KEYS) are dropped from the
+    snapshot, even if nothing is logged.
+    The snapshot is replaced atomically, so a crash mid-compaction leaves the previous snapshot
+    and log in place.
+    :param file: (str) csv file location of the table to compact
+    :param backend: optional (str) storage backend of the table, DATA_STORE_BACKEND if None
+    :return: (int) number of operations compacted
+    """
+    backend = DATA_STORE_BACKEND if backend is None else backend
+    keys = ASSOCIATION_DATA_KEYS.get(os.path.basename(file))
+    # operations appended to the log while compacting would be lost when it is truncated
+    with lock_data_store(file):
+        operations, offset = oplog.read(file, backend)
+        if len(operations) == 0 and keys is None:
+            return 0
+        df = oplog.replay(storage.read(file, None, backend), operations, _table_key(file))
+        if keys is not None:
+            compacted_df = association.compact(df, keys)
+            if len(operations) == 0 and len(compacted_df) == len(df):
+                return 0
+            df = compacted_df
+        storage.write(df, file, "w", backend)
+        oplog.truncate(file, offset, backend)
+    cache.invalidate(file)
+    return len(operations)
+
+
+def defer_writes(enabled=True):
+    """
+    Utility function to start (or stop) holding writes in memory rather than writing them to the
+    data store, so that many writes to a table are coalesced into a single write by flush_writes.
+    Reads see deferred writes as if they had been written.
+    :param enabled: optional (bool) False to stop deferring, after flushing any deferred writes
+    :return: None
+    """
+    global _deferred
+    if not enabled:
+        flush_writes()
+        _deferred = None
+    elif _deferred is None:
+        _deferred = {"tables": {}, "operations": {}, "modified": {}}
+
+
+def flush_writes():
+    """
+    Utility function to write all writes deferred by defer_writes, one write per table.
+    :return: (int) number of tables written
+    """
+    if _deferred is None:
+        return 0
+    tables, operations = _deferred["tables"], _deferred["operations"]
+    _deferred.update(tables={}, operations={}, modified={})
+    # logged operations are written first, so tables derived from them are written after
+    for file in [file for file in operations if file not in tables]:
+        with lock_data_store(file):
+            _log_written(file, oplog.append(file, operations[file], DATA_STORE_BACKEND))
+    for file, table_df in tables.items():
+        with lock_data_store(file):
+            storage.write(table_df, file, "w", DATA_STORE_BACKEND)
+            if _logged(file):
+                oplog.truncate(file, None, DATA_STORE_BACKEND)
+            cache.invalidate(file)
+            if file in operations:
+                _log_written(file, oplog.append(file, operations[file], DATA_STORE_BACKEND))
+    return len(set(tables).union(operations))
+
+
+def discard_writes():
+    """
+    Utility function to drop every write deferred by defer_writes since deferring started or
+    writes were last flushed, e.g. once a batch has failed part way, so none of them is written.
+    :return: (int) number of tables whose deferred writes were dropped
+    """
+    if _deferred is None:
+        return 0
+    discarded = set(_deferred["tables"]).union(_deferred["operations"])
+    _deferred.update(tables={}, operations={}, modified={})
+    for file in discarded:
+        cache.invalidate(file)
+    if _id_code_file in discarded:
+        # codes of discarded registrations may be held by any table read since
+        cache.invalidate()
+    return len(discarded)
+
+
+def data_store_exists(file):
+    """
+    Utility function to test if a table exists in the configured backend, or a deferred write.
+    :param file: (str) csv file location of the table
+    :return: (bool)
+    """
+    return storage.exists(file, DATA_STORE_BACKEND) or (
+        _deferred is not None and file in _deferred["tables"]
+    )
+
+
+def data_store_signature(file):
+    """
+    Utility function to return a signature which changes whenever a table or its log is written
+    :param file: (str) csv file location of the table
+    :return: (tuple) signatures of the table, its operation log and any deferred writes
+    """
+    return (
+        storage.signature(file, DATA_STORE_BACKEND) if storage.exists(file, DATA_STORE_BACKEND) else None,
+        oplog.signature(file, DATA_STORE_BACKEND),
+        None if _deferred is None else _deferred["modified"].get(file)
+    )
+
+
+def cached_derivation(name, files, loader):
+    """
+    Utility function to cache a structure derived from tables (e.g. an index) until they change.
+    The cached structure itself is returned, so must not be modified by the caller.
+    :param name: (str) name of the derived structure, unique across the api
+    :param files: (str list) csv file locations of the tables it is derived from
+    :param loader: (function) no argument function returning the derived structure
+    :return: (*) derived structure
+    """
+    return cache.get(
+        tuple(files) + (name,),
+        tuple(data_store_signature(file) for file in files),
+        loader
+    )
+
+
+def peek_derivation(name, files):
+    """
+    Utility function to return a derived structure (see cached_derivation) only if it is cached
+    and the tables it is derived from are unchanged, without building it otherwise.
+    :param name: (str) name of the derived structure
+    :param files: (str list) csv file locations of the tables it is derived from
+    :return: (*) derived structure, or None if not cached
+    """
+    return cache.peek(tuple(files) + (name,), tuple(data_store_signature(file) for file in files))
+
+
+def update_derivation(name, files, value):
+    """
+    Utility function to re-cache a derived structure (see cached_derivation) after the tables it
+    is derived from were written by this process and the structure was updated to match, so
+    it is not rebuilt from scratch on next use.
+    :param name: (str) name of the derived structure
+    :param files: (str list) csv file locations of the tables it is derived from
+    :param value: (*) updated derived structure
+    :return: (*) derived structure
+    """
+    return cache.put(
+        tuple(files) + (name,),
+        tuple(data_store_signature(file) for file in files),
+        value
+    )
+
+
+def encode_ids(input_df, columns):
+    """
+    Utility function to replace id columns with their int32 codes (see utilities/encoding.py).
+    Ids registered in ID_CODE_DATA (see write_data_store) have the same code in every table and
+    process. Ids not yet registered are given codes held by this process only, from
+    LOCAL_ID_CODE_START, so encoding never writes to the data store. An id keeps the code it was
+    first given by a process, even once registered. Columns already holding codes are left as
+    they are.
+    :param input_df: (pd.DataFrame) input data
+    :param columns: (str list) id columns to encode, each within ENCODED_ID_COLUMNS
+    :return: (pd.DataFrame) copy of input_df with encoded columns
+    :raises TypeError: if a column is not within ENCODED_ID_COLUMNS
+    """
+    output_df = input_df.copy()
+    for column in columns:
+        if column not in ENCODED_ID_COLUMNS:
+            raise TypeError("{} is not an encoded id column".format(column))
+        if pd.api.types.is_integer_dtype(output_df[column]):
+            continue
+        id_column = ENCODED_ID_COLUMNS[column]
+        local, registered = _encodings(id_column)
+        unregistered = encoding.unregistered(registered, output_df[column])
+        if len(unregistered) > 0:
+            local = _local_id_encodings[id_column] = encoding.extend(local, unregistered)
+        # ids given a local code keep it, as tables already encoded by this process hold it
+        output_df[column] = encoding.encode(local, output_df[column], registered)
+    return output_df
+
+
+def decode_ids(input_df, columns):
+    """
+    Utility function to replace encoded id columns (see encode_ids) with their ids again.
+    Columns which are not encoded are left as they are.
+    :param input_df: (pd.DataFrame) input data
+    :param columns: (str list) id columns to decode, each within ENCODED_ID_COLUMNS
+    :return: (pd.DataFrame) copy of input_df with decoded columns
+    :raises TypeError: if a column is not within ENCODED_ID_COLUMNS
+    """
+    output_df = input_df.copy()
+    for column in columns:
+        if column not in ENCODED_ID_COLUMNS:
+            raise TypeError("{} is not an encoded id column".format(column))
+        if column not in output_df.columns or not pd.api.types.is_integer_dtype(output_df[column]):
+            continue
+        local, registered = _encodings(ENCODED_ID_COLUMNS[column])
+        output_df[column] = encoding.decode(local, output_df[column], registered)
+    return output_df
+
+
+def encode_id(column, value):
+    """
+    Utility function to return the int32 code of a single id, e.g. one given as an argument.
+    :param column: (str) id column, within ENCODED_ID_COLUMNS
+    :param value: (str) id
+    :return: (int) code, encoding.UNKNOWN_CODE if the id is neither registered nor has been read
+    by this process, so it matches no id, not even a null one
+    :raises TypeError: if column is not within ENCODED_ID_COLUMNS
+    """
+    if column not in ENCODED_ID_COLUMNS:
+        raise TypeError("{} is not an encoded id column".format(column))
+    local, registered = _encodings(ENCODED_ID_COLUMNS[column])
+    return int(encoding.encode(local, [value], registered)[0])
+
+
+def lock_data_store(file):
+    """
+    Utility function to hold the exclusive lock of a table across a read and the writes which
+    depend on it (e.g. a uniqueness check and an insert), so no other process changes the table
+    in between. Used as a with statement, and re-entrant within a process.
+    :param file: (str) csv file location of the table
+    :return: (contextmanager)
+    """
+    return lock.exclusive(file)
+
+
+def next_id(file, column, prefix):
+    """
+    Utility function to issue a new id for a table, e.g. "u_21", from a sequence persisted
+    alongside it (see utilities/sequence.py), so ids are issued without scanning the table and
+    never twice, even to concurrent processes. Ids are not guaranteed to be contiguous.
+    :param file: (str) csv file location of the table
+    :param column: (str) id column of the table, read once to initialise the sequence
+    :param prefix: (str) prefix of the ids, followed by the issued number
+    :return: (str) new id
+    """
+    def start():
+        # the sequence starts after the highest existing id number
+        if not data_store_exists(file):
+            return 0
+        ids = validate_data_store(file, [column], columns=[column])[column].astype(str)
+        numbers = pd.to_numeric(ids.str[len(prefix):], errors="coerce")
+        return int(numbers.max()) if numbers.notna().any() else 0
+    return prefix + str(sequence.next_value(file, start))
+
+
+def data_store_outdated(file, source_files):
+    """
+    Utility function to test if a table derived from other tables needs to be rebuilt
+    :param file: (str) csv file location of the derived table
+    :param source_files: (str list) csv file locations of the tables it is derived from
+    :return: (bool) True if file does not exist or was last written before any of source_files
+    """
+    if not data_store_exists(file):
+        return True
+    written = _modified(file)
+    return any(written < _modified(source_file) for source_file in source_files)
+
+
+def file_outdated(file, source_files):
+    """
+    Utility function to test if a file derived from tables, which is not itself a table of the
+    configured backend (e.g. a binary matrix), needs to be rebuilt
+    :param file: (str) location of the derived file
+    :param source_files: (str list) csv file locations of the tables it is derived from
+    :return: (bool) True if file does not exist or was last written before any of source_files
     """
-    # Test data store is not corrupted / inaccessible
     if not os.path.exists(file):
+        return True
+    written = os.stat(file).st_mtime_ns
+    return any(written < _modified(source_file) for source_file in source_files)
+
+
+def _read_data_store(file, columns, dtypes):
+    key = _table_key(file)
+    deferred = {} if _deferred is None else _deferred
+    if file in deferred.get("tables", {}):
+        # a deferred table replaces the table and its log
+        df = oplog.replay(deferred["tables"][file], deferred["operations"].get(file, []), key)
+        return storage.astype(df if columns is None else df[list(columns)], dtypes)
+
+    operations = oplog.read(file, DATA_STORE_BACKEND)[0] if _logged(file) else []
+    operations = operations + deferred.get("operations", {}).get(file, [])
+    if len(operations) == 0:
+        return storage.read(file, columns, DATA_STORE_BACKEND, dtypes)
+    read_columns = _read_columns(columns, operations, key)
+    df = oplog.replay(storage.read(file, read_columns, DATA_STORE_BACKEND, dtypes), operations, key)
+    # logged rows are parsed as inferred, so declared dtypes are applied after replay
+    return storage.astype(df if columns is None else df[list(columns)], dtypes)
+
+
+def _table_bytes(file):
+    # size of a table as stored, with its log
+    log = oplog.log_path(file, DATA_STORE_BACKEND)
+    return storage.size(file, DATA_STORE_BACKEND) + (os.path.getsize(log) if os.path.exists(log) else 0)
+
+
+def _read_columns(columns, operations, key):
+    # columns that logged operations match on are read along with those requested
+    if columns is None or len(operations) == 0:
+        return columns
+    return list(dict.fromkeys(list(columns) + oplog.columns(operations) + ([] if key is None else [key])))
+
+
+def _stream(chunks, terms, columns, dtypes):
+    for chunk in chunks:
+        if not set(terms).issubset(chunk.columns):
+            raise ValueError("Invalid Data Store. Missing Columns: {}".format(", ".join(terms)))
+        # logged rows are parsed as inferred, so declared dtypes are applied after replay
+        yield storage.astype(chunk if columns is None else chunk[list(columns)], dtypes)
+
+
+def _map_shard(file, shard, terms, columns, dtypes, chunk_rows, operations, key, mapper):
+    # run by a worker process, returning the snapshot rows logged inserts depend on with its result
+    existing = []
+    chunks = oplog.delete_chunks(
+        storage.read_shard(
+            file, shard, _read_columns(columns, operations, key), DATA_STORE_BACKEND, dtypes, chunk_rows
+        ),
+        operations,
+        key,
+        existing
+    )
+    return mapper(_stream(chunks, terms, columns, dtypes)), existing
+
+
+def _id_encodings():
+    def load():
+        if not data_store_exists(_id_code_file):
+            return {}
+        # ids are always strings, even where they look numeric
+        id_df = validate_data_store(_id_code_file, id_code_terms, dtypes={"id": "str"})
+        return {
+            column: encoding.build(ids)
+            for column, ids in id_df.groupby("id_column", sort=False)["id"]
+        }
+    return cached_derivation("id_encodings", [_id_code_file], load)
+
+
+def _encodings(id_column):
+    # ids read by this process before they were registered are coded by the local encoding
+    return (
+        _local_id_encodings.get(id_column, encoding.build([], LOCAL_ID_CODE_START)),
+        _id_encodings().get(id_column, encoding.build([]))
+    )
+
+
+def _registers_ids(file):
+    # only tables of the data store the registry is kept in, not e.g. copies elsewhere
+    return os.path.basename(file) in REGISTERED_ID_DATA and (
+        os.path.dirname(os.path.normpath(file)) == os.path.dirname(os.path.normpath(_id_code_file))
+    )
+
+
+def _register_ids(input_df):
+    for column in set(ENCODED_ID_COLUMNS).intersection(input_df.columns):
+        id_column = ENCODED_ID_COLUMNS[column]
+        ids = encoding.unregistered(_id_encodings().get(id_column, encoding.build([])), input_df[column])
+        if len(ids) == 0:
+            continue
+        # codes are re-read from the table rather than assigned here, so ids registered
+        # concurrently by another process are given the code that was written first
+        rows_df = pd.DataFrame({"id_column": id_column, "id": ids}, columns=id_code_terms)
+        write_data_store(rows_df, _id_code_file, mode="a" if data_store_exists(_id_code_file) else "w")
+
+
+def _defer_write(input_df, file, mode):
+    if mode == "a" and _logged(file):
+        _defer_operation(file, oplog.insert_operation(input_df))
+        return
+    if mode == "a":
+        input_df = pd.concat([validate_data_store(file, []), input_df], ignore_index=True)
+    # the table replaces any operations deferred before it
+    _deferred["tables"][file] = input_df.copy()
+    _deferred["operations"].pop(file, None)
+    _deferred["modified"][file] = time.time_ns()
+
+
+def _defer_operation(file, operation):
+    _deferred["operations"].setdefault(file, []).append(operation)
+    _deferred["modified"][file] = time.time_ns()
+
+
+def _log_written(file, log_size):
+    cache.invalidate(file)
+    if log_size > OPLOG_COMPACT_BYTES:
+        compact_data_store(file)
+
+
+def _logged(file):
+    return DATA_STORE_BACKEND not in storage.INDEXED_BACKENDS and os.path.basename(file) in LOGGED_DATA_KEYS
+
+
+def _cached_data_store(file, terms, columns, dtypes, codes):
+    # the cached table itself, which callers must copy before returning (see validate_data_store)
+    # Test data store is not corrupted / inaccessible
+    if not data_store_exists(file):
         raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file)
     # test input is readable as data frame
     try:
-        df = pd.read_csv(file)
+        df = cache.get(
+            _data_store_key(file, columns, dtypes, codes),
+            data_store_signature(file),
+            lambda: encode_ids(_read_data_store(file, columns, dtypes), codes or [])
+        )
     except ValueError as err:
         raise ValueError("Invalid Data Store: {}".format(err)) from None
     # test data_frame has required columns
+    if columns is not None:
+        terms = [term for term in terms if term in columns]
     if not set(terms).issubset(df.columns):
         raise ValueError("Invalid Data Store. Missing Columns: {}".format(", ".join(terms)))
     return df
 
+
+def _data_store_key(file, columns, dtypes, codes):
+    return (
+        file,
+        DATA_STORE_BACKEND,
+        None if columns is None else tuple(columns),
+        None if dtypes is None else tuple(sorted(dtypes.items())),
+        None if codes is None else tuple(codes)
+    )
+
+
+def _table_key(file):
+    return LOGGED_DATA_KEYS.get(os.path.basename(file))
+
+
+def _modified(file):
+    # modification times of the table and its log, or the time of a deferred write
+    signatures = data_store_signature(file)
+    written = [signature[0] for signature in signatures[:2] if signature is not None]
+    return max(written + [signatures[2] or 0])
+
+
 # For GET calls
 
 # For POST calls
@@ -94,4 +855,15 @@ AUTH_COOKIES_PATH = "../../auth_cookies.txt"
 GAME_DATA_STORE_PATH = "../../data_store/games.csv"
 COLLECTION_DATA_STORE_PATH = "../../data_store/collections.csv"
 REVIEW_DATA_STORE_PATH = "../../data_store/reviews.csv"
-USER_DATA_STORE_PATH = "../../data_store/users.csv"
\ No newline at end of file
+USER_DATA_STORE_PATH = "../../data_store/users.csv"
+
+
+# ID CODE DATA STORE
+_id_code_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    API_DATA_STORE + ID_CODE_DATA
+)
+id_code_terms = [
+    "id_column",
+    "id"
+]
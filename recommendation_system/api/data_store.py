@@ -0,0 +1,128 @@
+"""
+Data store API endpoints, for administration of the storage backend of all tables.
+Supported calls:
+    get_data_store - return the state of each table within each storage backend.
+    migrate_data_store - copy all CSV tables into a given storage backend.
+    compact_data_stores - compact the operation log of each table into a new snapshot.
+"""
+from .utilities import oplog, storage
+from .config import *
+
+
+def data_store_help(parser, verb):
+    """
+    Extend help text with options specific to data store object
+    :param parser: (ArgumentParser) the existing help object being built.
+    :param verb: (str) optional rest verb to limit scope of help given.
+    :return: parser: (ArgumentParser) with extended help arguments
+    """
+    def put():
+        parser.add_argument(
+            "--backend",
+            type=str,
+            choices=VALID_BACKENDS,
+            help="Storage backend to migrate all CSV tables to."
+        )
+        parser.add_argument(
+            "-f",
+            "--function",
+            choices={"COMPACT"},
+            type=str,
+            help="Compact the operation log of each table into a new snapshot of the table, "
+                 "instead of migrating."
+        )
+
+    if verb == "PUT":
+        put()
+
+    return parser
+
+
+def data_store_usage(parsed_args):
+    """
+    Return data specific to arguments given relating to data store object
+    :param parsed_args: the arguments given by the user after being successfully parsed.
+    :return: (*) result of given arguments
+    """
+    if parsed_args.verb == "GET":
+        df = get_data_store()
+    if parsed_args.verb == "PUT":
+        if parsed_args.function == "COMPACT":
+            df = compact_data_stores()
+        elif parsed_args.backend is not None:
+            df = migrate_data_store(parsed_args.backend)
+        else:
+            raise ValueError("Either --backend or -f COMPACT must be given")
+    return df
+
+
+# CONTROLLERS
+def get_data_store():
+    """
+    Return whether each table exists within each storage backend, which backend is in use,
+    and the number of operations logged against the table in that backend since compaction.
+    :return: (pd.DataFrame)
+    """
+    rows = []
+    for file in data_files:
+        row = {"table": os.path.basename(file)}
+        for backend in VALID_BACKENDS:
+            row[backend] = storage.exists(file, backend)
+        row["in_use"] = DATA_STORE_BACKEND
+        row["logged_operations"] = len(oplog.read(file, DATA_STORE_BACKEND)[0])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def migrate_data_store(backend, files=None):
+    """
+    One-shot migration of CSV tables into a given storage backend, replacing any existing copies.
+    The operation log of each CSV table is compacted first, otherwise the CSV files are left in place.
+    :param backend: (str) storage backend to migrate to.
+    :param files: optional (str list) csv file locations of the tables to migrate,
+    all tables with a CSV copy if None.
+    :return: (pd.DataFrame) number of rows migrated per table
+    :raises ValueError: if backend is not one of VALID_BACKENDS
+    """
+    if backend not in VALID_BACKENDS:
+        raise ValueError("backend must be one of the following: {}".format(", ".join(VALID_BACKENDS)))
+    if files is None:
+        files = [file for file in data_files if storage.exists(file, CSV_BACKEND)]
+
+    rows = []
+    for file in files:
+        compact_data_store(file, CSV_BACKEND)
+        rows.append({
+            "table": os.path.basename(file),
+            "backend": backend,
+            "rows": storage.migrate(file, backend)
+        })
+        if backend != CSV_BACKEND:
+            # operations logged against a replaced copy no longer apply
+            oplog.truncate(file, None, backend)
+        print("{} migrated to {}".format(os.path.basename(file), backend))
+    return pd.DataFrame(rows)
+
+
+def compact_data_stores():
+    """
+    Compact the operation log of each table in the configured backend into a new snapshot,
+    so reads no longer replay the log.
+    :return: (pd.DataFrame) number of operations compacted per table
+    """
+    rows = []
+    for file in data_files:
+        if storage.exists(file, DATA_STORE_BACKEND):
+            rows.append({
+                "table": os.path.basename(file),
+                "backend": DATA_STORE_BACKEND,
+                "operations": compact_data_store(file)
+            })
+    return pd.DataFrame(rows)
+
+
+# DATA STORE
+data_files = [
+    os.path.join(os.path.abspath(os.path.dirname(__file__)), API_DATA_STORE + file)
+    for file in REQUIRED_DATA_FILES + [COLLECTION_GAME_DATA, ID_CODE_DATA]
+]
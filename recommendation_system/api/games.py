@@ -2,10 +2,13 @@
 Game API endpoints with CSV adapter.
 Supported calls:
     get_games - return available game data, along with mean review score.
+    get_game_details - return the full game data of given games, e.g. once filtered and ranked.
     get_game_filters - modify return type to detail unique values within "game_type", "genre", "keywords", "mechanic"
+    get_similar_games - return the games with content most similar to a given game.
 """
-from .utilities import calculations, filter
+from .utilities import aggregates, calculations, content, filter, lsh
 from .config import *
+from .reviews import get_review_aggregates, get_review_means
 
 
 def games_help(parser, verb):
@@ -24,24 +27,26 @@ def games_help(parser, verb):
         parser.add_argument(
             "--game_type",
             type=str,
-            choices={"Board Game", "Card Game", "Role Playing Game", "Miniature War Game"},
-            help="Optional game type value to filter the information returned."
+            help="Optional game type expression to filter the information returned. "
+                 "Values: Board Game, Card Game, Role Playing Game, Miniature War Game."
         )
         parser.add_argument(
             "--genre",
             type=str,
-            choices={"Fantasy", "Other", "Horror", "War"},
-            help="Optional genre value to filter the information returned."
+            help="Optional genre expression to filter the information returned. "
+                 "Values: Fantasy, Other, Horror, War."
         )
         parser.add_argument(
             "--keywords",
             type=str,
-            help="Optional keyword value to filter the information returned."
+            help="Optional keyword expression to filter the information returned. "
+                 "Terms are combined with ',' (and), '|' (or) and '!' (not), "
+                 "e.g. \"Fantasy, !Horror | Mystery\"."
         )
         parser.add_argument(
             "--mechanic",
             type=str,
-            help="Optional mechanic value to filter the information returned."
+            help="Optional mechanic expression to filter the information returned, as --keywords."
         )
         parser.add_argument(
             "--sort_by",
@@ -52,16 +57,44 @@ def games_help(parser, verb):
         )
         parser.add_argument(
             "--weighting",
-            type=list,
+            type=float,
+            nargs=4,
             default=[0, 0, 0, 1],
-            help="Optional weighting to calculate mean average. Expects list of 4 int values."
+            help="Optional weighting to calculate mean average. Expects 4 int or float values."
+        )
+        parser.add_argument(
+            "--rank_mode",
+            type=str,
+            choices=aggregates.rank_modes,
+            default="MEAN",
+            help="Optional ranking of games. BAYESIAN and WILSON rank games with few reviews below "
+                 "those with many reviews of the same mean, by a Bayesian average or the lower "
+                 "bound of a Wilson score interval."
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            help="Optional number of games to return, in order of mean review score."
+        )
+        parser.add_argument(
+            "--offset",
+            type=int,
+            default=0,
+            help="Optional number of highest ranked games to skip, e.g. to page through games with --limit."
         )
         parser.add_argument(
             "-f",
             "--function",
-            choices={"FILTERS"},
+            choices={"FILTERS", "SIMILAR"},
             type=str,
             help="Optional function to modify return information about a specific aspect of game objects."
+                 " SIMILAR returns games with content most similar to the game given by --id."
+        )
+        parser.add_argument(
+            "--neighbours",
+            type=int,
+            default=10,
+            help="Optional number of similar games to return with the SIMILAR function."
         )
 
     if verb == "GET":
@@ -76,54 +109,101 @@ def games_usage(parsed_args):
     :param parsed_args: the arguments given by the user after being successfully parsed.
     :return: (*) result of given arguments
     """
-    if parsed_args.verb == "GET":
+    if parsed_args.verb == "GET" and parsed_args.function == "SIMILAR":
+        df = get_similar_games(parsed_args.id, parsed_args.neighbours)
+    elif parsed_args.verb == "GET":
         filter_dict = {
             "game_type": parsed_args.game_type,
             "genre": parsed_args.genre,
             "keywords": parsed_args.keywords,
             "mechanic": parsed_args.mechanic
         }
-        df = get_games(parsed_args.id, filter_dict)
+        # games are filtered and ranked on only the columns needed to do so
+        df = get_games(parsed_args.id, filter_dict, columns=game_rank_terms)
         if parsed_args.function == "FILTERS":
             df = get_game_filters(df)
         else:
-            df = post_games(df, parsed_args.sort_by, parsed_args.weighting)
+            df = post_games(
+                df,
+                parsed_args.sort_by,
+                parsed_args.weighting,
+                parsed_args.limit,
+                parsed_args.offset,
+                parsed_args.rank_mode
+            )
+            df = get_game_details(df)
+        # game ids are only decoded for output
+        df = decode_ids(df, ["game_id"])
     return df
 
 
 # CONTROLLERS
-def get_games(game_id, filter_dict):
+def get_games(game_id, filter_dict, columns=None):
     """
     Return all available game data.
     :param game_id: (str) Optional game id to return information on a single game.
     :param filter_dict: optional (dict) key-value pairs by which to filter game data store
-    :return: (pd.DataFrame)
+    :param columns: optional (str list) columns to read, which must include game_id and any
+    filtered, all columns if None.
+    :return: (pd.DataFrame) with game_id as int32 codes, decoded by decode_ids
     """
     if type(filter_dict) != dict:
         raise TypeError("filter_dict must be a dictionary with at least one key-value pair")
 
-    df = validate_data_store(game_file, game_terms)
-    # reduce game data store by filters if key-value pairs given
     filter_dict = {k: v for k, v in filter_dict.items() if v is not None}
-    if len(filter_dict) > 0:
-        df = filter.data_frame(df, filter_dict)
-
     if game_id is not None:
-        df = df.loc[df['game_id'] == game_id]
+        # a single game is looked up by id, then filtered without an index
+        df = select_data_store(
+            game_file, game_terms, "game_id", game_id, columns, game_dtypes, ["game_id"]
+        )
+        return filter.data_frame(df, filter_dict) if len(filter_dict) > 0 else df
+
+    df = validate_data_store(game_file, game_terms, columns, game_dtypes, ["game_id"])
+    # reduce game data store by filters if key-value pairs given
+    if len(filter_dict) > 0:
+        # the inverted index is built once per version of the games data store
+        index = cached_derivation(
+            "filter_index",
+            [game_file],
+            lambda: filter.build_index(
+                validate_data_store(game_file, game_terms, columns=game_terms, dtypes=game_dtypes)
+            )
+        )
+        df = filter.data_frame(df, filter_dict, index)
 
     return df
 
 
+def get_game_details(game_df):
+    """
+    Return the full game data of the games of a given data frame, in its order, selecting only
+    their rows (see select_data_store), e.g. once games are filtered and ranked on a few columns.
+    :param game_df: (pd.DataFrame) games with game_id as int32 codes, along with any columns
+    derived from them (e.g. mean), which are kept after the game data.
+    :return: (pd.DataFrame) with game_id as int32 codes, decoded by decode_ids
+    """
+    game_ids = decode_ids(game_df[["game_id"]], ["game_id"])["game_id"]
+    games = select_data_store(
+        game_file, game_terms, "game_id", list(game_ids), dtypes=game_dtypes, codes=["game_id"]
+    )
+    details = pd.merge(game_df[["game_id"]], games, on="game_id", how="left")
+    details.index = game_df.index
+    derived = [column for column in game_df.columns if column not in details.columns]
+    return pd.concat([details, game_df[derived]], axis=1)
+
+
 def get_game_filters(input_df):
     """
-    Return unique values found within game columns: "game_type", "genre", "keywords", "mechanic"
+    Return unique values found within game columns: "game_type", "genre", "keywords", "mechanic".
+    Comma separated "keywords" and "mechanic" values are split into their individual terms, as
+    these are what filters match.
     :param input_df: (pd.DataFrame) input pandas data frame to query unique terms of.
     Defaults to main game data store if None given.
     :raises ValueError: if given input_df does not contain all required game columns
     :return: (pd.DataFrame)
     """
     if input_df is None:
-        input_df = validate_data_store(game_file, game_terms)
+        input_df = validate_data_store(game_file, game_terms, columns=game_terms, dtypes=game_dtypes)
     terms = [
         "game_type",
         "genre",
@@ -133,34 +213,92 @@ def get_game_filters(input_df):
 
     unique_terms = {}
     for term in terms:
-        unique_terms[term] = list(input_df[term].unique())
+        if term in filter.multi_value_terms:
+            unique_terms[term] = sorted(content.split_terms(input_df[term]).explode().dropna().unique())
+        else:
+            unique_terms[term] = list(input_df[term].unique())
     return pd.DataFrame([unique_terms])
 
 
-def post_games(game_data, sort_by="overall_score", weighting=[0, 0, 0, 1]):
+def get_similar_games(game_id, neighbours=10):
+    """
+    Return the games with content (type, genre, keywords, mechanic, player count, play time and
+    cost) most similar to a given game, by approximate nearest neighbour search.
+    :param game_id: (str) game id to find similar games of.
+    :param neighbours: optional (int) number of similar games to return.
+    :return: (pd.DataFrame) game data with similarity, in desc. order of similarity
+    :raises ValueError: if game_id is not given or is not a valid game id
+    """
+    if game_id is None:
+        raise ValueError("--id is required to find similar games")
+    # the index is built once per version of the games data store, from content columns only
+    index = cached_derivation(
+        "content_index",
+        [game_file],
+        lambda: _content_index(
+            validate_data_store(game_file, game_terms, columns=game_content_terms, dtypes=game_dtypes)
+        )
+    )
+    matches = np.flatnonzero(index.ids == game_id)
+    if len(matches) == 0:
+        raise ValueError("Invalid game id: {}".format(game_id))
+
+    positions, similarities = lsh.query(index, index.vectors[matches[0]], neighbours + 1)
+    similar = pd.DataFrame({"game_id": index.ids[positions], "similarity": similarities})
+    similar = similar[similar["game_id"] != game_id].head(neighbours)
+    games = validate_data_store(game_file, game_terms, dtypes=game_dtypes, codes=["game_id"])
+    similar = pd.merge(encode_ids(similar, ["game_id"]), games, on="game_id", how="left")
+    return decode_ids(similar, ["game_id"])
+
+
+def _content_index(games):
+    return lsh.build(content.encode(games)[0], games["game_id"].to_numpy())
+
+
+def post_games(
+    game_data,
+    sort_by="overall_score",
+    weighting=[0, 0, 0, 1],
+    limit=None,
+    offset=0,
+    rank_mode="MEAN"
+):
     """
     Calculates mean/weighted mean and returns sorted game data by review score of given arguments.
     :param sort_by: optional (str) property to calculate mean score value for and sort results by.
     Must be either "complexity_score", "gameplay_score", "visual_score", or "overall_score"
 
-    :param weighting: optional (int list) if sort_by is "overall_score", a user supplied weighting
-    may be used to calculate a weighted average of all the properties.
+    :param weighting: optional (int/float list) if sort_by is "overall_score", a user supplied
+    weighting may be used to calculate a weighted average of all the properties.
     If no weighting is supplied, then standard arithmetic mean is calculated for "overall_score".
-    :return: sorted_games: (pd.DataFrame) game data by review score of given argument and filters.
+    :param limit: optional (int) number of games to return, all games if None.
+    :param offset: optional (int) number of highest ranked games to skip before those returned.
+    :param rank_mode: optional (str) one of aggregates.rank_modes, see calculations.game_review_mean
+    :return: sorted_games: (pd.DataFrame) game data by review score of given argument and filters,
+    with game_id as int32 codes.
     :raises TypeError: if arguments are not as expected
     """
     valid_sort_by = ["complexity_score", "gameplay_score", "visual_score", "overall_score"]
     # test arguments
     if type(sort_by) != str and sort_by not in valid_sort_by:
         raise TypeError("sort_by must be one of the following: {}".format(", ".join(valid_sort_by)))
-    if type(weighting) != list or len(weighting) != 4 or not all(type(n) is int for n in weighting):
-        raise TypeError("weighting must be a list of 4 int values")
+    if not calculations.valid_weighting(weighting):
+        raise TypeError("weighting must be a list of 4 int or float values")
 
-    games = game_data
-    reviews = validate_data_store(review_file, review_terms)
+    # games are joined to their aggregates on int32 codes of game_id rather than strings
+    games = encode_ids(game_data, ["game_id"])
+    # per-game mean scores, rather than all reviews, so ranking scales with games. Means are
+    # calculated in SQL by indexed backends, and are ranked as a single review per game.
+    # Other rank modes also need the count and sum of squares of the aggregates.
+    if rank_mode == "MEAN":
+        review_data = get_review_means(codes=["game_id"])
+    else:
+        review_data = get_review_aggregates(codes=["game_id"])
 
     # calculate mean of sort_by and return game data in descending order
-    sorted_games = calculations.game_review_mean(games, reviews, sort_by, weighting)
+    sorted_games = calculations.game_review_mean(
+        games, review_data, sort_by, weighting, limit, offset, rank_mode
+    )
     return sorted_games
 
 
@@ -176,15 +314,15 @@ game_terms = [
     "keywords",
     "mechanic"
 ]
-# REVIEW DATA STORE
-review_file = os.path.join(
-    os.path.abspath(os.path.dirname(__file__)),
-    API_DATA_STORE + REVIEW_DATA
+# columns games are filtered and ranked on, other columns are only read for the games returned
+game_rank_terms = ["game_id"] + game_terms
+# columns encoded by the content index
+game_content_terms = (
+    ["game_id"] + content.categorical_terms + content.multi_value_terms + content.numeric_terms
 )
-# required columns
-review_terms = [
-    "complexity_score",
-    "gameplay_score",
-    "visual_score",
-    "overall_score",
-]
\ No newline at end of file
+# column types, so repeated strings are held once per value; other columns are inferred
+game_dtypes = {
+    "game_type": "category",
+    "genre": "category",
+    "publisher_ID": "category"
+}
@@ -1,9 +1,21 @@
 """
 Recommendations API endpoints with CSV adapter.
 Supported calls:
-
+    get_user_user_recommendations - return games recommended from the reviews of similar users.
+    get_item_item_recommendations - return games most similar to those a user has reviewed or
+    collected, from precomputed neighbour lists.
+    get_factor_recommendations - return games recommended by a matrix factorisation model.
+    get_game_neighbours - return the neighbour lists of every game, as last built.
+    rebuild_game_neighbours - recalculate the neighbour lists of every game.
+    get_rating_matrix - return the user x game matrix of a review score, rebuilding it if out of date.
+    rebuild_rating_matrix - recalculate and persist the user x game matrix of a review score.
+    get_factor_model - return the matrix factorisation model of a review score, retraining it if
+    out of date.
+    train_factor_model - retrain and persist the matrix factorisation model of a review score.
 """
-from .utilities import calculations
+from .utilities import aggregates, factorisation, similarity, sparse
+from .collections import get_collection_games, get_collection_membership
+from .reviews import get_user_aggregates
 from .config import *
 
 
@@ -18,12 +30,81 @@ def recommendations_help(parser, verb):
         parser.add_argument(
             "--user_id",
             type=str,
+            help="User id to base recommendations on. Required unless a function is given."
+        )
+        parser.add_argument(
+            "--score",
+            type=str,
+            choices={"complexity_score", "gameplay_score", "visual_score", "overall_score"},
+            default="overall_score",
+            help="Optional review score to base recommendations on."
+        )
+        parser.add_argument(
+            "--weighting",
+            type=float,
+            nargs=4,
+            help="Optional weighting of the complexity, gameplay, visual and overall scores, "
+                 "combined in place of --score by the MATRIX function. Expects 4 int or float values."
+        )
+        parser.add_argument(
+            "--neighbours",
+            type=int,
+            default=20,
+            help="Optional number of most similar users to base USER model recommendations on."
+        )
+        parser.add_argument(
+            "--similarity",
+            type=str,
+            choices={"pearson", "cosine"},
+            default="pearson",
+            help="Optional measure of similarity between users."
+        )
+        parser.add_argument(
+            "--model",
+            type=str,
+            choices={"USER", "ITEM", "ALS"},
+            default="USER",
+            help="Optional model to recommend by: USER compares the user with similar users, "
+                 "ITEM merges the precomputed neighbours of games the user reviewed or collected, "
+                 "ALS scores every game by the latent factors of a matrix factorisation model."
+        )
+        parser.add_argument(
+            "-f",
+            "--function",
+            choices={"NEIGHBOURS", "MATRIX"},
+            type=str,
+            help="Optional function to return the precomputed neighbour lists of every game, "
+                 "or the user x game matrix of review scores (written to a .npz file by --output NPZ)."
+        )
+
+    def put():
+        parser.add_argument(
+            "-f",
+            "--function",
+            choices={"NEIGHBOURS", "MODEL"},
+            type=str,
             required=True,
-            help="User id to base recommendations on."
+            help="Rebuild the precomputed neighbour lists of every game, "
+                 "or retrain the ALS model of --score from scratch."
+        )
+        parser.add_argument(
+            "--score",
+            type=str,
+            choices={"complexity_score", "gameplay_score", "visual_score", "overall_score"},
+            default="overall_score",
+            help="Optional review score to train the ALS model on."
+        )
+        parser.add_argument(
+            "--neighbours",
+            type=int,
+            default=GAME_NEIGHBOURS,
+            help="Optional number of most similar games to keep per game."
         )
 
     if verb == "GET":
         get()
+    elif verb == "PUT":
+        put()
 
     return parser
 
@@ -35,23 +116,355 @@ def recommendations_usage(parsed_args):
     :return: (*) result of given arguments
     """
     if parsed_args.verb == "GET":
-        df = get_user_user_recommendations(parsed_args.user_id)
+        if parsed_args.function == "NEIGHBOURS":
+            df = get_game_neighbours()
+        elif parsed_args.function == "MATRIX":
+            matrix = get_rating_matrix(parsed_args.score, parsed_args.weighting)
+            if parsed_args.output == "NPZ":
+                # the location of the persisted matrix, for downstream jobs to load
+                df = rating_matrix_file(parsed_args.score, parsed_args.weighting)
+            else:
+                df = sparse.to_frame(matrix, ("user_id", "game_id", "score"))
+        elif parsed_args.user_id is None:
+            raise ValueError("--user_id is required to return recommendations")
+        elif parsed_args.model == "ITEM":
+            df = get_item_item_recommendations(parsed_args.user_id)
+        elif parsed_args.model == "ALS":
+            df = get_factor_recommendations(parsed_args.user_id, parsed_args.score)
+        else:
+            df = get_user_user_recommendations(
+                parsed_args.user_id,
+                parsed_args.score,
+                parsed_args.neighbours,
+                parsed_args.similarity
+            )
+    if parsed_args.verb == "PUT":
+        if parsed_args.function == "MODEL":
+            model = train_factor_model(parsed_args.score, warm_start=False)
+            df = pd.DataFrame({
+                "user_count": [len(model.user_ids)],
+                "game_count": [len(model.game_ids)],
+                "factors": [model.user_factors.shape[1]]
+            })
+        else:
+            df = rebuild_game_neighbours(parsed_args.neighbours)
     return df
 
 
 # CONTROLLERS
-def get_user_user_recommendations(user_id):
+def get_user_user_recommendations(user_id, score="overall_score", neighbours=20, measure="pearson"):
     """
-    Return all available review data.
+    Return games the given user has not reviewed, ranked by the scores predicted from the reviews
+    of the users most similar to them.
     :param user_id: (str) User ID to based user-user recommendations.
-    :return: (pd.DataFrame) of game recommendations
+    :param score: optional (str) review score to compare users and predict by.
+    :param neighbours: optional (int) number of most similar users to predict from.
+    :param measure: optional (str) similarity measure, either "pearson" or "cosine".
+    :return: (pd.DataFrame) of game recommendations, with predicted_score and neighbour_count
     """
-    df = validate_data_store(review_file, review_terms)
-    # part 1 - normalise review scores for given user
-    df = df.loc[df['user_id'] == user_id]
-    df = calculations.user_normalised_reviews(df)
-    # part 2 - normalise all user scores and calculate similarity
-    return df
+    if score not in review_terms:
+        raise TypeError("score must be one of the following: {}".format(", ".join(review_terms)))
+    # the matrix is built over int32 codes of ids, decoded only once recommendations are made
+    reviews = validate_data_store(
+        review_file,
+        review_terms,
+        columns=["user_id", "game_id", score],
+        dtypes=review_dtypes,
+        codes=["user_id", "game_id"]
+    )
+    matrix = sparse.rating_matrix(reviews, score)
+    # each user's mean is taken from the maintained per-user aggregates, in matrix row order
+    user_means = aggregates.mean_scores(get_user_aggregates(codes=["user_id"]), "user_id")[score]
+    recommendations = similarity.user_user_recommendations(
+        matrix,
+        encode_id("user_id", user_id),
+        neighbours,
+        measure,
+        user_means.reindex(matrix.row_ids.astype(np.int32)).to_numpy(dtype=float)
+    )
+    if len(recommendations) == 0:
+        print("No recommendations found for user (id: {}), ".format(user_id)
+            + "as they have no reviews in common with other users.")
+        return recommendations
+
+    # matrix ids are held as objects, so codes are restored to int32 before merging
+    recommendations = recommendations.astype({"game_id": np.int32})
+    games = validate_data_store(game_file, game_terms, dtypes=game_dtypes, codes=["game_id"])
+    # merge game details into recommendations, retaining their order
+    return decode_ids(pd.merge(recommendations, games, on="game_id", how="left"), ["game_id"])
+
+
+def get_item_item_recommendations(user_id):
+    """
+    Return games ranked by their summed similarity to the games the given user has reviewed or
+    collected. Only the rows of the user's own reviews and collections, the neighbour lists of
+    their games and the details of the games recommended are selected (see select_data_store).
+    Indexed backends select them by index; others select them from tables parsed once and cached,
+    by a cached index of their rows, so once cached cost depends on the size of the user's history
+    rather than the data store. Neighbour lists are served as last built, and never rebuilt here
+    (see rebuild_game_neighbours).
+    :param user_id: (str) User ID to base item-item recommendations on.
+    :return: (pd.DataFrame) of game recommendations, with similarity_score and neighbour_count
+    :raises FileNotFoundError: if neighbour lists have not been built
+    """
+    history = get_user_game_history(user_id)
+    recommendations = similarity.item_item_recommendations(get_neighbour_lookup(history), history)
+    if len(recommendations) == 0:
+        print("No recommendations found for user (id: {}), ".format(user_id)
+            + "as they have not reviewed or collected any games with neighbours.")
+        return recommendations
+
+    games = select_data_store(
+        game_file,
+        game_terms,
+        "game_id",
+        list(recommendations["game_id"]),
+        dtypes=game_dtypes,
+        codes=["game_id"]
+    )
+    # merge game details into recommendations, retaining their order
+    recommendations = encode_ids(recommendations, ["game_id"])
+    return decode_ids(pd.merge(recommendations, games, on="game_id", how="left"), ["game_id"])
+
+
+def get_factor_recommendations(user_id, score="overall_score"):
+    """
+    Return games the given user has not reviewed, ranked by the scores predicted by a matrix
+    factorisation (ALS) model: the user's mean score plus the dot product of their latent factors
+    with each game's. Unlike USER recommendations, cost does not grow with the user's activity.
+    :param user_id: (str) User ID to base recommendations on.
+    :param score: optional (str) review score to predict.
+    :return: (pd.DataFrame) of game recommendations, with predicted_score
+    """
+    model = get_factor_model(score)
+    recommendations = factorisation.user_recommendations(model, get_rating_matrix(score), user_id)
+    if len(recommendations) == 0:
+        print("No recommendations found for user (id: {}), ".format(user_id)
+            + "as they have no reviews.")
+        return recommendations
+
+    games = validate_data_store(game_file, game_terms, dtypes=game_dtypes)
+    # merge game details into recommendations, retaining their order
+    return pd.merge(recommendations, games, on="game_id", how="left")
+
+
+def get_factor_model(score="overall_score"):
+    """
+    Return the matrix factorisation model of a review score.
+    The model is retrained, warm started from the last model, if it does not yet exist or
+    reviews have changed since it was trained.
+    :param score: optional (str) review score the model predicts
+    :return: (factorisation.FactorModel)
+    """
+    file = factor_model_file(score)
+    if file_outdated(file, [review_file]):
+        # the test is repeated while holding the lock, so a model trained meanwhile by another
+        # process is loaded rather than trained again
+        with lock_data_store(file):
+            if file_outdated(file, [review_file]):
+                return train_factor_model(score)
+    return factorisation.load(file)
+
+
+def train_factor_model(score="overall_score", warm_start=True):
+    """
+    Train and persist a matrix factorisation model of a review score, by alternating least
+    squares on the user x game rating matrix (see get_rating_matrix), around each user's mean
+    score from the maintained per-user aggregates, as user-user recommendations are.
+    :param score: optional (str) review score the model predicts
+    :param warm_start: optional (bool) start from the factors of the last model, if any, for
+    ALS_WARM_ITERATIONS rather than ALS_ITERATIONS from random factors
+    :return: (factorisation.FactorModel)
+    """
+    file = factor_model_file(score)
+    matrix = get_rating_matrix(score)
+    # each user's mean is taken from the maintained per-user aggregates, in matrix row order
+    user_means = aggregates.mean_scores(get_user_aggregates(), "user_id")[score]
+    with lock_data_store(file):
+        model = factorisation.load(file) if warm_start and os.path.exists(file) else None
+        model = factorisation.train(
+            matrix,
+            ALS_FACTORS,
+            ALS_REGULARISATION,
+            ALS_ITERATIONS if model is None else ALS_WARM_ITERATIONS,
+            model,
+            user_means=user_means.reindex(matrix.row_ids).to_numpy(dtype=float)
+        )
+        factorisation.save(model, file)
+    return model
+
+
+def factor_model_file(score="overall_score"):
+    """
+    Return the location the matrix factorisation model of a review score is persisted at.
+    :param score: optional (str) review score the model predicts
+    :return: (str)
+    :raises TypeError: if score is not one of review_terms
+    """
+    if score not in review_terms:
+        raise TypeError("score must be one of the following: {}".format(", ".join(review_terms)))
+    return os.path.normpath(os.path.join(
+        os.path.abspath(os.path.dirname(__file__)),
+        API_DATA_STORE + FACTOR_MODEL_DATA.format(score)
+    ))
+
+
+def get_game_neighbours():
+    """
+    Return the precomputed neighbour lists of every game, as last built. Lists are never rebuilt
+    on read, as a rebuild compares every pair of games, so are rebuilt by rebuild_game_neighbours
+    (PUT RECOMMENDATIONS -f NEIGHBOURS) once reviews or collections have changed.
+    :return: (pd.DataFrame) game_id, neighbour_id and similarity
+    :raises FileNotFoundError: if neighbour lists have not been built
+    """
+    _check_game_neighbours()
+    return validate_data_store(neighbour_file, neighbour_terms)
+
+
+def get_neighbour_lookup(game_ids):
+    """
+    Return the precomputed neighbour lists of the given games indexed by game (see
+    similarity.neighbour_lists), selecting only their rows (see select_data_store).
+    :param game_ids: (list) game_ids to look up the neighbour lists of
+    :return: (dict) game_id: (neighbour_ids, similarities)
+    :raises FileNotFoundError: if neighbour lists have not been built
+    """
+    _check_game_neighbours()
+    return similarity.neighbour_lists(
+        select_data_store(neighbour_file, neighbour_terms, "game_id", list(game_ids))
+    )
+
+
+def rebuild_game_neighbours(neighbours=None):
+    """
+    Recalculate and persist the most similar games of every game, by the users who have reviewed
+    or collected both (co-review and co-collection).
+    :param neighbours: optional (int) number of most similar games to keep per game,
+    GAME_NEIGHBOURS if None.
+    :return: (pd.DataFrame) game_id, neighbour_id and similarity
+    """
+    interactions = get_user_game_interactions()
+    interactions["interaction"] = 1
+    matrix = sparse.rating_matrix(interactions, "interaction")
+    neighbour_df = similarity.item_item_neighbours(
+        matrix,
+        GAME_NEIGHBOURS if neighbours is None else neighbours
+    )
+    write_data_store(neighbour_df, neighbour_file, mode='w')
+    return neighbour_df
+
+
+def get_rating_matrix(score="overall_score", weighting=None):
+    """
+    Return the CSR user x game matrix of a review score, or of a weighted combination of every
+    review score. Matrices are persisted (see rating_matrix_file) and memory-mapped on reload,
+    so are only rebuilt if they do not yet exist, or reviews have changed.
+    :param score: optional (str) review score of matrix entries
+    :param weighting: optional (float list) weight of each of review_terms, combined into a
+    weighted mean score in place of score
+    :return: (sparse.RatingMatrix) with row_ids of user_ids and column_ids of game_ids
+    :raises TypeError: if score or weighting are not as expected
+    :raises ValueError: if weighting is negative, or sums to zero
+    """
+    file = rating_matrix_file(score, weighting)
+    if file_outdated(file, [review_file]):
+        return rebuild_rating_matrix(score, weighting)
+    return sparse.load(file)
+
+
+def rebuild_rating_matrix(score="overall_score", weighting=None):
+    """
+    Recalculate and persist the CSR user x game matrix of a review score, as a binary .npz file.
+    :param score: optional (str) review score of matrix entries
+    :param weighting: optional (float list) weight of each of review_terms, combined into a
+    weighted mean score in place of score
+    :return: (sparse.RatingMatrix)
+    :raises TypeError: if score or weighting are not as expected
+    :raises ValueError: if weighting is negative, or sums to zero
+    """
+    file = rating_matrix_file(score, weighting)
+    columns = review_terms if weighting is not None else [score]
+    reviews = validate_data_store(
+        review_file,
+        review_terms,
+        columns=["user_id", "game_id"] + columns,
+        dtypes=review_dtypes
+    )
+    if weighting is not None:
+        weights = np.asarray(weighting, dtype=float)
+        reviews = reviews.assign(score=reviews[review_terms].to_numpy(dtype=float) @ (weights / weights.sum()))
+        score = "score"
+    matrix = sparse.rating_matrix(reviews, score)
+    with lock_data_store(file):
+        sparse.save(matrix, file)
+    return matrix
+
+
+def rating_matrix_file(score="overall_score", weighting=None):
+    """
+    Return the location a user x game matrix of a review score is persisted at, named by its
+    score (e.g. rating_matrix_overall_score.npz) or weighting (rating_matrix_weighted_1_0_0_1.npz).
+    :param score: optional (str) review score of matrix entries
+    :param weighting: optional (float list) weight of each of review_terms
+    :return: (str)
+    :raises TypeError: if score or weighting are not as expected
+    :raises ValueError: if weighting is negative, or sums to zero
+    """
+    if weighting is None:
+        if score not in review_terms:
+            raise TypeError("score must be one of the following: {}".format(", ".join(review_terms)))
+        name = score
+    else:
+        if len(weighting) != len(review_terms) or not all(type(n) in [int, float] for n in weighting):
+            raise TypeError("weighting must be a list of 4 int or float values")
+        if sum(weighting) <= 0 or min(weighting) < 0:
+            raise ValueError("weighting must not be negative, or sum to zero")
+        name = "weighted_" + "_".join("{:g}".format(weight) for weight in weighting)
+    return os.path.normpath(os.path.join(
+        os.path.abspath(os.path.dirname(__file__)),
+        API_DATA_STORE + RATING_MATRIX_DATA.format(name)
+    ))
+
+
+def get_user_game_interactions():
+    """
+    Return each unique pair of user and game where the user has reviewed or collected the game.
+    :return: (pd.DataFrame) user_id and game_id
+    """
+    reviews = validate_data_store(review_file, [], columns=["user_id", "game_id"], dtypes=review_dtypes)
+    collections = validate_data_store(collection_file, collection_terms, columns=collection_terms)
+    collected = pd.merge(get_collection_games(), collections, on="collection_id")
+    collected = collected[["user_id", "game_id"]]
+    return pd.concat([reviews, collected], ignore_index=True).drop_duplicates()
+
+
+def get_user_game_history(user_id):
+    """
+    Return the games a single user has reviewed or collected, selecting only the rows of their own
+    reviews, collections and collection games (see select_data_store) rather than grouping every
+    user's interactions.
+    :param user_id: (str) user id
+    :return: (list) unique game_ids, empty if the user has no reviews or collections
+    """
+    reviewed = select_data_store(
+        review_file, [], "user_id", user_id, columns=["user_id", "game_id"], dtypes=review_dtypes
+    )["game_id"]
+    collections = select_data_store(
+        collection_file, collection_terms, "user_id", user_id, columns=collection_terms
+    )["collection_id"]
+    index = get_collection_membership(list(collections))
+    collected = [game_id for collection_id in collections for game_id in index.by_left.get(collection_id, {})]
+    return list(dict.fromkeys(list(reviewed.astype(str)) + collected))
+
+
+def _check_game_neighbours():
+    if not data_store_exists(neighbour_file):
+        print("Game neighbours have not been built, "
+            + "see -v PUT -o RECOMMENDATIONS -f NEIGHBOURS.")
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), neighbour_file)
+    if data_store_outdated(neighbour_file, interaction_files):
+        print("Game neighbours were built before reviews or collections last changed, "
+            + "see -v PUT -o RECOMMENDATIONS -f NEIGHBOURS.")
 
 
 # GAME DATA STORE
@@ -66,6 +479,12 @@ game_terms = [
     "keywords",
     "mechanic"
 ]
+# column types, as declared by the games endpoint so both share one cached table
+game_dtypes = {
+    "game_type": "category",
+    "genre": "category",
+    "publisher_ID": "category"
+}
 # REVIEW DATA STORE
 review_file = os.path.join(
     os.path.abspath(os.path.dirname(__file__)),
@@ -77,4 +496,37 @@ review_terms = [
     "gameplay_score",
     "visual_score",
     "overall_score",
+]
+# column types, as declared by the reviews endpoint
+review_dtypes = {
+    "user_id": "category",
+    "game_id": "category",
+    **{term: "int8" for term in review_terms}
+}
+# COLLECTION DATA STORE
+collection_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    API_DATA_STORE + COLLECTION_DATA
+)
+# required columns
+collection_terms = [
+    "collection_id",
+    "user_id"
+]
+collection_game_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    API_DATA_STORE + COLLECTION_GAME_DATA
+)
+# tables that user game interactions are read from
+interaction_files = [review_file, collection_file, collection_game_file]
+# GAME NEIGHBOUR DATA STORE
+neighbour_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    API_DATA_STORE + GAME_NEIGHBOUR_DATA
+)
+# required columns
+neighbour_terms = [
+    "game_id",
+    "neighbour_id",
+    "similarity"
 ]
\ No newline at end of file
@@ -0,0 +1,331 @@
+"""
+Review API endpoints with CSV adapter.
+Supported calls:
+    get_reviews - return available review data.
+    add_review - append a new review and incrementally update review aggregates.
+    get_review_aggregates - return per-game review aggregates, rebuilding them if out of date.
+    get_review_means - return the mean of each review score per game.
+    get_user_aggregates - return per-user review aggregates, rebuilding them if out of date.
+    rebuild_review_aggregates - recalculate per-game review aggregates from all review data.
+    rebuild_user_aggregates - recalculate per-user review aggregates from all review data.
+    check_review_aggregates - return per-game review aggregates inconsistent with review data.
+"""
+from functools import partial
+from .utilities import aggregates
+from .config import *
+
+
+def reviews_help(parser, verb):
+    """
+    Extend help text with options specific to reviews object
+    :param parser: (ArgumentParser) the existing help object being built.
+    :param verb: (str) optional rest verb to limit scope of help given.
+    :return: parser: (ArgumentParser) with extended help arguments
+    """
+    def get():
+        parser.add_argument(
+            "--id",
+            type=str,
+            help="Optional id to limit the information returned to a single review object."
+        )
+        parser.add_argument(
+            "--user_id",
+            type=str,
+            help="Optional user id to limit the information returned to a single user's reviews."
+        )
+        parser.add_argument(
+            "--game_id",
+            type=str,
+            help="Optional game id to limit the information returned to a single game's reviews."
+        )
+        parser.add_argument(
+            "-f",
+            "--function",
+            choices={"AGGREGATES", "CHECK_AGGREGATES", "USER_AGGREGATES"},
+            type=str,
+            help="Optional function to return per-game review aggregates, those inconsistent "
+                 "with review data, or per-user review aggregates."
+        )
+
+    def post():
+        parser.add_argument(
+            "--user_id",
+            type=str,
+            required=True,
+            help="User id of the reviewer."
+        )
+        parser.add_argument(
+            "--game_id",
+            type=str,
+            required=True,
+            help="Game id of the game being reviewed."
+        )
+        for term in review_terms:
+            parser.add_argument(
+                "--" + term,
+                type=int,
+                choices=range(1, 6),
+                required=True,
+                help="Review score between 1 and 5."
+            )
+
+    def put():
+        parser.add_argument(
+            "-f",
+            "--function",
+            choices={"AGGREGATES"},
+            type=str,
+            required=True,
+            help="Rebuild per-game and per-user review aggregates from all review data."
+        )
+
+    if verb == "GET":
+        get()
+    elif verb == "POST":
+        post()
+    elif verb == "PUT":
+        put()
+
+    return parser
+
+
+def reviews_usage(parsed_args):
+    """
+    Return data specific to arguments given relating to reviews object
+    :param parsed_args: the arguments given by the user after being successfully parsed.
+    :return: (*) result of given arguments
+    """
+    if parsed_args.verb == "GET":
+        if parsed_args.function == "AGGREGATES":
+            df = get_review_aggregates()
+        elif parsed_args.function == "CHECK_AGGREGATES":
+            df = check_review_aggregates()
+        elif parsed_args.function == "USER_AGGREGATES":
+            df = get_user_aggregates()
+        else:
+            df = get_reviews(parsed_args.id, parsed_args.user_id, parsed_args.game_id)
+    if parsed_args.verb == "POST":
+        df = add_review(
+            parsed_args.user_id,
+            parsed_args.game_id,
+            [getattr(parsed_args, term) for term in review_terms]
+        )
+    if parsed_args.verb == "PUT":
+        rebuild_user_aggregates()
+        df = rebuild_review_aggregates()
+    return df
+
+
+# CONTROLLERS
+def get_reviews(review_id=None, user_id=None, game_id=None):
+    """
+    Return all available review data.
+    :param review_id: (str) Optional review id to return information on a single review.
+    :param user_id: (str) Optional user id to return a single user's reviews.
+    :param game_id: (str) Optional game id to return a single game's reviews.
+    :return: (pd.DataFrame)
+    """
+    selected = [
+        (column, value)
+        for column, value in [("review_id", review_id), ("user_id", user_id), ("game_id", game_id)]
+        if value is not None
+    ]
+    if len(selected) == 0:
+        return validate_data_store(review_file, review_terms, dtypes=review_dtypes)
+    # rows are looked up by the first id given, then reduced by the others
+    df = select_data_store(review_file, review_terms, *selected[0], dtypes=review_dtypes)
+    for column, value in selected[1:]:
+        df = df.loc[df[column] == value]
+
+    return df
+
+
+def add_review(user_id, game_id, scores):
+    """
+    Appends a new review to the reviews datastore and adds its scores to the per-game and per-user
+    review aggregates, so that aggregates do not need to be rebuilt from all review data.
+        :param user_id: (str) user_id of the reviewer.
+        :param game_id: (str) game_id of the game being reviewed.
+        :param scores: (int list) complexity, gameplay, visual and overall scores, in that order.
+        :return: (pd.DataFrame) the new review, or None if the user has already reviewed the game.
+        :raises TypeError: if scores is not a list of 4 int values
+    """
+    if type(scores) != list or len(scores) != 4 or not all(type(n) is int for n in scores):
+        raise TypeError("scores must be a list of 4 int values")
+
+    # the review and aggregates are written under both locks, so no concurrent review is lost
+    with lock_data_store(review_file), lock_data_store(aggregate_file), lock_data_store(user_aggregate_file):
+        reviews_df = validate_data_store(review_file, review_terms, columns=["user_id", "game_id"])
+        if ((reviews_df.user_id == user_id) & (reviews_df.game_id == game_id)).any():
+            print("User (id: {}) has already reviewed game (id: {}).".format(user_id, game_id))
+            return
+
+        # review_ids are issued by the reviews datastore's sequence, after the highest existing id
+        review_id = next_id(review_file, "review_id", "r")
+
+        new_data_row_df = pd.DataFrame(
+            [
+                {
+                    'review_id': review_id,
+                    'user_id': user_id,
+                    'game_id': game_id,
+                    **dict(zip(review_terms, scores)),
+                    'row_creation_time_utc': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+                }
+            ]
+        )
+        # aggregates are read before the review is appended, so they are not seen as out of date
+        aggregate_df = get_review_aggregates()
+        user_aggregate_df = get_user_aggregates()
+        write_data_store(new_data_row_df, review_file, mode='a')
+        write_data_store(aggregates.update(aggregate_df, new_data_row_df), aggregate_file, mode='w')
+        write_data_store(
+            aggregates.update(user_aggregate_df, new_data_row_df, "user_id"),
+            user_aggregate_file,
+            mode='w'
+        )
+
+    print("new review (id: {}) was successfully created.".format(review_id))
+    return new_data_row_df
+
+
+def get_review_aggregates(codes=None):
+    """
+    Return per-game review aggregates.
+    Aggregates are rebuilt if they do not yet exist, or if the review data has since been
+    modified outside of add_review.
+    :param codes: optional (str list) id columns to return as int32 codes (see encode_ids)
+    :return: (pd.DataFrame)
+    """
+    if data_store_outdated(aggregate_file, [review_file]):
+        # locks are taken in the same order as add_review, then the test repeated while holding them
+        with lock_data_store(review_file), lock_data_store(aggregate_file):
+            if data_store_outdated(aggregate_file, [review_file]):
+                rebuild_review_aggregates()
+    # aggregates are read back once rebuilt, so later calls are served from the table cache
+    return validate_data_store(aggregate_file, aggregates.aggregate_terms, codes=codes)
+
+
+def get_user_aggregates(codes=None):
+    """
+    Return per-user review aggregates, from which the mean score each user's reviews are
+    normalised around is taken (see calculations.user_normalised_reviews).
+    Aggregates are rebuilt if they do not yet exist, or if the review data has since been
+    modified outside of add_review.
+    :param codes: optional (str list) id columns to return as int32 codes (see encode_ids)
+    :return: (pd.DataFrame)
+    """
+    if data_store_outdated(user_aggregate_file, [review_file]):
+        # locks are taken in the same order as add_review, then the test repeated while holding them
+        with lock_data_store(review_file), lock_data_store(user_aggregate_file):
+            if data_store_outdated(user_aggregate_file, [review_file]):
+                rebuild_user_aggregates()
+    # aggregates are read back once rebuilt, so later calls are served from the table cache
+    return validate_data_store(user_aggregate_file, aggregates.user_aggregate_terms, codes=codes)
+
+
+def get_review_means(codes=None):
+    """
+    Return the mean of each review score per game, calculated within the data store by backends
+    which support queries (see data_store_queryable), otherwise from review aggregates.
+    :param codes: optional (str list) id columns to return as int32 codes (see encode_ids)
+    :return: (pd.DataFrame) game_id and a mean column per review score, one row per reviewed game
+    """
+    if data_store_outdated(aggregate_file, [review_file]) or not data_store_queryable(aggregate_file):
+        return aggregates.mean_scores(get_review_aggregates(codes=codes)).reset_index()
+    return encode_ids(query_data_store(aggregate_file, aggregates.mean_statement()), codes or [])
+
+
+def rebuild_review_aggregates():
+    """
+    Recalculate per-game review aggregates from all review data and persist them.
+    :return: (pd.DataFrame) rebuilt aggregates
+    """
+    # no review can be added between reading reviews and writing their aggregates.
+    # Reviews are aggregated whole, or in chunks by a worker process per shard of a large table.
+    with lock_data_store(review_file), lock_data_store(aggregate_file):
+        aggregate_df = aggregates.merge(
+            map_data_store(
+                review_file,
+                review_terms,
+                aggregates.build_chunks,
+                columns=["game_id"] + review_terms,
+                dtypes=review_dtypes
+            )
+        )
+        write_data_store(aggregate_df, aggregate_file, mode='w')
+    return aggregate_df
+
+
+def rebuild_user_aggregates():
+    """
+    Recalculate per-user review aggregates from all review data and persist them.
+    :return: (pd.DataFrame) rebuilt aggregates
+    """
+    with lock_data_store(review_file), lock_data_store(user_aggregate_file):
+        user_aggregate_df = aggregates.merge(
+            map_data_store(
+                review_file,
+                review_terms,
+                partial(aggregates.build_chunks, key="user_id"),
+                columns=["user_id"] + review_terms,
+                dtypes=review_dtypes
+            ),
+            "user_id"
+        )
+        write_data_store(user_aggregate_df, user_aggregate_file, mode='w')
+    return user_aggregate_df
+
+
+def check_review_aggregates():
+    """
+    Return stored per-game review aggregates which are inconsistent with the review data.
+    :return: (pd.DataFrame) stored and expected aggregates of each inconsistent game,
+    empty if consistent.
+    """
+    if not data_store_exists(aggregate_file):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), aggregate_file)
+    # reviews are aggregated whole, or in chunks by a worker process per shard of a large table
+    return aggregates.check(
+        validate_data_store(aggregate_file, aggregates.aggregate_terms),
+        aggregates.merge(
+            map_data_store(
+                review_file,
+                review_terms,
+                aggregates.build_chunks,
+                columns=["game_id"] + review_terms,
+                dtypes=review_dtypes
+            )
+        )
+    )
+
+
+# REVIEW DATA STORE
+review_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    API_DATA_STORE + REVIEW_DATA
+)
+# required columns
+review_terms = [
+    "complexity_score",
+    "gameplay_score",
+    "visual_score",
+    "overall_score",
+]
+# column types: user and game ids repeat across reviews so are held once per value, while
+# review ids are unique to a review so are left as strings. Scores are from 1 to 5.
+review_dtypes = {
+    "user_id": "category",
+    "game_id": "category",
+    **{term: "int8" for term in review_terms}
+}
+# REVIEW AGGREGATE DATA STORE
+aggregate_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    API_DATA_STORE + REVIEW_AGGREGATE_DATA
+)
+# USER AGGREGATE DATA STORE
+user_aggregate_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    API_DATA_STORE + USER_AGGREGATE_DATA
+)
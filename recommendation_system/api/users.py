@@ -81,9 +81,8 @@ def users_usage(parsed_args):
     if parsed_args.verb == "GET":
         df = get_users(parsed_args.id)
     if parsed_args.verb == "POST":
-        df = get_users()
         df = signup(
-            df,
+            None,
             parsed_args.username,
             parsed_args.password,
             parsed_args.name,
@@ -101,11 +100,9 @@ def get_users(user_id=None):
     :param user_id: (str) Optional user id to return information on a single user.
     :return: (pd.DataFrame)
     """
-    df = validate_data_store(user_file, user_terms)
     if user_id is not None:
-        df = df.loc[df['user_id'] == user_id]
-
-    return df
+        return select_data_store(user_file, user_terms, "user_id", user_id)
+    return validate_data_store(user_file, user_terms)
 
 
 def signup(
@@ -121,7 +118,10 @@ def signup(
     Signs up a new user by capturing the needed information and storing it into the users datastore.
     Certain arguments are required so if they are not passed in an error will be raised.
     Username has to be unique therefore an error is raised if the username already exists.
-        :param input_df: (pd.DataFrame) input pandas data frame.
+    The username check and insert hold the lock of the users datastore, so concurrent signups of
+    the same username cannot both succeed.
+        :param input_df: optional (pd.DataFrame) users to check the username against,
+        the username index of the users datastore if None.
         :param username: (str) username provided by user.
         :param password: (str) password provided by user.
         :param name: (str) full name of the user.
@@ -138,42 +138,33 @@ def signup(
             "Please make sure you add all necessary information."
         )
         return
-    users_df = input_df
-    # if username already exists
-    if username in users_df.username.values:
-        print("This username already exists, please choose a different username.")
-        return
-
-    # user_ids are created incrementally, create a new id based on the size of the users csv.
-    # If the incremental id is taken (there is an issue in indexing),
-    # create a new id via choosing a higher number that is not taken.
-    length = len(users_df)
-    user_id = "u_" + str(length + 1)
-    i = 2
-    while user_id in users_df.user_id.values:
-        user_id = "u_" + str(length + i)
-        i += 1
+    with lock_data_store(user_file):
+        usernames = get_username_index() if input_df is None else set(input_df.username)
+        # if username already exists
+        if username in usernames:
+            print("This username already exists, please choose a different username.")
+            return
 
-    new_data_row_df = pd.DataFrame(
-        [
-            {
-                'user_id': user_id,
-                'username': username,
-                'full_name': name,
-                'password': str(password),
-                'date_of_birth': date_of_birth,
-                'favourite_game_type': favourite_game_type,
-                'favourite_genre': favourite_game_genre,
-                'row_creation_time_utc': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-            }
-        ]
-    )
-    new_data_row_df.to_csv(
-      user_file,
-      mode='a',
-      index=False,
-      header=False
-    )
+        # user_ids are issued by the users datastore's sequence, rather than a scan of its ids
+        user_id = next_id(user_file, "user_id", "u_")
+        new_data_row_df = pd.DataFrame(
+            [
+                {
+                    'user_id': user_id,
+                    'username': username,
+                    'full_name': name,
+                    'password': str(password),
+                    'date_of_birth': date_of_birth,
+                    'favourite_game_type': favourite_game_type,
+                    'favourite_genre': favourite_game_genre,
+                    'row_creation_time_utc': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+                }
+            ]
+        )
+        write_data_store(new_data_row_df, user_file, mode='a')
+        if input_df is None:
+            usernames.add(username)
+            update_derivation("username_index", [user_file], usernames)
 
     create_empty_collection(user_id)
 
@@ -181,42 +172,40 @@ def signup(
     return new_data_row_df
 
 
+def get_username_index():
+    """
+    Return the set of usernames within the users datastore, a hash index for constant time
+    username checks. The index is cached until the users datastore changes, so must not be
+    modified by the caller.
+    :return: (set)
+    """
+    return cached_derivation(
+        "username_index",
+        [user_file],
+        lambda: set(validate_data_store(user_file, user_terms, columns=["username"])["username"])
+    )
+
+
 def create_empty_collection(user_id):
     """
     creates a new empty collection for recently signed up user.
     :param: user_id (str) user_id that the new collection is associated with.
     :return: (str) collection_id of the newly created collection.
     """
-    collections_df = validate_data_store(collection_file, collection_terms)
-
-    # Collection_ids are created incrementally,
-    # create a new id based on the size of the collection csv.
-    # If the incremental id is taken (there is an issue in indexing)
-    # create a new id via choosing a higher number that is not taken.
-    length = len(collections_df)
-    collection_id = "c_" + str(length + 1)
-    i = 2
-    while collection_id in collections_df.collection_id.values:
-        collection_id = "c_" + str(length + i)
-        i += 1
+    # collection_ids are issued by the collections datastore's sequence
+    collection_id = next_id(collection_file, "collection_id", "c_")
 
     new_data_row_df = pd.DataFrame(
         [
             {
                 'collection_id': collection_id,
                 'user_id': user_id,
-                'game_ids': '',
                 'row_creation_time_utc': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
                 'row_updated_time_utc': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
             }
         ]
     )
-    new_data_row_df.to_csv(
-      collection_file,
-      mode='a',
-      index=False,
-      header=False
-    )
+    write_data_store(new_data_row_df, collection_file, mode='a')
     print("new collection (id: {}) successfully created.".format(collection_id))
     return new_data_row_df
 
@@ -301,6 +290,5 @@ collection_file = os.path.join(
 # required columns
 collection_terms = [
     "collection_id",
-    "user_id",
-    "game_ids"
+    "user_id"
 ]
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+Utility functions to maintain per-game review aggregates.
+For each game_id the review count, along with the sum and sum of squares of each review score,
+is kept so that mean scores can be calculated in proportion to the number of games rather than
+the number of reviews. Per-user aggregates are kept alike, keyed by user_id, for the mean score
+each reviewer's reviews are normalised around.
+"""
+import numpy as np
+import pandas as pd
+
+
+def build(review_df, key="game_id"):
+    """
+    Aggregate review data into count, sum and sum of squares of each review score per game.
+    :param review_df: (pd.DataFrame) input review data
+    :param key: optional (str) column to aggregate reviews by, e.g. "user_id" for per-user
+    aggregates, which takes the place of game_id in the returned columns
+    :return: aggregate_df: (pd.DataFrame) one row per key in ascending order, with columns of
+    aggregate_terms
+    :raises TypeError: if arguments are not as expected.
+    """
+    # test arguments:
+    if not isinstance(review_df, pd.DataFrame):
+        raise TypeError("review_df must be a valid data frame of review data")
+
+    scores = review_df[review_terms].astype(float)
+    grouped = scores.groupby(review_df[key], observed=True)
+    sums = grouped.sum()
+    squares = (scores ** 2).groupby(review_df[key], observed=True).sum()
+
+    aggregate_df = pd.DataFrame({count_term: grouped.size()})
+    for term in review_terms:
+        aggregate_df[term + sum_suffix] = sums[term]
+        aggregate_df[term + square_suffix] = squares[term]
+    # ids held as categories are returned as their values, so aggregates of chunks with
+    # different categories combine alike
+    aggregate_df.index = aggregate_df.index.astype(object)
+    aggregate_df.index.name = key
+    return aggregate_df.reset_index()[_terms(key)]
+
+
+def build_chunks(chunks, key="game_id"):
+    """
+    Aggregate review data read in chunks (see config.stream_data_store), with the same result as
+    build of all reviews, holding one chunk and the aggregates of each key seen so far at a time.
+    :param chunks: (iterable) pd.DataFrame chunks of review data
+    :param key: optional (str) column to aggregate reviews by
+    :return: aggregate_df: (pd.DataFrame) one row per key in ascending order
+    :raises TypeError: if arguments are not as expected.
+    """
+    aggregate_df = None
+    for chunk in chunks:
+        chunk_df = build(chunk, key)
+        aggregate_df = chunk_df if aggregate_df is None else _combine([aggregate_df, chunk_df], key)
+    if aggregate_df is None:
+        return build(pd.DataFrame(columns=[key] + review_terms), key)
+    return aggregate_df.sort_values(key, ignore_index=True)
+
+
+def merge(aggregate_dfs, key="game_id"):
+    """
+    Combine aggregates of separate parts of the review data, e.g. of each shard of reviews read
+    in parallel (see config.map_data_store), with the same result as build of all reviews.
+    :param aggregate_dfs: (list) pd.DataFrame aggregates, as returned by build or build_chunks
+    :param key: optional (str) column reviews were aggregated by
+    :return: aggregate_df: (pd.DataFrame) one row per key in ascending order
+    :raises TypeError: if arguments are not as expected.
+    """
+    if len(aggregate_dfs) == 0 or not all(is_aggregate(aggregate_df, key) for aggregate_df in aggregate_dfs):
+        raise TypeError("aggregate_dfs must be a non empty list of review aggregates")
+
+    if len(aggregate_dfs) == 1:
+        return aggregate_dfs[0][_terms(key)]
+    return _combine(aggregate_dfs, key).sort_values(key, ignore_index=True)
+
+
+def update(aggregate_df, review_df, key="game_id"):
+    """
+    Incrementally add newly appended reviews to existing aggregates.
+    :param aggregate_df: (pd.DataFrame) existing aggregates, as returned by build
+    :param review_df: (pd.DataFrame) new review data not yet included in aggregate_df
+    :param key: optional (str) column reviews were aggregated by, e.g. "user_id"
+    :return: aggregate_df: (pd.DataFrame) updated aggregates
+    :raises TypeError: if arguments are not as expected.
+    """
+    if not is_aggregate(aggregate_df, key):
+        raise TypeError("aggregate_df must be a valid data frame of review aggregates")
+
+    return _combine([aggregate_df[_terms(key)], build(review_df, key)], key)
+
+
+def mean_scores(aggregate_df, key="game_id"):
+    """
+    Return the mean of each review score per game from aggregates.
+    :param aggregate_df: (pd.DataFrame) review aggregates, as returned by build
+    :param key: optional (str) column reviews were aggregated by
+    :return: (pd.DataFrame) indexed by key, with a mean column per review score
+    :raises TypeError: if arguments are not as expected.
+    """
+    if not is_aggregate(aggregate_df, key):
+        raise TypeError("aggregate_df must be a valid data frame of review aggregates")
+
+    indexed = aggregate_df.set_index(key)
+    indexed = indexed[indexed[count_term] > 0]
+    return pd.DataFrame(
+        {term: indexed[term + sum_suffix] / indexed[count_term] for term in review_terms}
+    )
+
+
+def rank_scores(aggregate_df, weights, rank_mode="BAYESIAN", prior_count=None, z=1.96):
+    """
+    Return a score per game to rank games by, which unlike the mean of their reviews is not
+    topped by games with only a few high reviews, calculated from aggregates in one vectorised
+    pass over all games:
+        BAYESIAN - the mean shrunk towards the mean of all reviews, as if each game also had
+        prior_count reviews of that mean: (prior_count * global_mean + sum) / (prior_count + count)
+        WILSON - the lower bound of the Wilson score interval of the mean, with scores scaled to
+        [0, 1] by score_range and the variance of scores (from their sum of squares) in place of
+        the binomial p(1 - p), to which it is equal for scores of only score_range's bounds.
+    The standard deviation of a weighted score is bounded above by the weighted sum of each
+    score's standard deviation, as covariances between scores are not aggregated.
+    :param aggregate_df: (pd.DataFrame) review aggregates, as returned by build
+    :param weights: (float list / np.ndarray) weight of each of review_terms, summing to one
+    :param rank_mode: optional (str) "BAYESIAN" or "WILSON"
+    :param prior_count: optional (float) BAYESIAN prior review count, the mean count per game if None
+    :param z: optional (float) standard normal quantile of the confidence interval (1.96 for 95%)
+    :return: (pd.DataFrame) indexed by game_id, with review_count, mean, score and the confidence
+    interval of the mean lower_bound to upper_bound
+    :raises TypeError: if arguments are not as expected.
+    """
+    if not is_aggregate(aggregate_df):
+        raise TypeError("aggregate_df must be a valid data frame of review aggregates")
+    if rank_mode not in rank_modes[1:]:
+        raise TypeError(
+            "rank_mode must be one of the following: {}".format(", ".join(rank_modes[1:]))
+        )
+
+    indexed = aggregate_df.set_index("game_id")
+    indexed = indexed[indexed[count_term] > 0]
+    # (games x 4) matrices of sums and sums of squares, and a count per game
+    count = indexed[count_term].to_numpy(dtype=float)
+    sums = indexed[[term + sum_suffix for term in review_terms]].to_numpy(dtype=float)
+    squares = indexed[[term + square_suffix for term in review_terms]].to_numpy(dtype=float)
+    weights = np.asarray(weights, dtype=float)
+
+    score_means = sums / count[:, None]
+    # variances of near constant scores may round below zero
+    deviations = np.sqrt(np.maximum(squares / count[:, None] - score_means ** 2, 0))
+    mean = score_means @ weights
+    deviation = deviations @ np.abs(weights)
+
+    # Wilson score interval of the mean scaled to [0, 1]
+    low, high = score_range
+    scaled = (mean - low) / (high - low)
+    variance = (deviation / (high - low)) ** 2
+    centre = scaled + z ** 2 / (2 * count)
+    margin = z * np.sqrt(variance / count + z ** 2 / (4 * count ** 2))
+    lower_bound = low + (high - low) * (centre - margin) / (1 + z ** 2 / count)
+    upper_bound = low + (high - low) * (centre + margin) / (1 + z ** 2 / count)
+
+    if rank_mode == "WILSON":
+        score = lower_bound
+    else:
+        global_mean = sums.sum(axis=0) @ weights / max(count.sum(), 1)
+        if prior_count is None:
+            prior_count = count.mean() if len(count) > 0 else 0.0
+        score = (prior_count * global_mean + mean * count) / (prior_count + count)
+    return pd.DataFrame(
+        {
+            count_term: indexed[count_term].to_numpy(),
+            "mean": mean,
+            "score": score,
+            "lower_bound": lower_bound,
+            "upper_bound": upper_bound
+        },
+        index=indexed.index
+    )
+
+
+def mean_statement():
+    """
+    Return a SQL statement calculating the mean of each review score per game from an
+    aggregates table named {table}, as mean_scores does, for backends which support queries.
+    :return: (str) statement selecting game_id and a mean column per review score
+    """
+    means = ", ".join(
+        "CAST({0}{1} AS REAL) / {2} AS {0}".format(term, sum_suffix, count_term) for term in review_terms
+    )
+    return "SELECT game_id, {} FROM {{table}} WHERE {} > 0".format(means, count_term)
+
+
+def check(aggregate_df, review_df):
+    """
+    Compare aggregates against those rebuilt from raw review data.
+    :param aggregate_df: (pd.DataFrame) review aggregates to test
+    :param review_df: (pd.DataFrame) raw review data, or aggregates built from it (e.g. by
+    build_chunks)
+    :return: (pd.DataFrame) the stored and expected rows of each inconsistent game_id,
+    empty if aggregates are consistent.
+    :raises TypeError: if arguments are not as expected.
+    """
+    if not is_aggregate(aggregate_df):
+        raise TypeError("aggregate_df must be a valid data frame of review aggregates")
+
+    stored = aggregate_df[aggregate_terms].set_index("game_id")
+    expected = (review_df if is_aggregate(review_df) else build(review_df))[aggregate_terms]
+    expected = expected.set_index("game_id")
+    stored, expected = stored.align(expected, join="outer", fill_value=0)
+    # sums of int scores are exact in float, so any difference is an inconsistency
+    inconsistent = (stored != expected).any(axis=1)
+    return pd.concat(
+        [stored[inconsistent], expected[inconsistent]],
+        keys=["stored", "expected"],
+        names=["source", "game_id"]
+    ).reset_index()
+
+
+def _combine(aggregate_dfs, key):
+    # aggregates of the same key are summed, in order of first appearance
+    aggregate_df = pd.concat(aggregate_dfs).groupby(key, sort=False).sum().reset_index()
+    aggregate_df[count_term] = aggregate_df[count_term].astype(int)
+    return aggregate_df[_terms(key)]
+
+
+def _terms(key):
+    return [key, count_term] + [
+        term + suffix for term in review_terms for suffix in [sum_suffix, square_suffix]
+    ]
+
+
+def is_aggregate(input_df, key="game_id"):
+    """
+    Test if a given input is a data frame of review aggregates.
+    :param input_df: (*) input to test
+    :param key: optional (str) column reviews were aggregated by
+    :return: (bool) True if input_df contains all aggregate_terms, with key in place of game_id
+    """
+    return isinstance(input_df, pd.DataFrame) and set(_terms(key)).issubset(input_df.columns)
+
+
+review_terms = [
+    "complexity_score",
+    "gameplay_score",
+    "visual_score",
+    "overall_score",
+]
+count_term = "review_count"
+sum_suffix = "_sum"
+square_suffix = "_sum_sq"
+# ranking of games by their mean (see calculations.game_review_mean), or by rank_scores
+rank_modes = ["MEAN", "BAYESIAN", "WILSON"]
+# lowest and highest review score
+score_range = (1, 5)
+aggregate_terms = _terms("game_id")
+user_aggregate_terms = _terms("user_id")
@@ -0,0 +1,123 @@
+"""
+Utility functions for an append-only association table between two keys, e.g. collection_id and
+game_id. Each row records a pair of keys being added (added_at) or removed (removed_at), so a
+change of membership is a single appended row however large the table. The latest row of a pair
+decides whether it is a current member.
+"""
+from collections import namedtuple
+import pandas as pd
+
+AssociationIndex = namedtuple("AssociationIndex", ["keys", "by_left", "by_right", "updated"])
+
+
+def build_index(association_df, keys):
+    """
+    Build an index of the current pairs of an association table on both of its keys.
+    :param association_df: (pd.DataFrame) association rows, in the order they were written
+    :param keys: (tuple) left and right key columns, e.g. ("collection_id", "game_id")
+    :return: (AssociationIndex) where by_left maps each left key to a dict of its right keys
+    (in the order added) to their added_at, by_right maps each right key to the set of its left
+    keys, and updated maps each left key to the time it last changed.
+    :raises TypeError: if arguments are not as expected.
+    """
+    if not isinstance(association_df, pd.DataFrame):
+        raise TypeError("association_df must be a valid data frame")
+    if not set(keys).union(change_terms).issubset(association_df.columns):
+        raise TypeError("association_df must have columns: {}".format(
+            ", ".join(list(keys) + change_terms)
+        ))
+
+    index = AssociationIndex(tuple(keys), {}, {}, {})
+    latest = association_df.drop_duplicates(list(keys), keep="last")
+    current = latest.loc[latest["removed_at"].isna()]
+    for left, right, added_at in zip(current[keys[0]], current[keys[1]], current["added_at"]):
+        index.by_left.setdefault(left, {})[right] = added_at
+        index.by_right.setdefault(right, set()).add(left)
+    changed = association_df["added_at"].fillna(association_df["removed_at"])
+    index.updated.update(changed.groupby(association_df[keys[0]]).max().dropna().to_dict())
+    return index
+
+
+def apply(index, rows_df):
+    """
+    Apply association rows appended since an index was built to it, in place.
+    :param index: (AssociationIndex) as returned by build_index
+    :param rows_df: (pd.DataFrame) appended association rows
+    :return: (AssociationIndex) the given index
+    """
+    left_key, right_key = index.keys
+    for row in rows_df.to_dict("records"):
+        left, right = row[left_key], row[right_key]
+        if pd.isna(row.get("removed_at")):
+            index.by_left.setdefault(left, {})[right] = row["added_at"]
+            index.by_right.setdefault(right, set()).add(left)
+            changed = row["added_at"]
+        else:
+            index.by_left.get(left, {}).pop(right, None)
+            index.by_right.get(right, set()).discard(left)
+            changed = row["removed_at"]
+        index.updated[left] = max(index.updated.get(left, changed), changed)
+    return index
+
+
+def compact(association_df, keys):
+    """
+    Drop the rows of an association table which no longer decide anything: every row superseded
+    by a later row of the same pair, and the removal of each pair no longer a member, except the
+    latest change of each left key, so the time it last changed (see build_index) is kept.
+    :param association_df: (pd.DataFrame) association rows, in the order they were written
+    :param keys: (tuple) left and right key columns, e.g. ("collection_id", "game_id")
+    :return: (pd.DataFrame) remaining rows, in the order they were written, with the same index
+    as association_df
+    :raises TypeError: if arguments are not as expected.
+    """
+    if not isinstance(association_df, pd.DataFrame):
+        raise TypeError("association_df must be a valid data frame")
+    if not set(keys).union(change_terms).issubset(association_df.columns):
+        raise TypeError("association_df must have columns: {}".format(
+            ", ".join(list(keys) + change_terms)
+        ))
+
+    latest = association_df.drop_duplicates(list(keys), keep="last")
+    # rows are written in time order, so the latest change of a left key is its last row
+    last_change = ~latest[keys[0]].duplicated(keep="last")
+    return latest.loc[latest["removed_at"].isna() | last_change]
+
+
+def is_member(index, left, right):
+    """
+    Return whether a pair of keys is currently associated.
+    :param index: (AssociationIndex) as returned by build_index
+    :param left: (str) left key
+    :param right: (str) right key
+    :return: (bool)
+    """
+    return right in index.by_left.get(left, {})
+
+
+def current(index, left=None, right=None):
+    """
+    Return the current pairs of an association index, optionally for a single key.
+    :param index: (AssociationIndex) as returned by build_index
+    :param left: optional (str) left key to limit pairs to
+    :param right: optional (str) right key to limit pairs to
+    :return: (pd.DataFrame) of both key columns and added_at
+    """
+    left_key, right_key = index.keys
+    if left is not None:
+        lefts = [left] if left in index.by_left else []
+    elif right is not None:
+        lefts = sorted(index.by_right.get(right, set()))
+    else:
+        lefts = list(index.by_left)
+
+    rows = [
+        (left_value, right_value, added_at)
+        for left_value in lefts
+        for right_value, added_at in index.by_left[left_value].items()
+        if right is None or right_value == right
+    ]
+    return pd.DataFrame(rows, columns=[left_key, right_key, "added_at"])
+
+
+change_terms = ["added_at", "removed_at"]
@@ -0,0 +1,103 @@
+"""
+Utility functions for a process-wide, least recently used cache of parsed data store tables.
+Entries are stored against the signature (modification time, size and inode) of the file they
+were read from and are only returned while that signature is unchanged, so an unchanged table is
+never parsed twice while any change to it, by this process or another, is always seen.
+"""
+from collections import OrderedDict
+import pandas as pd
+
+
+def get(key, signature, loader):
+    """
+    Return the cached value of a given key, calling loader to (re)load it if not cached or stale.
+    :param key: (tuple) cache key, containing the file location of each table the value is read
+    or derived from
+    :param signature: (tuple) current signature of the files
+    :param loader: (function) no argument function returning the value to cache
+    :return: (*) cached value
+    """
+    entry = _entries.get(key)
+    if entry is not None and entry["signature"] == signature:
+        _entries.move_to_end(key)
+        stats["hits"] += 1
+        return entry["value"]
+
+    stats["misses"] += 1
+    return put(key, signature, loader())
+
+
+def peek(key, signature):
+    """
+    Return the cached value of a given key without loading it, e.g. to update it only if cached.
+    :param key: (tuple) cache key, as for get
+    :param signature: (tuple) current signature of the files
+    :return: (*) cached value, or None if not cached or stale
+    """
+    entry = _entries.get(key)
+    if entry is None or entry["signature"] != signature:
+        return None
+    return entry["value"]
+
+
+def put(key, signature, value):
+    """
+    Cache a value against a given key, e.g. a structure updated in place after its files changed.
+    :param key: (tuple) cache key, as for get
+    :param signature: (tuple) current signature of the files
+    :param value: (*) value to cache
+    :return: (*) cached value
+    """
+    _entries[key] = {"signature": signature, "value": value, "size": _size(value)}
+    _entries.move_to_end(key)
+    _evict()
+    return value
+
+
+def invalidate(file=None):
+    """
+    Remove all cached entries read or derived from a given table, or all entries if file is None.
+    :param file: optional (str) file location of the table written to
+    :return: None
+    """
+    if file is None:
+        _entries.clear()
+        return
+    for key in [key for key in _entries if file in key]:
+        del _entries[key]
+
+
+def resize(max_bytes):
+    """
+    Change the memory bound of the cache, evicting least recently used entries if now exceeded.
+    :param max_bytes: (int) maximum total size of cached values
+    :return: None
+    """
+    global _max_bytes
+    _max_bytes = max_bytes
+    _evict()
+
+
+def _evict():
+    # always keep the most recently used entry, even if alone it exceeds the bound
+    total = sum(entry["size"] for entry in _entries.values())
+    while total > _max_bytes and len(_entries) > 1:
+        _, entry = _entries.popitem(last=False)
+        total -= entry["size"]
+        stats["evictions"] += 1
+
+
+def _size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        # derived lookups of arrays, where object arrays are counted by reference only
+        return sum(_size(item) for item in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(_size(item) for item in value)
+    return int(getattr(value, "nbytes", 0))
+
+
+_entries = OrderedDict()
+_max_bytes = 256 * 1024 * 1024
+stats = {"hits": 0, "misses": 0, "evictions": 0}
@@ -1,21 +1,42 @@
 """
 Utility functions to process data frames and include additional numerical data columns.
 """
+import numpy as np
 import pandas as pd
+from . import aggregates
 
 
-def game_review_mean(game_df, review_df, sort_by="overall_score", weighting=[0, 0, 0, 1]):
+def game_review_mean(
+    game_df,
+    review_df,
+    sort_by="overall_score",
+    weighting=[0, 0, 0, 1],
+    limit=None,
+    offset=0,
+    rank_mode="MEAN"
+):
     """
     Calculates mean/weighted mean and returns sorted game data by review score of given arguments.
     :param game_df: (pd.DataFrame) input game data (already filtered if required)
-    :param review_df: (pd.DataFrame) input review data
+    :param review_df: (pd.DataFrame) input review data, either raw reviews or per-game review
+    aggregates (see aggregates.build) from which means are calculated without a pass over reviews.
     :param sort_by: optional (str) property to calculate mean score value for and sort results by.
     Must be either "complexity_score", "gameplay_score", "visual_score", or "overall_score"
-    :param weighting: optional (int list) if sort_by is "overall_score", a user supplied weighting
-    may be used to calculate a weighted average of all the properties.
+    :param weighting: optional (int/float list) if sort_by is "overall_score", a user supplied
+    weighting may be used to calculate a weighted average of all the properties.
     If no weighting is supplied, then standard arithmetic mean is calculated for "overall_score".
-    :return: sorted_return: (pd.DataFrame) game data sorted in desc. order of given arguments.
+    :param limit: optional (int) number of games to return, all games if None. Only the games
+    returned are selected from the means (see top_positions) and merged with their game data.
+    :param offset: optional (int) number of highest ranked games to skip before those returned.
+    :param rank_mode: optional (str) one of aggregates.rank_modes. "MEAN" ranks games by their mean,
+    whereas "BAYESIAN" and "WILSON" rank by a score which is not swayed by games with only a few
+    reviews (see aggregates.rank_scores), calculated from review aggregates.
+    :return: sorted_return: (pd.DataFrame) game data sorted in desc. order of given arguments,
+    with games of equal rank in the order of game_df. Ranked by "mean", or by "score" along with
+    "review_count" and the confidence interval "lower_bound" to "upper_bound" of the mean if
+    rank_mode is not "MEAN".
     :raises TypeError: if arguments are not as expected.
+    :raises ValueError: if given weighting sums to zero.
     """
     # todo - slight duplication, can be extracted
     # test arguments:
@@ -28,59 +49,145 @@ def game_review_mean(game_df, review_df, sort_by="overall_score", weighting=[0,
     valid_sort_by = ["complexity_score", "gameplay_score", "visual_score", "overall_score"]
     if type(sort_by) != str or sort_by not in valid_sort_by:
         raise TypeError("sort_by must be one of the following: {}".format(", ".join(valid_sort_by)))
-    # weighting is list of ints, 4 length in size with each between 0-10
-    if type(weighting) != list or len(weighting) != 4 or not all(type(n) is int for n in weighting):
-        raise TypeError("weighting must be a list of 4 int values")
+    # weighting is list of ints or floats, 4 length in size
+    if not valid_weighting(weighting):
+        raise TypeError("weighting must be a list of 4 int or float values")
+    # limit and offset are None or non-negative ints
+    if limit is not None and (type(limit) != int or limit < 0):
+        raise TypeError("limit must be a non-negative int")
+    if type(offset) != int or offset < 0:
+        raise TypeError("offset must be a non-negative int")
+    if rank_mode not in aggregates.rank_modes:
+        raise TypeError(
+            "rank_mode must be one of the following: {}".format(", ".join(aggregates.rank_modes))
+        )
 
     # filter reviews by game_ids present in game_df
-    game_ids = list(game_df["game_id"].unique())
+    game_ids = game_df["game_id"].unique()
     filtered_reviews = review_df[review_df["game_id"].isin(game_ids)]
+    if rank_mode != "MEAN":
+        # scores are calculated from aggregates, built in a single pass if given raw reviews
+        if not aggregates.is_aggregate(filtered_reviews):
+            filtered_reviews = aggregates.build(filtered_reviews)
+        rank_values = aggregates.rank_scores(
+            filtered_reviews, _score_weights(sort_by, weighting), rank_mode
+        ).reset_index()
+        return _rank_games(game_df, rank_values, "score", limit, offset)
+    # (games x 4) matrix of mean review scores
+    if aggregates.is_aggregate(filtered_reviews):
+        score_means = aggregates.mean_scores(filtered_reviews)
+    else:
+        score_means = filtered_reviews.groupby("game_id")[review_terms].mean()
     # determine mean calculation method - either simple or weighted
     if sort_by == "overall_score" and weighting != [0, 0, 0, 1]:
-        # weighted average
-        print("weighted average")
-        mean_values = filtered_reviews.groupby('game_id').mean().reset_index()
-        weighted_mean = [0] * len(mean_values)
-        # todo - check if theres a better way
-        total_weight = sum(weighting)
-        print(total_weight)
-        for index, row in mean_values.iterrows():
-            weighted_mean[index] =\
-                sum([
-                    row["complexity_score"]*weighting[0],
-                    row["gameplay_score"]*weighting[1],
-                    row["visual_score"]*weighting[2],
-                    row["overall_score"]*weighting[3]
-                ])/total_weight
-        mean_values["mean"] = weighted_mean
-        print(mean_values)
+        # weighted average, as a single product of the (games x 4) mean score matrix
+        # with the weight vector
+        mean_values = pd.DataFrame({
+            "game_id": score_means.index,
+            "mean": score_means.to_numpy(dtype=float) @ _score_weights(sort_by, weighting)
+        })
     else:
-        # calculate list of simple mean scores
-        mean_values = filtered_reviews.groupby('game_id')[sort_by].mean().reset_index()
-        # simplify column names to game_id and mean
-        mean_values.columns = ["game_id", "mean"]
-    # merge mean calculations into game details as this will be how they are presented
-    return_df = pd.merge(game_df, mean_values, on="game_id")
-    sorted_return = return_df.sort_values(by=["mean"], ascending=False)
+        # simple mean scores of sort_by
+        mean_values = pd.DataFrame({
+            "game_id": score_means.index,
+            "mean": score_means[sort_by].to_numpy(dtype=float)
+        })
+    return _rank_games(game_df, mean_values, "mean", limit, offset)
+
+
+def _score_weights(sort_by, weighting):
+    # weight of each review score, summing to one, by which games are ranked
+    if sort_by == "overall_score" and weighting != [0, 0, 0, 1]:
+        weights = np.asarray(weighting, dtype=float)
+        total_weight = weights.sum()
+        if total_weight == 0:
+            raise ValueError("weighting must not sum to zero")
+        return weights / total_weight
+    return np.asarray([float(term == sort_by) for term in review_terms])
+
+
+def _rank_games(game_df, rank_values, rank_column, limit, offset):
+    # values of each game in game_df order, only those with reviews are ranked
+    row_values = rank_values.set_index("game_id").reindex(game_df["game_id"])
+    row_ranks = row_values[rank_column].to_numpy()
+    reviewed = np.flatnonzero(~np.isnan(row_ranks))
+    count = len(reviewed) if limit is None else offset + limit
+    ranked = top_positions(row_ranks[reviewed], count)[offset:]
+    # only the selected games are merged with their details, indexed by their reviewed position
+    selected = reviewed[ranked]
+    sorted_return = game_df.iloc[selected].assign(**{
+        column: row_values[column].to_numpy()[selected] for column in row_values.columns
+    })
+    sorted_return.index = ranked
     return sorted_return
 
 
-def user_normalised_reviews(review_df):
+def top_positions(values, k):
+    """
+    Return the positions of the k largest values in descending order of value, by partial
+    selection, so only k values are sorted. Equal values are ranked by position.
+    :param values: (np.ndarray) values to select from, without nulls
+    :param k: (int) number of positions to return, all positions if beyond len(values)
+    :return: (np.ndarray) positions of the selected values
+    """
+    values = np.asarray(values, dtype=float)
+    k = min(k, len(values))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    # the k-th largest value, with all larger values and the first of those equal to it
+    kth = -np.partition(-values, k - 1)[k - 1]
+    larger = np.flatnonzero(values > kth)
+    selected = np.concatenate([larger, np.flatnonzero(values == kth)[:k - len(larger)]])
+    return selected[np.lexsort((selected, -values[selected]))]
+
+
+def valid_weighting(weighting):
+    """
+    Test if a given weighting can be applied to the four review score properties.
+    :param weighting: (int/float list) weighting to test
+    :return: (bool) True if weighting is a list of 4 int or float values
+    """
+    return (
+        type(weighting) == list
+        and len(weighting) == 4
+        and all(isinstance(n, (int, float)) and not isinstance(n, bool) for n in weighting)
+    )
+
+
+def user_normalised_reviews(review_df, user_aggregate_df=None):
     """
-    Returns user's normalised review scores around zero.
-    :param review_df: (pd.DataFrame) input review data (already filtered to user_id)
-    :return: normalised_df: (pd.DataFrame) user's review scores after normalisation.
+    Returns review scores normalised around zero, by subtracting the mean score of each reviewer.
+    Every user is centred in a single pass over review_df, which is left unchanged.
+    :param review_df: (pd.DataFrame) input review data of any number of users. Without a user_id
+    column, reviews are taken to be those of a single user.
+    :param user_aggregate_df: optional (pd.DataFrame) maintained per-user aggregates, as returned
+    by aggregates.build(review_df, "user_id"), to take each user's mean from rather than
+    calculating it from review_df
+    :return: normalised_df: (pd.DataFrame) review_df with its review scores normalised.
     :raises TypeError: if arguments are not as expected.
     """
     # test arguments:
     if not isinstance(review_df, pd.DataFrame):
         raise TypeError("review_df must be a valid data frame of review data")
+    if user_aggregate_df is not None and not aggregates.is_aggregate(user_aggregate_df, "user_id"):
+        raise TypeError("user_aggregate_df must be a valid data frame of per-user review aggregates")
+
+    if user_aggregate_df is not None:
+        return _normalised(review_df, aggregates.mean_scores(user_aggregate_df, "user_id"))
+    terms = [term for term in review_terms if term in review_df.columns]
+    scores = review_df[terms].astype(float)
+    if "user_id" in review_df.columns:
+        means = scores.groupby(review_df["user_id"], observed=True).transform("mean")
+    else:
+        means = scores.mean()
+    return review_df.assign(**(scores - means))
 
-    for column in review_df.columns:
-        if column in review_terms:
-            review_df[column] = review_df[column] - review_df[column].mean()
 
-    return review_df
+def _normalised(review_df, user_means):
+    means = user_means.reindex(review_df["user_id"].astype(object))
+    return review_df.assign(**{
+        term: review_df[term] - means[term].to_numpy() for term in review_terms if term in review_df.columns
+    })
 
 
 review_terms = [
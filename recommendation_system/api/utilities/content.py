@@ -0,0 +1,81 @@
+"""
+Utility functions to encode game content into fixed width feature vectors.
+Each game is described by one block of features per content column:
+    game_type, genre - one-hot
+    keywords, mechanic - multi-hot of their comma separated terms
+    player_count, play_time_mins, cost_usd - standardised numerics
+Term blocks are scaled to unit length, and standardised numerics by 1 / sqrt(number of numerics),
+so every block contributes comparably to cosine similarity however many terms it holds.
+"""
+import numpy as np
+import pandas as pd
+
+
+def split_terms(values):
+    """
+    Split comma separated cell values into their individual, stripped terms.
+    :param values: (pd.Series) cell values, which may be null
+    :return: (pd.Series) of term lists, empty for null cells
+    """
+    # categorical values are converted first, as they cannot be filled with a new category
+    return values.astype(object).fillna("").astype(str).str.split(",").apply(
+        lambda terms: [term.strip() for term in terms if term.strip() != ""]
+    )
+
+
+def encode(game_df, max_terms=256):
+    """
+    Encode game content into a matrix of feature vectors, one row per game.
+    :param game_df: (pd.DataFrame) input game data
+    :param max_terms: optional (int) maximum number of terms per block, keeping the most frequent,
+    so the width of vectors is bounded however large the catalogue.
+    :return: (tuple) vectors (np.ndarray of float32, games x features) and feature names (list)
+    :raises TypeError: if arguments are not as expected.
+    :raises KeyError: if game_df is missing any content columns.
+    """
+    if not isinstance(game_df, pd.DataFrame):
+        raise TypeError("game_df must be a valid data frame of game data")
+    missing = set(categorical_terms + multi_value_terms + numeric_terms).difference(game_df.columns)
+    if missing:
+        raise KeyError("game_df is missing content columns: {}".format(", ".join(sorted(missing))))
+
+    blocks = []
+    names = []
+    for term in categorical_terms + multi_value_terms:
+        if term in categorical_terms:
+            terms = game_df[term].astype(object).fillna("").astype(str).apply(
+                lambda value: [value] if value else []
+            )
+        else:
+            terms = split_terms(game_df[term])
+        # exploded index is the position of each term's game
+        exploded = terms.reset_index(drop=True).explode().dropna()
+        counts = exploded.value_counts()
+        vocabulary = sorted(counts.index, key=lambda value: (-counts[value], value))[:max_terms]
+        positions = pd.Series(np.arange(len(vocabulary)), index=vocabulary, dtype=np.int64)
+        exploded = exploded[exploded.isin(positions.index)]
+        block = np.zeros((len(game_df), len(vocabulary)), dtype=np.float32)
+        block[exploded.index.to_numpy(dtype=np.int64), positions[exploded].to_numpy()] = 1
+        blocks.append(_unit_rows(block))
+        names.extend("{}={}".format(term, value) for value in vocabulary)
+
+    numerics = game_df[numeric_terms].apply(pd.to_numeric, errors="coerce").astype(float)
+    # skewed values (e.g. play time) are log scaled before standardising, missing values are mean
+    numerics = np.log1p(numerics.clip(lower=0))
+    numerics = numerics.fillna(numerics.mean()).fillna(0)
+    deviations = numerics.std(ddof=0).replace(0, 1)
+    standardised = ((numerics - numerics.mean()) / deviations).to_numpy(np.float32)
+    blocks.append(standardised / np.sqrt(len(numeric_terms)))
+    names.extend(numeric_terms)
+
+    return np.hstack(blocks).astype(np.float32), names
+
+
+def _unit_rows(block):
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    return np.divide(block, norms, out=np.zeros_like(block), where=norms > 0)
+
+
+categorical_terms = ["game_type", "genre"]
+multi_value_terms = ["keywords", "mechanic"]
+numeric_terms = ["player_count", "play_time_mins", "cost_usd"]
@@ -0,0 +1,108 @@
+"""
+Utility functions to dictionary encode string ids (e.g. "u_12", "g31") as dense int32 codes, so
+joins, groupbys and masks on ids compare integers rather than Python strings.
+An id's code is its position within the list of ids, plus the encoding's start, where the list is
+only ever appended to, so codes never change once assigned and can be shared between tables.
+Encodings of separate ranges of codes can be combined, one falling back to the other.
+"""
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+IdEncoding = namedtuple("IdEncoding", ["ids", "lookup", "codes", "start"])
+# code of null ids
+MISSING_CODE = -1
+# code of ids not within an encoding, distinct from MISSING_CODE so they never match null ids
+UNKNOWN_CODE = -2
+
+
+def build(ids, start=0):
+    """
+    Build an encoding from a list of registered ids, in the order they were registered.
+    :param ids: (list / np.ndarray / pd.Series) registered ids, where only the first occurrence
+    of a repeated id is given its code
+    :param start: optional (int) code of the first id, so encodings of separate ranges of codes
+    can be combined (see encode)
+    :return: (IdEncoding) with ids indexed by code - start, and a hash lookup of each unique id
+    to its code
+    """
+    ids = np.asarray(ids, dtype=object)
+    first = ~pd.Index(ids).duplicated(keep="first")
+    return IdEncoding(ids, pd.Index(ids[first]), (np.flatnonzero(first) + start).astype(np.int32), start)
+
+
+def extend(encoding, values):
+    """
+    Return an encoding with the ids not yet within it appended, in order of first appearance.
+    :param encoding: (IdEncoding) as returned by build
+    :param values: (pd.Series / np.ndarray / list) ids, which may be null
+    :return: (IdEncoding) encoding itself if every id is already within it
+    :raises TypeError: if encoding is not an IdEncoding
+    """
+    if not isinstance(encoding, IdEncoding):
+        raise TypeError("encoding must be a valid IdEncoding")
+    new_ids = unregistered(encoding, values)
+    if len(new_ids) == 0:
+        return encoding
+    return build(np.append(encoding.ids, np.asarray(new_ids, dtype=object)), encoding.start)
+
+
+def encode(encoding, values, fallback=None):
+    """
+    Encode ids as their int32 codes.
+    :param encoding: (IdEncoding) as returned by build
+    :param values: (pd.Series / np.ndarray / list) ids to encode, which may be categorical
+    :param fallback: optional (IdEncoding) encoding of ids not within encoding
+    :return: (np.ndarray) int32 code of each id, MISSING_CODE for null ids and UNKNOWN_CODE for
+    ids within neither encoding
+    :raises TypeError: if encoding or fallback is not an IdEncoding
+    """
+    if not isinstance(encoding, IdEncoding) or not isinstance(fallback, (IdEncoding, type(None))):
+        raise TypeError("encoding must be a valid IdEncoding")
+    if fallback is not None and len(encoding.ids) == 0:
+        return encode(fallback, values)
+    if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+        # each category is looked up once, and taken by the category code of each value
+        category_codes = np.append(encode(encoding, values.cat.categories, fallback), MISSING_CODE)
+        return category_codes[np.asarray(values.cat.codes)]
+    values = np.asarray(values, dtype=object)
+    positions = encoding.lookup.get_indexer(values)
+    # the appended UNKNOWN_CODE is taken by ids not found (-1)
+    codes = np.append(encoding.codes, UNKNOWN_CODE)[positions]
+    if fallback is not None and (positions < 0).any():
+        codes[positions < 0] = encode(fallback, values[positions < 0])
+    codes[pd.isna(values)] = MISSING_CODE
+    return codes.astype(np.int32)
+
+
+def decode(encoding, codes, fallback=None):
+    """
+    Decode int32 codes back into their ids.
+    :param encoding: (IdEncoding) as returned by build
+    :param codes: (np.ndarray / pd.Series) codes, as returned by encode
+    :param fallback: optional (IdEncoding) encoding of codes outwith the range of encoding
+    :return: (np.ndarray) object array of ids, None for MISSING_CODE, UNKNOWN_CODE or codes
+    within neither encoding
+    :raises TypeError: if encoding or fallback is not an IdEncoding
+    """
+    if not isinstance(encoding, IdEncoding) or not isinstance(fallback, (IdEncoding, type(None))):
+        raise TypeError("encoding must be a valid IdEncoding")
+    codes = np.asarray(codes, dtype=np.int64)
+    positions = codes - encoding.start
+    within = (positions >= 0) & (positions < len(encoding.ids))
+    # the appended None is taken by codes outwith the encoding (-1)
+    ids = np.append(encoding.ids, None)[np.where(within, positions, -1)]
+    if fallback is not None and not within.all():
+        ids[~within] = decode(fallback, codes[~within])
+    return ids
+
+
+def unregistered(encoding, values):
+    """
+    Return the unique ids not yet registered within an encoding, in order of first appearance.
+    :param encoding: (IdEncoding) as returned by build
+    :param values: (pd.Series / np.ndarray / list) ids, which may be null
+    :return: (list) unregistered ids
+    """
+    unique = pd.Series(pd.unique(pd.Series(values).dropna()), dtype=object)
+    return unique[~unique.isin(encoding.lookup)].tolist()
@@ -0,0 +1,187 @@
+"""
+Utility functions to recommend games by matrix factorisation of a user x game rating matrix.
+Each user's scores are centred around their mean, and the centred matrix approximated by the
+product of a latent factor vector per user and per game, found by alternating least squares (ALS):
+user factors are solved with game factors fixed, then game factors with user factors fixed.
+Rows with the same number of reviews are solved together, as a batch of k x k systems, so a
+training iteration costs O(reviews x k^2) however active each user is.
+A user's predicted score of every game is then their mean plus a single vector x matrix product.
+"""
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from . import sparse
+
+FactorModel = namedtuple(
+    "FactorModel",
+    ["user_factors", "game_factors", "user_means", "user_ids", "game_ids"]
+)
+
+
+def train(matrix, factors=16, regularisation=0.1, iterations=15, model=None, seed=0, user_means=None):
+    """
+    Fit user and game factors to a rating matrix by alternating least squares.
+    :param matrix: (sparse.RatingMatrix) user x game rating matrix
+    :param factors: optional (int) number of latent factors per user and game
+    :param regularisation: optional (float) weight of the penalty on the size of factors, scaled
+    by the number of reviews of each user and game
+    :param iterations: optional (int) number of alternations of solving users then games
+    :param model: optional (FactorModel) previously trained model to warm start from, e.g. before
+    new reviews were added. Its factors are kept for the users and games it holds, so fewer
+    iterations are needed, and factors is taken from it.
+    :param seed: optional (int) seed of the random initial factors of users and games not in model
+    :param user_means: optional (np.ndarray) mean score of each row's user, which factors are fit
+    around, e.g. from maintained per-user aggregates, rather than calculated from matrix. Users
+    without a mean (NaN) take the mean of their row.
+    :return: (FactorModel) with user_ids and game_ids of matrix
+    :raises TypeError: if arguments are not as expected.
+    """
+    if not isinstance(matrix, sparse.RatingMatrix):
+        raise TypeError("matrix must be a valid sparse.RatingMatrix")
+    if model is not None and not isinstance(model, FactorModel):
+        raise TypeError("model must be a valid FactorModel")
+    if type(factors) != int or factors < 1:
+        raise TypeError("factors must be a positive int")
+    if type(iterations) != int or iterations < 0:
+        raise TypeError("iterations must be a non negative int")
+    if type(regularisation) not in [int, float] or regularisation <= 0:
+        raise TypeError("regularisation must be a positive number")
+    if user_means is not None and (
+        not isinstance(user_means, np.ndarray) or user_means.shape != (len(matrix.row_ids),)
+    ):
+        raise TypeError("user_means must be a np.ndarray of the mean of each row")
+
+    rng = np.random.default_rng(seed)
+    if model is not None:
+        factors = model.user_factors.shape[1]
+    user_factors = rng.normal(0, 0.1, (len(matrix.row_ids), factors))
+    game_factors = rng.normal(0, 0.1, (len(matrix.column_ids), factors))
+    if model is not None:
+        _warm_start(user_factors, matrix.row_ids, model.user_factors, model.user_ids)
+        _warm_start(game_factors, matrix.column_ids, model.game_factors, model.game_ids)
+
+    if user_means is None:
+        user_means = sparse.row_means(matrix)
+    elif np.isnan(user_means).any():
+        user_means = np.where(np.isnan(user_means), sparse.row_means(matrix), user_means)
+    centred = sparse.centre_rows(matrix, user_means)
+    transposed = sparse.transpose(centred)
+    for _ in range(iterations):
+        user_factors = _solve_rows(centred, game_factors, regularisation)
+        game_factors = _solve_rows(transposed, user_factors, regularisation)
+    return FactorModel(
+        user_factors,
+        game_factors,
+        user_means,
+        np.asarray(matrix.row_ids, dtype=object),
+        np.asarray(matrix.column_ids, dtype=object)
+    )
+
+
+def user_recommendations(model, matrix, user_id):
+    """
+    Predict scores of games a user has not reviewed, as their mean score plus the dot product of
+    their factors with those of every game.
+    :param model: (FactorModel) as returned by train
+    :param matrix: (sparse.RatingMatrix) user x game rating matrix, of the reviews to exclude
+    :param user_id: (str) user id to recommend games to
+    :return: (pd.DataFrame) game_id and predicted_score of each unreviewed game, in desc. order of
+    predicted_score. Empty if the model holds no factors for user_id.
+    :raises TypeError: if arguments are not as expected.
+    """
+    if not isinstance(model, FactorModel):
+        raise TypeError("model must be a valid FactorModel")
+    if not isinstance(matrix, sparse.RatingMatrix):
+        raise TypeError("matrix must be a valid sparse.RatingMatrix")
+
+    users = pd.Index(model.user_ids)
+    if user_id not in users:
+        return pd.DataFrame(columns=["game_id", "predicted_score"])
+    user = users.get_loc(user_id)
+    predicted = model.user_means[user] + model.game_factors @ model.user_factors[user]
+
+    unreviewed = np.ones(len(model.game_ids), dtype=bool)
+    matrix_users = pd.Index(matrix.row_ids)
+    if user_id in matrix_users:
+        _, reviewed, _ = sparse.gather_rows(matrix, [matrix_users.get_loc(user_id)])
+        positions = pd.Index(model.game_ids).get_indexer(matrix.column_ids[reviewed])
+        unreviewed[positions[positions >= 0]] = False
+    recommendations = pd.DataFrame({
+        "game_id": model.game_ids[unreviewed],
+        "predicted_score": predicted[unreviewed]
+    })
+    return recommendations.sort_values(
+        by=["predicted_score", "game_id"],
+        ascending=[False, True]
+    ).reset_index(drop=True)
+
+
+def save(model, file):
+    """
+    Persist a model as an .npz archive, replacing any existing file.
+    :param model: (FactorModel)
+    :param file: (str) location of the .npz file
+    :return: None
+    :raises TypeError: if model is not a FactorModel
+    """
+    if not isinstance(model, FactorModel):
+        raise TypeError("model must be a valid FactorModel")
+    arrays = model._asdict()
+    for name in ["user_ids", "game_ids"]:
+        arrays[name] = np.asarray(arrays[name], dtype=str)
+    sparse.save_arrays(arrays, file)
+
+
+def load(file):
+    """
+    Load a model persisted by save.
+    :param file: (str) location of the .npz file
+    :return: (FactorModel) with ids as object arrays
+    :raises FileNotFoundError: if file does not exist
+    :raises ValueError: if file is not a persisted model
+    """
+    with np.load(file) as archive:
+        if not set(FactorModel._fields).issubset(archive.files):
+            raise ValueError("{} is not a persisted factor model".format(file))
+        arrays = {name: archive[name] for name in FactorModel._fields}
+    for name in ["user_ids", "game_ids"]:
+        arrays[name] = np.asarray(arrays[name], dtype=object)
+    return FactorModel(**arrays)
+
+
+def _warm_start(factors, ids, model_factors, model_ids):
+    # factors of ids already within the model are taken from it
+    positions = pd.Index(model_ids).get_indexer(ids)
+    known = positions >= 0
+    factors[known] = model_factors[positions[known]]
+
+
+def _solve_rows(matrix, fixed, regularisation):
+    # least squares factors of every row of matrix, given the fixed factors of its columns:
+    # (F_r' F_r + regularisation * n_r * I) x_r = F_r' v_r, for the n_r entries v_r of row r
+    n_rows, factors = len(matrix.indptr) - 1, fixed.shape[1]
+    counts = np.diff(matrix.indptr)
+    output = np.zeros((n_rows, factors))
+    # rows with the same number of entries are stacked into (rows x entries x factors) batches,
+    # each solved by batched matrix products, of at most block_values values at a time
+    order = np.argsort(counts, kind="stable")
+    groups = np.split(order, np.flatnonzero(np.diff(counts[order])) + 1)
+    for group in groups:
+        length = counts[group[0]]
+        if length == 0:
+            # rows without entries keep zero factors
+            continue
+        block_rows = max(1, block_values // (length * factors))
+        for block in range(0, len(group), block_rows):
+            rows = group[block:block + block_rows]
+            entries = matrix.indptr[rows][:, None] + np.arange(length)
+            vectors = fixed[matrix.indices[entries]]
+            transposed = vectors.transpose(0, 2, 1)
+            gram = transposed @ vectors + regularisation * length * np.eye(factors)
+            rhs = transposed @ matrix.data[entries][:, :, None]
+            output[rows] = np.linalg.solve(gram, rhs)[:, :, 0]
+    return output
+
+
+# values of fixed factors gathered at once while solving a batch of rows
+block_values = 4 * 1024 * 1024
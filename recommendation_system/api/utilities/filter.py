@@ -1,29 +1,135 @@
 """
 Utility function to filter a given input by various arguments.
+Multi-valued ("keywords", "mechanic") and categorical ("game_type", "genre") columns are filtered
+through an inverted index of term -> sorted row positions (posting list), so that a filter costs
+time proportional to the rows matched rather than a scan of the whole input.
 """
+from collections import namedtuple
+from functools import reduce
+import re
+import numpy as np
 import pandas as pd
+from .content import split_terms
 
+InvertedIndex = namedtuple("InvertedIndex", ["n_rows", "postings"])
 
-def data_frame(input_df, filter_dict):
+
+def data_frame(input_df, filter_dict, index=None):
     """
-    Filter a given data frame by a dictionary of key-value pairs.
-    Currently only supports equality matches ("a" == "a").
+    Filter a given data frame by a dictionary of key-value pairs, combined in AND fashion.
+    Indexed columns (see indexed_terms) match individual, case-insensitive terms, with values
+    given as an expression of terms:
+        "a, b" or "a & b" - rows with both terms a and b
+        "a | b" - rows with either term a or b ("|" binds loosest)
+        "!a" - rows without term a
+    e.g. "Fantasy, !Horror | Mystery" matches (Fantasy and not Horror) or Mystery.
+    All other columns only support equality matches ("a" == "a").
     :param input_df: (pd.DataFrame) input pandas data frame before filter
     :param filter_dict: optional (dict) key-value pairs by which to filter given input item_list
+    :param index: optional (InvertedIndex) index of input_df as returned by build_index, built
+    on demand if None and an indexed column is filtered.
     :return: output_df: (pd.DataFrame) output pandas data frame after filter
     :raises: TypeError: if arguments are not as expected
     :raises: KeyError: if given key within filter_dict does not exist within input_df.
+    :raises: ValueError: if given index was not built from input_df
     """
     # test arguments: input_df is as expected and filter_dict is dict of at least 1 key-value pair
     if not isinstance(input_df, pd.DataFrame):
         raise TypeError("input_df must be a valid data frame")
     if type(filter_dict) != dict or len(filter_dict) == 0:
         raise TypeError("filter_dict must be a dictionary with at least one key-value pair")
-    # iterate over filter keys and query by key-value pair
+    missing = [key for key in filter_dict if key not in input_df.columns]
+    if missing:
+        raise KeyError("Invalid filter_dict given: {}".format(", ".join(missing)))
+
+    indexed = {key: value for key, value in filter_dict.items() if key in indexed_terms}
     output_df = input_df
-    for key in filter_dict:
-        try:
-            output_df = output_df.query(key+'=="'+filter_dict[key]+'"')
-        except NameError as err:
-            raise KeyError("Invalid filter_dict given: {}".format(err)) from None
+    if indexed:
+        if index is None:
+            index = build_index(input_df, list(indexed))
+        if index.n_rows != len(input_df):
+            raise ValueError("index must be built from input_df")
+        # intersect the smallest posting lists first
+        matches = sorted(
+            (match(index, key, value) for key, value in indexed.items()),
+            key=len
+        )
+        output_df = input_df.iloc[reduce(_intersect, matches)]
+    # iterate over remaining filter keys and filter by equality
+    for key, value in filter_dict.items():
+        if key not in indexed:
+            output_df = output_df.loc[output_df[key] == value]
     return output_df
+
+
+def build_index(input_df, columns=None):
+    """
+    Build an inverted index of term -> sorted row positions for given columns of a data frame.
+    :param input_df: (pd.DataFrame) input pandas data frame to index
+    :param columns: optional (str list) columns to index, all indexed_terms present if None
+    :return: (InvertedIndex)
+    :raises: TypeError: if arguments are not as expected
+    """
+    if not isinstance(input_df, pd.DataFrame):
+        raise TypeError("input_df must be a valid data frame")
+    if columns is None:
+        columns = [column for column in indexed_terms if column in input_df.columns]
+
+    postings = {}
+    for column in columns:
+        if column in multi_value_terms:
+            terms = split_terms(input_df[column])
+        else:
+            terms = input_df[column].astype(object).fillna("").astype(str).str.strip().apply(
+                lambda value: [value] if value else []
+            )
+        # exploded index is the row position of each term
+        exploded = terms.reset_index(drop=True).explode().dropna().str.lower()
+        positions = exploded.index.to_numpy(dtype=np.int64)
+        postings[column] = {
+            term: np.unique(positions[locations])
+            for term, locations in exploded.groupby(exploded.to_numpy()).indices.items()
+        }
+    return InvertedIndex(len(input_df), postings)
+
+
+def match(index, column, expression):
+    """
+    Return the sorted row positions matching a term expression (see data_frame) on a column.
+    :param index: (InvertedIndex) as returned by build_index
+    :param column: (str) indexed column
+    :param expression: (str) term expression
+    :return: (np.ndarray) sorted row positions
+    :raises: KeyError: if column is not indexed
+    """
+    if column not in index.postings:
+        raise KeyError("Column is not indexed: {}".format(column))
+    postings = index.postings[column]
+    empty = np.array([], dtype=np.int64)
+
+    groups = []
+    for group in str(expression).split("|"):
+        terms = [term.strip().lower() for term in re.split("[,&]", group) if term.strip()]
+        include = [term for term in terms if not term.startswith("!")]
+        exclude = [term[1:].strip() for term in terms if term.startswith("!")]
+        if include:
+            lists = sorted((postings.get(term, empty) for term in include), key=len)
+            positions = reduce(_intersect, lists)
+        elif exclude:
+            # only negated terms, so start from every row
+            positions = np.arange(index.n_rows)
+        else:
+            continue
+        for term in exclude:
+            positions = np.setdiff1d(positions, postings.get(term, empty), assume_unique=True)
+        groups.append(positions)
+    return reduce(np.union1d, groups, empty)
+
+
+def _intersect(a, b):
+    return np.intersect1d(a, b, assume_unique=True)
+
+
+multi_value_terms = ["keywords", "mechanic"]
+categorical_terms = ["game_type", "genre"]
+indexed_terms = multi_value_terms + categorical_terms
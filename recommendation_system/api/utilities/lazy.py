@@ -0,0 +1,49 @@
+"""
+Utility function to defer the import of a module until it is first used.
+A lazily imported module is registered under its name straight away as a placeholder, so that
+any later "import name" statement receives it without cost. The module itself is only imported
+once an attribute of the placeholder is first accessed, after which the placeholder holds all of
+the module's attributes.
+"""
+import importlib
+import importlib.util
+import sys
+import types
+
+
+def lazy_import(name):
+    """
+    Import a module lazily, unless it has already been imported.
+    :param name: (str) full name of the module, e.g. "pandas"
+    :return: (module)
+    :raises ModuleNotFoundError: if the module cannot be found
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError("No module named '{}'".format(name), name=name)
+    module = _LazyModule(name)
+    module.__spec__ = spec
+    sys.modules[name] = module
+    return module
+
+
+def is_loaded(name):
+    """
+    Test if a module has been imported, rather than only lazily imported.
+    :param name: (str) full name of the module
+    :return: (bool)
+    """
+    return name in sys.modules and not isinstance(sys.modules[name], _LazyModule)
+
+
+class _LazyModule(types.ModuleType):
+    # only called for attributes the placeholder does not (yet) hold
+    def __getattr__(self, attribute):
+        if sys.modules.get(self.__name__) is self:
+            # the module must not find its placeholder while importing itself
+            del sys.modules[self.__name__]
+            module = importlib.import_module(self.__name__)
+            self.__dict__.update(module.__dict__)
+        return getattr(sys.modules[self.__name__], attribute)
@@ -0,0 +1,52 @@
+"""
+Utility functions to serialise changes to a data store table between processes, through an
+advisory lock on a file alongside the table (users.csv -> users.csv.lock).
+Locks are re-entrant within a process, so a function holding a table's lock may call others
+which take it again.
+"""
+from contextlib import contextmanager
+import fcntl
+import os
+
+
+@contextmanager
+def exclusive(file):
+    """
+    Hold the exclusive lock of a table for the duration of a with block, waiting until no other
+    process holds it.
+    :param file: (str) CSV file location of the table
+    :return: None
+    """
+    path = file + lock_suffix
+    if path in _held:
+        _held[path]["count"] += 1
+    else:
+        descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX)
+        except BaseException:
+            os.close(descriptor)
+            raise
+        _held[path] = {"descriptor": descriptor, "count": 1}
+    try:
+        yield
+    finally:
+        _held[path]["count"] -= 1
+        if _held[path]["count"] == 0:
+            descriptor = _held.pop(path)["descriptor"]
+            fcntl.flock(descriptor, fcntl.LOCK_UN)
+            os.close(descriptor)
+
+
+def is_held(file):
+    """
+    Test if this process holds the lock of a table.
+    :param file: (str) CSV file location of the table
+    :return: (bool)
+    """
+    return file + lock_suffix in _held
+
+
+lock_suffix = ".lock"
+# lock files held by this process, mapped to their descriptor and depth of nested holds
+_held = {}
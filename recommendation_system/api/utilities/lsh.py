@@ -0,0 +1,100 @@
+"""
+Utility functions for approximate nearest neighbour search by cosine similarity, using random
+projection locality sensitive hashing (LSH).
+Each of a number of tables hashes a vector to the signs of its projection onto random hyperplanes,
+so similar vectors are likely to share a bucket in at least one table. A query only compares
+itself exactly against vectors sharing a bucket (or a bucket one bit away), rather than all vectors.
+"""
+from collections import namedtuple
+import numpy as np
+
+LshIndex = namedtuple("LshIndex", ["vectors", "ids", "planes", "tables"])
+
+
+def build(vectors, ids, n_tables=8, n_bits=None, seed=0):
+    """
+    Build an LSH index over vectors.
+    :param vectors: (np.ndarray) matrix of vectors, one row per item
+    :param ids: (np.ndarray) id of each row
+    :param n_tables: optional (int) number of hash tables, more tables increase recall
+    :param n_bits: optional (int) hyperplanes per table, more bits reduce bucket sizes.
+    Defaults to log2(number of vectors / 16), so buckets hold around 16 vectors.
+    :param seed: optional (int) random seed of the hyperplanes
+    :return: (LshIndex)
+    :raises TypeError: if arguments are not as expected.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim != 2 or len(vectors) != len(ids):
+        raise TypeError("vectors must be a 2d matrix with one row per id")
+    if n_bits is None:
+        n_bits = int(np.clip(np.log2(max(len(vectors), 1) / 16), 1, 24))
+
+    unit = _unit_rows(vectors)
+    planes = np.random.default_rng(seed).standard_normal(
+        (n_tables, n_bits, vectors.shape[1])
+    ).astype(np.float32)
+    tables = []
+    for codes in _hash(unit, planes):
+        # bucket of each code as a slice of rows sorted by code
+        order = np.argsort(codes, kind="stable")
+        bucket_codes, starts = np.unique(codes[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        tables.append({
+            code: order[start:end] for code, start, end in zip(bucket_codes, starts, ends)
+        })
+    return LshIndex(unit, np.asarray(ids, dtype=object), planes, tables)
+
+
+def query(index, vector, k=10, probe=True):
+    """
+    Return the approximate k most similar vectors to a given vector.
+    :param index: (LshIndex) as returned by build
+    :param vector: (np.ndarray) query vector
+    :param k: optional (int) number of neighbours to return
+    :param probe: optional (bool) also search buckets one bit away from the query's bucket in
+    each table (multi-probe), increasing recall without more tables
+    :return: (tuple) np.ndarrays of row positions and cosine similarities, in desc. order
+    """
+    unit = _unit_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))
+    n_bits = index.planes.shape[1]
+    candidates = []
+    for table, codes in zip(index.tables, _hash(unit, index.planes)):
+        probes = [codes[0]]
+        if probe:
+            probes.extend(codes[0] ^ (1 << np.arange(n_bits, dtype=np.int64)))
+        candidates.extend(table[code] for code in probes if code in table)
+    if len(candidates) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+    candidates = np.unique(np.concatenate(candidates))
+    return _top_k(candidates, index.vectors[candidates] @ unit[0], k)
+
+
+def brute_force(index, vector, k=10):
+    """
+    Return the exact k most similar vectors to a given vector, by comparing against all vectors.
+    :param index: (LshIndex) as returned by build
+    :param vector: (np.ndarray) query vector
+    :param k: optional (int) number of neighbours to return
+    :return: (tuple) np.ndarrays of row positions and cosine similarities, in desc. order
+    """
+    unit = _unit_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))
+    return _top_k(np.arange(len(index.vectors)), index.vectors @ unit[0], k)
+
+
+def _hash(unit, planes):
+    # one int code per vector per table, from the sign bit of each hyperplane projection
+    weights = 1 << np.arange(planes.shape[1], dtype=np.int64)
+    return [((unit @ table_planes.T) > 0) @ weights for table_planes in planes]
+
+
+def _top_k(positions, similarities, k):
+    if len(positions) > k:
+        top = np.argpartition(-similarities, k - 1)[:k]
+        positions, similarities = positions[top], similarities[top]
+    order = np.lexsort((positions, -similarities))
+    return positions[order], similarities[order]
+
+
+def _unit_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
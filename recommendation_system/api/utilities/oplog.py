@@ -0,0 +1,276 @@
+"""
+Utility functions for an append-only operation log kept alongside a data store table.
+Mutations are appended to the log as one JSON line each, rather than rewriting the table:
+    {"op": "insert", "rows": [{column: value, ...}, ...]}
+    {"op": "delete", "column": column, "values": [value, ...]}
+The current state of a table is its last written snapshot with the log replayed on top, until the
+log is compacted into a new snapshot. Each line is flushed to disk before a write returns, and a
+partially written last line (e.g. from a crash mid-append) is ignored on read.
+Replay is idempotent for tables with a key column, as inserted rows whose key already exists are
+skipped, so a crash between writing a compacted snapshot and truncating its log loses nothing.
+"""
+import json
+import os
+import pandas as pd
+
+INSERT = "insert"
+DELETE = "delete"
+
+
+def insert(file, input_df, backend="CSV"):
+    """
+    Append the insert of rows to a table's log.
+    :param file: (str) CSV file location of the table
+    :param input_df: (pd.DataFrame) rows to insert
+    :param backend: optional (str) storage backend of the table
+    :return: (int) size of the log in bytes
+    """
+    return append(file, [insert_operation(input_df)], backend)
+
+
+def delete(file, column, values, backend="CSV"):
+    """
+    Append the delete of rows where a column is any of the given values to a table's log.
+    :param file: (str) CSV file location of the table
+    :param column: (str) column to match
+    :param values: (list) values of column to delete
+    :param backend: optional (str) storage backend of the table
+    :return: (int) size of the log in bytes
+    """
+    return append(file, [delete_operation(column, values)], backend)
+
+
+def insert_operation(input_df):
+    """
+    Return the operation inserting rows, to be appended to a log.
+    :param input_df: (pd.DataFrame) rows to insert
+    :return: (dict)
+    """
+    rows = json.loads(input_df.to_json(orient="records", date_format="iso"))
+    return {"op": INSERT, "rows": rows}
+
+
+def delete_operation(column, values):
+    """
+    Return the operation deleting rows where a column is any of the given values, to be appended
+    to a log.
+    :param column: (str) column to match
+    :param values: (list) values of column to delete
+    :return: (dict)
+    """
+    values = [value.item() if hasattr(value, "item") else value for value in values]
+    return {"op": DELETE, "column": column, "values": values}
+
+
+def append(file, operations, backend="CSV"):
+    """
+    Append operations to a table's log, in a single write flushed to disk.
+    :param file: (str) CSV file location of the table
+    :param operations: (list) operations, as returned by insert_operation and delete_operation
+    :param backend: optional (str) storage backend of the table
+    :return: (int) size of the log in bytes
+    """
+    path = log_path(file, backend)
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, "rb+") as log_file:
+            log_file.seek(-1, os.SEEK_END)
+            if log_file.read(1) != b"\n":
+                # drop a partially written last line, so it is not followed by complete ones
+                log_file.truncate(read(file, backend)[1])
+    lines = b"".join(json.dumps(operation).encode("utf-8") + b"\n" for operation in operations)
+    with open(path, "ab") as log_file:
+        log_file.write(lines)
+        log_file.flush()
+        os.fsync(log_file.fileno())
+        return log_file.tell()
+
+
+def read(file, backend="CSV"):
+    """
+    Read the operations of a table's log.
+    :param file: (str) CSV file location of the table
+    :param backend: optional (str) storage backend of the table
+    :return: (tuple) list of operations, and the byte offset read up to
+    """
+    path = log_path(file, backend)
+    if not os.path.exists(path):
+        return [], 0
+    operations = []
+    offset = 0
+    with open(path, "rb") as log_file:
+        for line in log_file:
+            try:
+                operations.append(json.loads(line))
+            except ValueError:
+                # a partially written line can only ever be the last
+                break
+            offset += len(line)
+    return operations, offset
+
+
+def replay(input_df, operations, key=None):
+    """
+    Apply logged operations to a table's snapshot, in order.
+    :param input_df: (pd.DataFrame) snapshot of the table
+    :param operations: (list) operations as returned by read
+    :param key: optional (str) unique key column of the table, inserted rows with an existing
+    key are skipped
+    :return: (pd.DataFrame) current state of the table
+    """
+    output_df = input_df
+    rows = []
+    for operation in operations:
+        if operation["op"] == INSERT:
+            rows.extend(operation["rows"])
+            continue
+        # contiguous inserts are applied together, before each delete
+        output_df = _insert(output_df, rows, key)
+        rows = []
+        output_df = output_df.loc[~output_df[operation["column"]].isin(operation["values"])]
+    return _insert(output_df, rows, key).reset_index(drop=True)
+
+
+def replay_chunks(chunks, operations, key=None):
+    """
+    Apply logged operations to a table's snapshot read in chunks, with the same result as replay,
+    yielding the current state of the table in chunks so only one chunk is held at a time.
+    Deleted rows are removed from each chunk of the snapshot, and rows inserted by the log
+    follow in a last chunk.
+    :param chunks: (iterable) pd.DataFrame chunks of the snapshot, in order
+    :param operations: (list) operations as returned by read
+    :param key: optional (str) unique key column of the table, inserted rows with an existing
+    key are skipped
+    :return: (generator) of pd.DataFrame chunks
+    """
+    existing = []
+    yield from delete_chunks(chunks, operations, key, existing)
+    inserted_df = inserted_rows(existing, operations, key)
+    if inserted_df is not None and len(inserted_df) > 0:
+        yield inserted_df
+
+
+def delete_chunks(chunks, operations, key=None, existing=None):
+    """
+    Apply the deletes of logged operations to chunks of a table's snapshot, yielding each chunk
+    without its deleted rows. The rows logged inserts add are returned by inserted_rows once every
+    chunk is read, so separate shards of a snapshot can have deletes applied independently.
+    :param chunks: (iterable) pd.DataFrame chunks of the snapshot, or of a shard of it
+    :param operations: (list) operations as returned by read
+    :param key: optional (str) unique key column of the table
+    :param existing: optional (list) to which the snapshot rows inserted_rows depends on are
+    appended, as each chunk is read
+    :return: (generator) of pd.DataFrame chunks
+    """
+    deletes = [operation for operation in operations if operation["op"] == DELETE]
+    inserted_keys = {
+        row.get(key) for operation in operations if operation["op"] == INSERT for row in operation["rows"]
+    }
+    for chunk in chunks:
+        if existing is not None:
+            # snapshot rows sharing a key with inserted rows decide which inserts are skipped
+            existing.append(
+                chunk.loc[chunk[key].isin(inserted_keys)]
+                if key in chunk.columns and len(inserted_keys) > 0 else chunk.iloc[:0]
+            )
+        # every delete is logged after the snapshot, so applies to all of its rows
+        for operation in deletes:
+            chunk = chunk.loc[~chunk[operation["column"]].isin(operation["values"])]
+        yield chunk
+
+
+def inserted_rows(existing, operations, key=None):
+    """
+    Return the rows logged inserts add to a table's snapshot, which follow the snapshot rows once
+    replayed. Used alongside delete_chunks.
+    :param existing: (list) pd.DataFrame rows appended by delete_chunks, for every chunk of the
+    snapshot
+    :param operations: (list) operations as returned by read
+    :param key: optional (str) unique key column of the table, inserted rows with an existing
+    key are skipped
+    :return: (pd.DataFrame) inserted rows, or None if the snapshot held no chunks
+    """
+    if len(existing) == 0:
+        return None
+    existing_df = pd.concat(existing, ignore_index=True)
+    if not any(operation["op"] == INSERT for operation in operations):
+        return existing_df.iloc[:0]
+    replayed = replay(existing_df, operations, key)
+    # snapshot rows come first in the replayed table, and were already yielded with their chunk
+    for operation in operations:
+        if operation["op"] == DELETE:
+            existing_df = existing_df.loc[~existing_df[operation["column"]].isin(operation["values"])]
+    return replayed.iloc[len(existing_df):]
+
+
+def columns(operations):
+    """
+    Return the columns operations match rows on, which must be read to replay them.
+    :param operations: (list) operations as returned by read
+    :return: (str list)
+    """
+    return list(dict.fromkeys(
+        operation["column"] for operation in operations if operation["op"] == DELETE
+    ))
+
+
+def truncate(file, offset, backend="CSV"):
+    """
+    Remove the operations up to a byte offset from a table's log, once compacted into its snapshot.
+    Operations appended after offset are kept.
+    :param file: (str) CSV file location of the table
+    :param offset: (int) byte offset, as returned by read, or None to remove every operation
+    :param backend: optional (str) storage backend of the table
+    :return: None
+    """
+    path = log_path(file, backend)
+    if not os.path.exists(path):
+        return
+    if offset is None:
+        os.remove(path)
+        return
+    with open(path, "rb") as log_file:
+        log_file.seek(offset)
+        tail = log_file.read()
+    if len(tail) == 0:
+        os.remove(path)
+        return
+    with open(path + ".tmp", "wb") as log_file:
+        log_file.write(tail)
+        log_file.flush()
+        os.fsync(log_file.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def signature(file, backend="CSV"):
+    """
+    Return a signature which changes whenever a table's log is written.
+    :param file: (str) CSV file location of the table
+    :param backend: optional (str) storage backend of the table
+    :return: (tuple) modification time (ns), size and inode of the log, or None if there is no log
+    """
+    path = log_path(file, backend)
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def log_path(file, backend="CSV"):
+    """
+    Return the location of a table's log, one per storage backend (games.csv -> games.csv.log).
+    :param file: (str) CSV file location of the table
+    :param backend: optional (str) storage backend of the table
+    :return: (str)
+    """
+    return "{}.{}.log".format(os.path.splitext(file)[0], backend.lower())
+
+
+def _insert(input_df, rows, key):
+    if len(rows) == 0:
+        return input_df
+    rows_df = pd.DataFrame(rows)
+    if key is not None and key in rows_df.columns and key in input_df.columns:
+        rows_df = rows_df.drop_duplicates(key)
+        rows_df = rows_df.loc[~rows_df[key].isin(input_df[key])]
+    rows_df = rows_df[[column for column in rows_df.columns if column in input_df.columns]]
+    return pd.concat([input_df, rows_df], ignore_index=True)
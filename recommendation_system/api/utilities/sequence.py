@@ -0,0 +1,35 @@
+"""
+Utility functions for persisted sequences, which issue increasing numbers for the ids of a table
+without scanning it. Each sequence is a small file alongside its table (users.csv ->
+users.csv.seq) holding the last number issued, read and incremented under an exclusive lock
+of the file itself, so concurrent processes are never issued the same number.
+"""
+import fcntl
+import os
+
+
+def next_value(file, start):
+    """
+    Issue the next number of a table's sequence.
+    :param file: (str) CSV file location of the table
+    :param start: (function) no argument function returning the last number issued before the
+    sequence existed, e.g. the highest id number within the table. Only called once, to
+    initialise the sequence.
+    :return: (int) issued number
+    """
+    descriptor = os.open(file + sequence_suffix, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(descriptor, fcntl.LOCK_EX)
+        content = os.read(descriptor, 64).decode().strip()
+        value = (int(content) if content else int(start())) + 1
+        os.lseek(descriptor, 0, os.SEEK_SET)
+        os.ftruncate(descriptor, 0)
+        os.write(descriptor, str(value).encode())
+        os.fsync(descriptor)
+        return value
+    finally:
+        # closing the descriptor releases the lock
+        os.close(descriptor)
+
+
+sequence_suffix = ".seq"
@@ -0,0 +1,207 @@
+"""
+Utility functions to calculate similarity between users or games, and recommend games from them.
+All calculations operate on sparse rating matrices (see sparse.py), never a dense pivot of
+users x games.
+"""
+import numpy as np
+import pandas as pd
+from . import sparse
+
+
+def user_user_recommendations(matrix, user_id, neighbours=20, similarity="pearson", user_means=None):
+    """
+    Predict scores of games a user has not reviewed from the reviews of their most similar users.
+    Similarity is the cosine of two users' review scores, where "pearson" first centres each
+    user's scores around their mean so that generous and harsh reviewers are comparable.
+    Predicted scores are the similarity weighted mean of neighbours' scores (re-centred on the
+    given user's mean for "pearson").
+    :param matrix: (sparse.RatingMatrix) user x game rating matrix
+    :param user_id: (str) user id to recommend games to
+    :param neighbours: optional (int) number of most similar users to base predictions on
+    :param similarity: optional (str) either "pearson" or "cosine"
+    :param user_means: optional (np.ndarray) mean score of each row's user, e.g. from maintained
+    per-user aggregates, rather than calculated from matrix. Users without a mean (NaN) take the
+    mean of their row.
+    :return: (pd.DataFrame) game_id, predicted_score and neighbour_count of each unreviewed game
+    reviewed by at least one neighbour, in desc. order of predicted_score.
+    Empty if user_id has no reviews or no similar users.
+    :raises TypeError: if arguments are not as expected.
+    """
+    if not isinstance(matrix, sparse.RatingMatrix):
+        raise TypeError("matrix must be a valid sparse.RatingMatrix")
+    if type(neighbours) != int or neighbours < 1:
+        raise TypeError("neighbours must be a positive int")
+    if similarity not in valid_similarity:
+        raise TypeError("similarity must be one of the following: {}".format(", ".join(valid_similarity)))
+    if user_means is not None and (
+        not isinstance(user_means, np.ndarray) or user_means.shape != (len(matrix.row_ids),)
+    ):
+        raise TypeError("user_means must be a np.ndarray of the mean of each row")
+
+    empty = pd.DataFrame(columns=["game_id", "predicted_score", "neighbour_count"])
+    users = pd.Index(matrix.row_ids)
+    if user_id not in users:
+        return empty
+    user = users.get_loc(user_id)
+
+    if user_means is None:
+        user_means = sparse.row_means(matrix)
+    elif np.isnan(user_means).any():
+        user_means = np.where(np.isnan(user_means), sparse.row_means(matrix), user_means)
+    values = sparse.centre_rows(matrix, user_means) if similarity == "pearson" else matrix
+    norms = np.sqrt(
+        np.bincount(sparse.row_positions(values), weights=values.data ** 2, minlength=len(users))
+    )
+
+    # dot product of the user's scores with every other user's, through the game x user
+    # transpose, so only users sharing a reviewed game are touched
+    _, user_games, user_scores = sparse.gather_rows(values, [user])
+    owner, other_users, other_scores = sparse.gather_rows(sparse.transpose(values), user_games)
+    dots = np.bincount(other_users, weights=user_scores[owner] * other_scores, minlength=len(users))
+    denominators = norms[user] * norms
+    similarities = np.divide(dots, denominators, out=np.zeros(len(users)), where=denominators > 0)
+    similarities[user] = 0
+
+    # top-k positively similar users, by partial selection rather than a full sort
+    candidates = np.flatnonzero(similarities > 0)
+    if len(candidates) == 0:
+        return empty
+    if len(candidates) > neighbours:
+        candidates = candidates[np.argpartition(-similarities[candidates], neighbours - 1)[:neighbours]]
+
+    owner, games, scores = sparse.gather_rows(values, candidates)
+    weights = similarities[candidates][owner]
+    n_games = len(matrix.column_ids)
+    weighted_sums = np.bincount(games, weights=weights * scores, minlength=n_games)
+    weight_totals = np.bincount(games, weights=weights, minlength=n_games)
+    neighbour_counts = np.bincount(games, minlength=n_games)
+
+    unreviewed = neighbour_counts > 0
+    unreviewed[user_games] = False
+    predicted = weighted_sums[unreviewed] / weight_totals[unreviewed]
+    if similarity == "pearson":
+        predicted = predicted + user_means[user]
+
+    recommendations = pd.DataFrame({
+        "game_id": matrix.column_ids[unreviewed],
+        "predicted_score": predicted,
+        "neighbour_count": neighbour_counts[unreviewed]
+    })
+    return recommendations.sort_values(
+        by=["predicted_score", "neighbour_count"],
+        ascending=False
+    ).reset_index(drop=True)
+
+
+def item_item_neighbours(matrix, neighbours=20):
+    """
+    Calculate the most similar games of every game, from the users who interacted with both.
+    Similarity is the cosine of two games' binary user interaction vectors, i.e. the number of
+    users shared divided by the geometric mean of each game's number of users.
+    :param matrix: (sparse.RatingMatrix) user x game matrix, any entry counts as an interaction
+    :param neighbours: optional (int) number of most similar games to keep per game
+    :return: (pd.DataFrame) game_id, neighbour_id and similarity, ordered by game_id then desc.
+    similarity
+    :raises TypeError: if arguments are not as expected.
+    """
+    if not isinstance(matrix, sparse.RatingMatrix):
+        raise TypeError("matrix must be a valid sparse.RatingMatrix")
+    if type(neighbours) != int or neighbours < 1:
+        raise TypeError("neighbours must be a positive int")
+
+    n_games = len(matrix.column_ids)
+    columns = sparse.transpose(matrix)
+    game_users = np.diff(columns.indptr)
+    # co-interactions reached through each game's users, by which games are grouped into blocks
+    # of about neighbour_block_pairs co-interactions, bounding memory whatever the catalogue size
+    user_games = np.diff(matrix.indptr)
+    game_pairs = np.bincount(sparse.row_positions(columns), weights=user_games[columns.indices], minlength=n_games)
+    cumulative = np.cumsum(game_pairs)
+    bounds = np.searchsorted(
+        cumulative,
+        np.arange(neighbour_block_pairs, cumulative[-1] if n_games > 0 else 0, neighbour_block_pairs),
+        side="right"
+    )
+    bounds = np.unique(np.r_[0, bounds, n_games]).astype(np.int64)
+    rows = {"game_id": [], "neighbour_id": [], "similarity": []}
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        games, neighbour_ids, similarities = _block_neighbours(matrix, columns, game_users, start, end, neighbours)
+        rows["game_id"].append(matrix.column_ids[games])
+        rows["neighbour_id"].append(matrix.column_ids[neighbour_ids])
+        rows["similarity"].append(similarities)
+
+    if sum(len(games) for games in rows["game_id"]) == 0:
+        return pd.DataFrame(columns=list(rows))
+    return pd.DataFrame({key: np.concatenate(value) for key, value in rows.items()})
+
+
+def _block_neighbours(matrix, columns, game_users, start, end, neighbours):
+    # co-interaction counts of each game in start:end with every game sharing a user with it,
+    # counted over the pairs themselves rather than a row of every game
+    n_games = len(matrix.column_ids)
+    game_owner, users, _ = sparse.gather_rows(columns, np.arange(start, end))
+    user_owner, others, _ = sparse.gather_rows(matrix, users)
+    games = game_owner[user_owner] + start
+    pairs, shared = np.unique(games.astype(np.int64) * n_games + others, return_counts=True)
+    games, others = pairs // n_games, pairs % n_games
+    keep = games != others
+    games, others, shared = games[keep], others[keep], shared[keep]
+    similarities = shared / np.sqrt(game_users[games] * game_users[others])
+    # column_ids are sorted, so games and ties between neighbours are in game_id order
+    order = np.lexsort((others, -similarities, games))
+    games, others, similarities = games[order], others[order], similarities[order]
+    group_starts = np.flatnonzero(np.r_[True, games[1:] != games[:-1]]) if len(games) > 0 else games
+    ranks = np.arange(len(games)) - np.repeat(group_starts, np.diff(np.r_[group_starts, len(games)]))
+    top = ranks < neighbours
+    return games[top], others[top], similarities[top]
+
+
+def neighbour_lists(neighbour_df):
+    """
+    Index neighbour data by game, for lookups independent of the number of games.
+    :param neighbour_df: (pd.DataFrame) as returned by item_item_neighbours
+    :return: (dict) game_id: (neighbour_ids, similarities) np.ndarray tuple
+    """
+    neighbour_ids = neighbour_df["neighbour_id"].to_numpy(dtype=object)
+    similarities = neighbour_df["similarity"].to_numpy(dtype=float)
+    return {
+        game_id: (neighbour_ids[positions], similarities[positions])
+        for game_id, positions in neighbour_df.groupby("game_id").indices.items()
+    }
+
+
+def item_item_recommendations(neighbour_lookup, history):
+    """
+    Rank games by the sum of their similarity to each game within a user's history.
+    Only the neighbour lists of history games are read, so cost is O(history x neighbours).
+    :param neighbour_lookup: (dict) as returned by neighbour_lists
+    :param history: (list) game_ids the user has reviewed or collected
+    :return: (pd.DataFrame) game_id, similarity_score and neighbour_count (number of history games
+    it neighbours) of each game outwith history, in desc. order of similarity_score
+    :raises TypeError: if arguments are not as expected.
+    """
+    if type(neighbour_lookup) != dict:
+        raise TypeError("neighbour_lookup must be a dictionary as returned by neighbour_lists")
+
+    history = sorted(set(history))
+    lists = [neighbour_lookup[game_id] for game_id in history if game_id in neighbour_lookup]
+    if len(lists) == 0:
+        return pd.DataFrame(columns=["game_id", "similarity_score", "neighbour_count"])
+    merged = pd.DataFrame({
+        "game_id": np.concatenate([neighbour_ids for neighbour_ids, _ in lists]),
+        "similarity_score": np.concatenate([similarities for _, similarities in lists])
+    })
+    merged = merged[~merged["game_id"].isin(history)]
+    recommendations = merged.groupby("game_id").agg(
+        similarity_score=("similarity_score", "sum"),
+        neighbour_count=("similarity_score", "size")
+    ).reset_index()
+    return recommendations.sort_values(
+        by=["similarity_score", "neighbour_count", "game_id"],
+        ascending=[False, False, True]
+    ).reset_index(drop=True)
+
+
+valid_similarity = ["pearson", "cosine"]
+# co-interactions counted at a time while finding neighbours, bounding memory per block of games
+neighbour_block_pairs = 2 ** 22
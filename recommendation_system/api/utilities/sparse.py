@@ -0,0 +1,223 @@
+"""
+Utility functions to hold review scores as a sparse user x game rating matrix.
+Matrices are kept in compressed sparse row (CSR) form using NumPy arrays only, so memory is
+proportional to the number of reviews rather than users x games:
+    indptr - (n_rows + 1) offsets, row i's entries are indices[indptr[i]:indptr[i + 1]]
+    indices - column of each entry, sorted within each row
+    data - value of each entry
+Matrices are persisted as uncompressed .npz archives (see save), whose arrays are memory-mapped
+on load rather than read, so a matrix is ready without parsing and pivoting reviews again.
+"""
+from collections import namedtuple
+import os
+import struct
+import zipfile
+import numpy as np
+import pandas as pd
+from . import storage
+
+RatingMatrix = namedtuple("RatingMatrix", ["indptr", "indices", "data", "row_ids", "column_ids"])
+
+
+def rating_matrix(review_df, score="overall_score"):
+    """
+    Build a CSR user x game matrix of a given review score.
+    If a user has reviewed a game more than once, their latest review is used.
+    :param review_df: (pd.DataFrame) input review data
+    :param score: optional (str) review score column to use as matrix values
+    :return: (RatingMatrix) with row_ids of user_ids and column_ids of game_ids, each sorted
+    :raises TypeError: if arguments are not as expected.
+    """
+    if not isinstance(review_df, pd.DataFrame):
+        raise TypeError("review_df must be a valid data frame of review data")
+    if score not in review_df.columns:
+        raise TypeError("score must be a column of review_df")
+
+    reviews = review_df.drop_duplicates(["user_id", "game_id"], keep="last")
+    user_codes, user_ids = pd.factorize(reviews["user_id"], sort=True)
+    game_codes, game_ids = pd.factorize(reviews["game_id"], sort=True)
+    return from_coordinates(
+        user_codes,
+        game_codes,
+        reviews[score].to_numpy(dtype=float),
+        np.asarray(user_ids, dtype=object),
+        np.asarray(game_ids, dtype=object)
+    )
+
+
+def from_coordinates(rows, columns, values, row_ids, column_ids):
+    """
+    Build a CSR matrix from (row, column, value) coordinates, which must be unique.
+    :param rows: (np.ndarray) int row position of each value
+    :param columns: (np.ndarray) int column position of each value
+    :param values: (np.ndarray) values
+    :param row_ids: (np.ndarray) id of each row
+    :param column_ids: (np.ndarray) id of each column
+    :return: (RatingMatrix)
+    """
+    order = np.lexsort((columns, rows))
+    indptr = np.zeros(len(row_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(row_ids)), out=indptr[1:])
+    return RatingMatrix(
+        indptr,
+        np.asarray(columns)[order].astype(np.int32),
+        np.asarray(values, dtype=float)[order],
+        row_ids,
+        column_ids
+    )
+
+
+def transpose(matrix):
+    """
+    Return the transpose of a CSR matrix, e.g. game x user from user x game.
+    :param matrix: (RatingMatrix)
+    :return: (RatingMatrix)
+    """
+    return from_coordinates(
+        matrix.indices,
+        row_positions(matrix),
+        matrix.data,
+        matrix.column_ids,
+        matrix.row_ids
+    )
+
+
+def row_positions(matrix):
+    """
+    Return the row position of each entry of a CSR matrix.
+    :param matrix: (RatingMatrix)
+    :return: (np.ndarray)
+    """
+    return np.repeat(np.arange(len(matrix.row_ids)), np.diff(matrix.indptr))
+
+
+def row_means(matrix):
+    """
+    Return the mean of each row's entries, 0 for rows without entries.
+    :param matrix: (RatingMatrix)
+    :return: (np.ndarray)
+    """
+    counts = np.diff(matrix.indptr)
+    sums = np.bincount(row_positions(matrix), weights=matrix.data, minlength=len(counts))
+    return np.divide(sums, counts, out=np.zeros(len(counts)), where=counts > 0)
+
+
+def centre_rows(matrix, means=None):
+    """
+    Return a CSR matrix with each row's mean subtracted from its entries.
+    :param matrix: (RatingMatrix)
+    :param means: optional (np.ndarray) mean of each row, e.g. from maintained aggregates, as
+    calculated by row_means if None
+    :return: (RatingMatrix)
+    """
+    means = row_means(matrix) if means is None else means
+    return matrix._replace(data=matrix.data - means[row_positions(matrix)])
+
+
+def gather_rows(matrix, rows):
+    """
+    Return the entries of given rows of a CSR matrix, without densifying.
+    :param matrix: (RatingMatrix)
+    :param rows: (np.ndarray) int row positions
+    :return: (tuple) of np.ndarrays: position within rows of each entry, column and value
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = matrix.indptr[rows]
+    lengths = matrix.indptr[rows + 1] - starts
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    # offset of each entry within its row, added to the row's start
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    entries = np.repeat(starts, lengths) + offsets
+    return owner, matrix.indices[entries], matrix.data[entries]
+
+
+def to_frame(matrix, names=("row_id", "column_id", "value")):
+    """
+    Return the entries of a CSR matrix as a DataFrame of coordinates, in row order.
+    :param matrix: (RatingMatrix)
+    :param names: optional (tuple) column names of the row id, column id and value of entries
+    :return: (pd.DataFrame)
+    """
+    return pd.DataFrame({
+        names[0]: matrix.row_ids[row_positions(matrix)],
+        names[1]: matrix.column_ids[matrix.indices],
+        names[2]: matrix.data
+    })
+
+
+def save(matrix, file):
+    """
+    Persist a CSR matrix as an uncompressed .npz archive, replacing any existing file. Ids are
+    held as fixed width strings, so the archive can be read without unpickling.
+    :param matrix: (RatingMatrix)
+    :param file: (str) location of the .npz file
+    :return: None
+    :raises TypeError: if matrix is not a RatingMatrix
+    """
+    if not isinstance(matrix, RatingMatrix):
+        raise TypeError("matrix must be a valid sparse.RatingMatrix")
+    arrays = matrix._asdict()
+    for name in ["row_ids", "column_ids"]:
+        arrays[name] = np.asarray(arrays[name], dtype=str)
+    save_arrays(arrays, file)
+
+
+def save_arrays(arrays, file):
+    """
+    Persist named arrays as an uncompressed .npz archive, replacing any existing file. The archive
+    is written to a temporary file renamed over the file, so readers never see a partial archive.
+    :param arrays: (dict) array by name, of fixed width rather than object dtypes
+    :param file: (str) location of the .npz file
+    :return: None
+    """
+    storage.replace_file(file, lambda temp_path: _savez(temp_path, arrays))
+
+
+def _savez(path, arrays):
+    # written through a file object, as savez appends ".npz" to a location without it
+    with open(path, "wb") as npz_file:
+        np.savez(npz_file, **arrays)
+
+
+def load(file, mmap=True):
+    """
+    Load a CSR matrix persisted by save.
+    :param file: (str) location of the .npz file
+    :param mmap: optional (bool) memory-map indptr, indices and data from the archive, so only
+    the entries used are read from disk, rather than reading them into memory
+    :return: (RatingMatrix) with ids as object arrays
+    :raises FileNotFoundError: if file does not exist
+    :raises ValueError: if file is not a persisted matrix
+    """
+    try:
+        with zipfile.ZipFile(file) as archive:
+            members = {os.path.splitext(info.filename)[0]: info for info in archive.infolist()}
+            if not set(RatingMatrix._fields).issubset(members):
+                raise ValueError("{} is not a persisted rating matrix".format(file))
+            arrays = {
+                name: _mapped_array(file, info) if mmap and info.compress_type == zipfile.ZIP_STORED
+                else np.load(archive.open(info))
+                for name, info in members.items() if name in RatingMatrix._fields
+            }
+    except zipfile.BadZipFile:
+        raise ValueError("{} is not a persisted rating matrix".format(file)) from None
+    for name in ["row_ids", "column_ids"]:
+        arrays[name] = np.asarray(arrays[name], dtype=object)
+    return RatingMatrix(**arrays)
+
+
+def _mapped_array(file, info):
+    # an uncompressed member's .npy bytes follow its local header, so are mapped in place
+    with open(file, "rb") as npz_file:
+        npz_file.seek(info.header_offset)
+        name_length, extra_length = struct.unpack("<HH", npz_file.read(30)[26:30])
+        npz_file.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(npz_file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(npz_file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(npz_file)
+        offset = npz_file.tell()
+    if np.prod(shape) == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(file, dtype, "r", offset, shape, "F" if fortran_order else "C")
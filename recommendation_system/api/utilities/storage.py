@@ -0,0 +1,672 @@
+"""
+Utility functions to read and write data store tables through interchangeable storage backends.
+Tables are always addressed by their CSV file location; each backend maps it to its own layout:
+    CSV - the comma separated file itself.
+    NPY - a directory alongside the CSV file (games.csv -> games.npy/), holding one binary NumPy
+    file per column which is memory-mapped on read, so only the requested columns are loaded.
+    SQLITE - a SQLite database alongside the CSV file (games.csv -> games.sqlite), holding the
+    table with an index on each id column, so rows are selected, deleted and queried in SQL
+    without reading the whole table.
+"""
+import io
+import json
+import os
+import shutil
+import sqlite3
+import stat
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+def read(file, columns=None, backend="CSV", dtypes=None):
+    """
+    Read a data store table into a panda's DataFrame.
+    :param file: (str) CSV file location of the table
+    :param columns: optional (str list) columns to read, all columns are read if None
+    :param backend: optional (str) storage backend, one of BACKENDS
+    :param dtypes: optional (dict) column name to dtype, e.g. "category" or "int8", of columns
+    which are not to be inferred. Columns not read are ignored.
+    :return: (pd.DataFrame)
+    :raises FileNotFoundError: if table does not exist in the given backend
+    :raises ValueError: if table cannot be read, or given columns are not within the table
+    """
+    return _backend(backend)["read"](file, columns, dtypes)
+
+
+def read_chunks(file, columns=None, backend="CSV", dtypes=None, chunk_rows=100000):
+    """
+    Read a data store table in chunks of rows, in table order, so a table larger than memory can
+    be processed with at most one chunk held at a time.
+    :param file: (str) CSV file location of the table
+    :param columns: optional (str list) columns to read, all columns are read if None
+    :param backend: optional (str) storage backend, one of BACKENDS
+    :param dtypes: optional (dict) column name to dtype of columns which are not to be inferred.
+    Categories are converted per chunk, so chunks may hold different categories.
+    :param chunk_rows: optional (int) number of rows per chunk, the last chunk may hold fewer
+    :return: (generator) of pd.DataFrame chunks
+    :raises FileNotFoundError: if table does not exist in the given backend
+    :raises ValueError: if table cannot be read, or given columns are not within the table
+    """
+    if type(chunk_rows) != int or chunk_rows < 1:
+        raise TypeError("chunk_rows must be a positive int")
+    return _backend(backend)["chunks"](file, columns, dtypes, chunk_rows)
+
+
+def shards(file, count, backend="CSV", min_bytes=0):
+    """
+    Split a data store table into shards of about equal size, which can be read independently
+    (see read_shard), e.g. by separate processes. CSV tables are split by byte range, each
+    starting at a line, so require that no quoted value holds a line break.
+    :param file: (str) CSV file location of the table
+    :param count: (int) number of shards to split the table into, at most
+    :param backend: optional (str) storage backend, one of SHARDED_BACKENDS
+    :param min_bytes: optional (int) size of the smallest shard, so a small table is split into
+    fewer shards
+    :return: (list) of shards, in table order, each holding at least one row unless the table
+    is empty
+    :raises FileNotFoundError: if table does not exist in the given backend
+    :raises ValueError: if backend does not support shards
+    """
+    if type(count) != int or count < 1:
+        raise TypeError("count must be a positive int")
+    if "shards" not in _backend(backend):
+        raise ValueError("backend must be one of the following: {}".format(", ".join(SHARDED_BACKENDS)))
+    return _backend(backend)["shards"](file, count, min_bytes)
+
+
+def read_shard(file, shard, columns=None, backend="CSV", dtypes=None, chunk_rows=100000):
+    """
+    Read a shard of a data store table in chunks of rows, as read_chunks does for the whole table.
+    :param file: (str) CSV file location of the table
+    :param shard: (tuple) shard of the table, as returned by shards
+    :param columns: optional (str list) columns to read, all columns are read if None
+    :param backend: optional (str) storage backend, one of SHARDED_BACKENDS
+    :param dtypes: optional (dict) column name to dtype of columns which are not to be inferred
+    :param chunk_rows: optional (int) number of rows per chunk, the last chunk may hold fewer
+    :return: (generator) of pd.DataFrame chunks
+    :raises FileNotFoundError: if table does not exist in the given backend
+    :raises ValueError: if shard cannot be read, or given columns are not within the table
+    """
+    if type(chunk_rows) != int or chunk_rows < 1:
+        raise TypeError("chunk_rows must be a positive int")
+    if "shards" not in _backend(backend):
+        raise ValueError("backend must be one of the following: {}".format(", ".join(SHARDED_BACKENDS)))
+    return _backend(backend)["shard"](file, shard, columns, dtypes, chunk_rows)
+
+
+def astype(input_df, dtypes=None):
+    """
+    Convert columns of a DataFrame to the given dtypes, ignoring columns it does not hold.
+    :param input_df: (pd.DataFrame)
+    :param dtypes: optional (dict) column name to dtype
+    :return: (pd.DataFrame) input_df itself if no column is converted
+    :raises ValueError: if a column cannot be converted
+    """
+    dtypes = {column: dtype for column, dtype in (dtypes or {}).items() if column in input_df.columns}
+    if len(dtypes) == 0:
+        return input_df
+    try:
+        return input_df.astype(dtypes)
+    except (TypeError, ValueError) as err:
+        raise ValueError("Invalid Data Store: {}".format(err)) from None
+
+
+def write(input_df, file, mode="w", backend="CSV"):
+    """
+    Write a panda's DataFrame to a data store table.
+    :param input_df: (pd.DataFrame) rows to write
+    :param file: (str) CSV file location of the table
+    :param mode: optional (str) "w" to replace the table, or "a" to append rows to it
+    :param backend: optional (str) storage backend, one of BACKENDS
+    :return: None
+    :raises ValueError: if mode is not "w" or "a"
+    """
+    if mode not in ["w", "a"]:
+        raise ValueError("mode must be either 'w' or 'a'")
+    _backend(backend)["write"](input_df, file, mode)
+
+
+def select(file, column, values, columns=None, backend="CSV", dtypes=None):
+    """
+    Read the rows of a data store table whose column holds one of the given values, in table
+    order. Indexed backends (see INDEXED_BACKENDS) look rows up by index, others filter the
+    whole table once read.
+    :param file: (str) CSV file location of the table
+    :param column: (str) column to match rows on
+    :param values: (list) values of column to select rows of
+    :param columns: optional (str list) columns to read, all columns are read if None
+    :param backend: optional (str) storage backend, one of BACKENDS
+    :param dtypes: optional (dict) column name to dtype of columns which are not to be inferred
+    :return: (pd.DataFrame)
+    :raises FileNotFoundError: if table does not exist in the given backend
+    :raises ValueError: if table cannot be read, or given columns are not within the table
+    """
+    if "select" in _backend(backend):
+        return _backend(backend)["select"](file, column, list(values), columns, dtypes)
+    read_columns = None if columns is None else list(dict.fromkeys(list(columns) + [column]))
+    df = read(file, read_columns, backend, dtypes)
+    df = df.loc[df[column].isin(values)]
+    return df if columns is None else df[list(columns)]
+
+
+def delete(file, column, values, backend="CSV"):
+    """
+    Delete the rows of a data store table whose column holds one of the given values.
+    Indexed backends delete rows in place, others rewrite the table without them.
+    :param file: (str) CSV file location of the table
+    :param column: (str) column to match rows on
+    :param values: (list) values of column to delete rows of
+    :param backend: optional (str) storage backend, one of BACKENDS
+    :return: None
+    :raises FileNotFoundError: if table does not exist in the given backend
+    """
+    if "delete" in _backend(backend):
+        _backend(backend)["delete"](file, column, list(values))
+        return
+    df = read(file, backend=backend)
+    write(df.loc[~df[column].isin(values)], file, "w", backend)
+
+
+def query(file, statement, parameters=(), backend="SQLITE"):
+    """
+    Run a SQL query against a data store table of a backend which supports them, e.g. to
+    aggregate a table without reading it. The table is named {table} within the statement.
+    :param file: (str) CSV file location of the table
+    :param statement: (str) SQL select statement, e.g. "SELECT COUNT(*) FROM {table}"
+    :param parameters: optional (tuple) values of ? placeholders within the statement
+    :param backend: optional (str) storage backend, one of INDEXED_BACKENDS
+    :return: (pd.DataFrame) result of the query
+    :raises FileNotFoundError: if table does not exist in the given backend
+    :raises ValueError: if backend does not support queries, or the query fails
+    """
+    if "query" not in _backend(backend):
+        raise ValueError("backend must be one of the following: {}".format(", ".join(INDEXED_BACKENDS)))
+    return _backend(backend)["query"](file, statement, parameters)
+
+
+def exists(file, backend="CSV"):
+    """
+    Test if a data store table exists in the given backend.
+    :param file: (str) CSV file location of the table
+    :param backend: optional (str) storage backend, one of BACKENDS
+    :return: (bool)
+    """
+    return os.path.exists(_backend(backend)["path"](file))
+
+
+def signature(file, backend="CSV"):
+    """
+    Return a signature which changes whenever a data store table is written.
+    :param file: (str) CSV file location of the table
+    :param backend: optional (str) storage backend, one of BACKENDS
+    :return: (tuple) modification time (ns), size and inode of the table's last written file
+    :raises FileNotFoundError: if table does not exist in the given backend
+    """
+    stat = os.stat(_backend(backend)["path"](file))
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def size(file, backend="CSV"):
+    """
+    Return the size of a data store table as stored, e.g. to decide whether to read it whole.
+    :param file: (str) CSV file location of the table
+    :param backend: optional (str) storage backend, one of BACKENDS
+    :return: (int) bytes of the table's files
+    :raises FileNotFoundError: if table does not exist in the given backend
+    """
+    path = _backend(backend)["path"](file)
+    if backend == "NPY":
+        # a file per column, alongside the column metadata
+        return sum(entry.stat().st_size for entry in os.scandir(os.path.dirname(path)) if entry.is_file())
+    return os.path.getsize(path)
+
+
+def migrate(file, backend):
+    """
+    Copy a CSV table into the given backend, replacing any existing copy.
+    :param file: (str) CSV file location of the table
+    :param backend: (str) storage backend to migrate to, one of BACKENDS
+    :return: (int) number of rows migrated
+    """
+    df = read(file, backend="CSV")
+    if backend != "CSV":
+        write(df, file, "w", backend)
+    return len(df)
+
+
+# CSV BACKEND
+def _csv_read(file, columns, dtypes):
+    if not os.path.exists(file):
+        raise FileNotFoundError(file)
+    dtypes = dtypes or {}
+    # numeric dtypes are parsed directly, whereas categories are converted once parsed, which is
+    # several times faster than the parser's own conversion for high cardinality columns (ids)
+    parsed = {
+        column: dtype for column, dtype in dtypes.items()
+        if dtype != "category" and (columns is None or column in columns)
+    }
+    try:
+        return astype(pd.read_csv(file, usecols=columns, dtype=parsed or None), dtypes)
+    except ValueError as err:
+        raise ValueError("Invalid Data Store: {}".format(err)) from None
+
+
+def _csv_chunks(file, columns, dtypes, chunk_rows):
+    if not os.path.exists(file):
+        raise FileNotFoundError(file)
+    dtypes = dtypes or {}
+    parsed = {
+        column: dtype for column, dtype in dtypes.items()
+        if dtype != "category" and (columns is None or column in columns)
+    }
+    try:
+        reader = pd.read_csv(file, usecols=columns, dtype=parsed or None, chunksize=chunk_rows)
+    except ValueError as err:
+        raise ValueError("Invalid Data Store: {}".format(err)) from None
+    return _chunks(reader, dtypes)
+
+
+def _chunks(reader, dtypes):
+    # errors are only raised once chunks are parsed
+    with reader:
+        while True:
+            try:
+                chunk = next(reader)
+            except StopIteration:
+                return
+            except ValueError as err:
+                raise ValueError("Invalid Data Store: {}".format(err)) from None
+            yield astype(chunk, dtypes)
+
+
+def _csv_shards(file, count, min_bytes):
+    size = os.path.getsize(file)
+    with open(file, "rb") as csv_file:
+        csv_file.readline()
+        bounds = [csv_file.tell()]
+        count = max(1, min(count, (size - bounds[0]) // max(min_bytes, 1)))
+        for shard in range(1, count):
+            # each shard starts after the first line break preceding its even split
+            csv_file.seek(bounds[0] + (size - bounds[0]) * shard // count - 1)
+            csv_file.readline()
+            if bounds[-1] < csv_file.tell() < size:
+                bounds.append(csv_file.tell())
+    return list(zip(bounds, bounds[1:] + [size]))
+
+
+def _csv_shard(file, shard, columns, dtypes, chunk_rows):
+    if not os.path.exists(file):
+        raise FileNotFoundError(file)
+    dtypes = dtypes or {}
+    parsed = {
+        column: dtype for column, dtype in dtypes.items()
+        if dtype != "category" and (columns is None or column in columns)
+    }
+    with open(file, "rb") as csv_file:
+        header = csv_file.readline()
+        csv_file.seek(shard[0])
+        try:
+            if shard[0] >= shard[1]:
+                # the shard of an empty table
+                yield astype(pd.read_csv(io.BytesIO(header), usecols=columns, dtype=parsed or None), dtypes)
+                return
+            reader = pd.read_csv(
+                io.BufferedReader(_ByteRange(csv_file, shard[1] - shard[0])),
+                header=None,
+                names=list(pd.read_csv(io.BytesIO(header), nrows=0).columns),
+                usecols=columns,
+                dtype=parsed or None,
+                chunksize=chunk_rows
+            )
+        except ValueError as err:
+            raise ValueError("Invalid Data Store: {}".format(err)) from None
+        yield from _chunks(reader, dtypes)
+
+
+class _ByteRange(io.RawIOBase):
+    # a file read no further than a given number of bytes from its position
+    def __init__(self, raw_file, size):
+        super().__init__()
+        self.raw_file = raw_file
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        read = self.raw_file.readinto(memoryview(buffer)[:min(len(buffer), self.remaining)])
+        self.remaining -= read
+        return read
+
+
+def _csv_write(input_df, file, mode):
+    if mode == "a":
+        input_df.to_csv(file, mode=mode, index=False, header=False)
+        return
+    # a crash mid-write never truncates the table, and readers only ever see a complete table
+    replace_file(file, lambda temp_path: input_df.to_csv(temp_path, index=False, header=True))
+
+
+# NPY BACKEND
+def _npy_path(file):
+    return os.path.join(os.path.splitext(file)[0] + ".npy", npy_meta_file)
+
+
+def _npy_read(file, columns, dtypes):
+    arrays = _npy_arrays(file, columns)
+    return astype(_npy_frame(arrays, slice(None)), dtypes)
+
+
+def _npy_chunks(file, columns, dtypes, chunk_rows):
+    arrays = _npy_arrays(file, columns)
+    rows = len(next(iter(arrays.values()))[0]) if arrays else 0
+    # only the rows of each chunk are paged in from the memory-mapped columns
+    return (
+        astype(_npy_frame(arrays, slice(start, start + chunk_rows)), dtypes)
+        for start in range(0, rows, chunk_rows)
+    )
+
+
+def _npy_arrays(file, columns):
+    # memory-mapped values and null mask (or None) of each column, by name
+    meta_path = _npy_path(file)
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(meta_path)
+    table_dir = os.path.dirname(meta_path)
+    with open(meta_path, "r") as meta_file:
+        meta = json.load(meta_file)
+    names = [column["name"] for column in meta["columns"]]
+    if columns is None:
+        columns = names
+    missing = set(columns).difference(names)
+    if missing:
+        raise ValueError("Invalid Data Store: missing columns {}".format(", ".join(missing)))
+
+    arrays = {}
+    for name in columns:
+        column = meta["columns"][names.index(name)]
+        values = np.load(os.path.join(table_dir, column["file"]), mmap_mode="r")
+        null = None
+        if column["null"]:
+            null = np.load(os.path.join(table_dir, column["null"]), mmap_mode="r")
+        arrays[name] = (values, null, column["kind"])
+    return arrays
+
+
+def _npy_frame(arrays, rows):
+    data = {}
+    for name, (values, null, kind) in arrays.items():
+        values = values[rows]
+        if kind == "str":
+            # fixed width unicode is converted back to python strings, restoring nulls
+            values = values.astype(object)
+            if null is not None:
+                values[null[rows]] = np.nan
+        data[name] = values
+    return pd.DataFrame(data, columns=list(arrays))
+
+
+def _npy_write(input_df, file, mode):
+    if mode == "a" and os.path.exists(_npy_path(file)):
+        # columns are contiguous arrays, so an append rewrites each column
+        input_df = pd.concat([_npy_read(file, None, None), input_df], ignore_index=True)
+    table_dir = os.path.dirname(_npy_path(file))
+    # write to a fresh directory and swap it in, so readers never see partial columns
+    temp_dir = tempfile.mkdtemp(
+        dir=os.path.dirname(table_dir),
+        prefix=os.path.basename(table_dir) + ".",
+        suffix=".tmp"
+    )
+
+    meta = {"columns": []}
+    for i, name in enumerate(input_df.columns):
+        values = input_df[name]
+        column = {"name": name, "file": "{}.npy".format(i), "kind": "num", "null": None}
+        if values.dtype.kind in "biuf":
+            array = values.to_numpy()
+        else:
+            column["kind"] = "str"
+            null = values.isna().to_numpy()
+            array = values.where(~null, "").astype(str).to_numpy(dtype=str)
+            if null.any():
+                column["null"] = "{}.null.npy".format(i)
+                np.save(os.path.join(temp_dir, column["null"]), null)
+        np.save(os.path.join(temp_dir, column["file"]), array)
+        meta["columns"].append(column)
+    with open(os.path.join(temp_dir, npy_meta_file), "w") as meta_file:
+        json.dump(meta, meta_file)
+
+    # directories cannot be replaced in one rename, so the previous copy is moved aside first
+    old_dir = temp_dir[:-len(".tmp")] + ".old"
+    if os.path.exists(table_dir):
+        os.rename(table_dir, old_dir)
+    os.rename(temp_dir, table_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+# SQLITE BACKEND
+def _sqlite_path(file):
+    return os.path.splitext(file)[0] + ".sqlite"
+
+
+def _sqlite_table(file):
+    return _sqlite_name(os.path.splitext(os.path.basename(file))[0])
+
+
+def _sqlite_name(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _sqlite_connect(file):
+    path = _sqlite_path(file)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    # writers hold the table's lock, so waiting on SQLite's own lock is only ever brief
+    return sqlite3.connect(path, timeout=sqlite_timeout)
+
+
+def _sqlite_run(file, statement, parameters=()):
+    connection = _sqlite_connect(file)
+    try:
+        return pd.read_sql_query(statement, connection, params=parameters)
+    except (sqlite3.Error, pd.errors.DatabaseError) as err:
+        raise ValueError("Invalid Data Store: {}".format(err)) from None
+    finally:
+        connection.close()
+
+
+def _sqlite_columns(file, columns):
+    if columns is None:
+        return "*"
+    # SQLite reads a quoted name which is not a column as a string literal, rather than failing
+    table = os.path.splitext(os.path.basename(file))[0]
+    names = _sqlite_run(file, "SELECT name FROM pragma_table_info(?)", (table,))
+    missing = set(columns).difference(names["name"])
+    if missing:
+        raise ValueError("Invalid Data Store: missing columns {}".format(", ".join(missing)))
+    return ", ".join(_sqlite_name(column) for column in columns)
+
+
+def _sqlite_read(file, columns, dtypes):
+    statement = "SELECT {} FROM {} ORDER BY rowid".format(
+        _sqlite_columns(file, columns), _sqlite_table(file)
+    )
+    return astype(_sqlite_run(file, statement), dtypes)
+
+
+def _sqlite_chunks(file, columns, dtypes, chunk_rows):
+    statement = "SELECT {} FROM {} ORDER BY rowid".format(
+        _sqlite_columns(file, columns), _sqlite_table(file)
+    )
+    return _sqlite_chunk_reader(_sqlite_connect(file), statement, dtypes, chunk_rows)
+
+
+def _sqlite_chunk_reader(connection, statement, dtypes, chunk_rows):
+    try:
+        reader = pd.read_sql_query(statement, connection, chunksize=chunk_rows)
+        for chunk in reader:
+            yield astype(chunk, dtypes)
+    except (sqlite3.Error, pd.errors.DatabaseError) as err:
+        raise ValueError("Invalid Data Store: {}".format(err)) from None
+    finally:
+        connection.close()
+
+
+def _sqlite_select(file, column, values, columns, dtypes):
+    # values are bound in chunks, within SQLite's limit on the number of bound parameters
+    chunks = [values[i:i + sqlite_chunk] for i in range(0, len(values), sqlite_chunk)] or [[]]
+    selected = _sqlite_columns(file, columns)
+    df = pd.concat([
+        _sqlite_run(
+            file,
+            "SELECT {} FROM {} WHERE {} IN ({}) ORDER BY rowid".format(
+                selected,
+                _sqlite_table(file),
+                _sqlite_name(column),
+                ", ".join("?" * len(chunk))
+            ),
+            [_sqlite_value(value) for value in chunk]
+        )
+        for chunk in chunks
+    ], ignore_index=True)
+    return astype(df, dtypes)
+
+
+def _sqlite_delete(file, column, values):
+    connection = _sqlite_connect(file)
+    try:
+        with connection:
+            for i in range(0, len(values), sqlite_chunk):
+                chunk = values[i:i + sqlite_chunk]
+                connection.execute(
+                    "DELETE FROM {} WHERE {} IN ({})".format(
+                        _sqlite_table(file), _sqlite_name(column), ", ".join("?" * len(chunk))
+                    ),
+                    [_sqlite_value(value) for value in chunk]
+                )
+    finally:
+        connection.close()
+
+
+def _sqlite_query(file, statement, parameters):
+    return _sqlite_run(file, statement.format(table=_sqlite_table(file)), parameters)
+
+
+def _sqlite_value(value):
+    # numpy scalars are bound as their python values
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _sqlite_frame(input_df):
+    # categories are stored as their values
+    return input_df.astype({
+        column: object for column in input_df.columns
+        if isinstance(input_df[column].dtype, pd.CategoricalDtype)
+    })
+
+
+def _sqlite_write(input_df, file, mode):
+    path = _sqlite_path(file)
+    table = os.path.splitext(os.path.basename(file))[0]
+    if mode == "a" and os.path.exists(path):
+        connection = sqlite3.connect(path, timeout=sqlite_timeout)
+        try:
+            _sqlite_frame(input_df).to_sql(table, connection, if_exists="append", index=False)
+        finally:
+            connection.close()
+        return
+    # a new database is swapped in, so readers only ever see a complete table
+    replace_file(path, lambda temp_path: _sqlite_create(input_df, temp_path, table))
+
+
+def _sqlite_create(input_df, path, table):
+    connection = sqlite3.connect(path)
+    try:
+        _sqlite_frame(input_df).to_sql(table, connection, index=False)
+        for column in input_df.columns:
+            if column.endswith("_id") or column in sqlite_indexed_terms:
+                connection.execute("CREATE INDEX {} ON {} ({})".format(
+                    _sqlite_name("{}_{}".format(table, column)),
+                    _sqlite_name(table),
+                    _sqlite_name(column)
+                ))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def replace_file(path, writer):
+    """
+    Write a file whole to a temporary file alongside it, flushed to disk and then renamed over
+    path, so a crash mid-write never truncates the file and readers only ever see it complete.
+    Each writer has its own temporary file, removed if writing fails. The file keeps the mode of
+    the file it replaces, or that of a new file under the process's umask.
+    :param path: (str) location of the file to replace
+    :param writer: (function) of the temporary file's location, writing the file's content there
+    :return: None
+    """
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".",
+        prefix=os.path.basename(path) + ".",
+        suffix=".tmp"
+    )
+    os.close(descriptor)
+    try:
+        # temporary files are created readable by their owner only
+        os.chmod(temp_path, _file_mode(path))
+        writer(temp_path)
+        with open(temp_path, "rb+") as temp_file:
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _file_mode(path):
+    if os.path.exists(path):
+        return stat.S_IMODE(os.stat(path).st_mode)
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError("backend must be one of the following: {}".format(", ".join(BACKENDS)))
+    return BACKENDS[backend]
+
+
+npy_meta_file = "columns.json"
+# seconds a SQLite connection waits on another connection's lock
+sqlite_timeout = 30
+# values bound per SQLite statement
+sqlite_chunk = 500
+# columns indexed in SQLite besides id columns (those ending "_id")
+sqlite_indexed_terms = ["username"]
+BACKENDS = {
+    "CSV": {
+        "read": _csv_read,
+        "chunks": _csv_chunks,
+        "write": _csv_write,
+        "path": lambda file: file,
+        "shards": _csv_shards,
+        "shard": _csv_shard
+    },
+    "NPY": {"read": _npy_read, "chunks": _npy_chunks, "write": _npy_write, "path": _npy_path},
+    "SQLITE": {
+        "read": _sqlite_read,
+        "chunks": _sqlite_chunks,
+        "write": _sqlite_write,
+        "path": _sqlite_path,
+        "select": _sqlite_select,
+        "delete": _sqlite_delete,
+        "query": _sqlite_query
+    },
+}
+# backends which select, delete and query rows in place, rather than reading the whole table
+INDEXED_BACKENDS = [name for name, backend in BACKENDS.items() if "query" in backend]
+# backends which split a table into shards, to be read in parallel
+SHARDED_BACKENDS = [name for name, backend in BACKENDS.items() if "shards" in backend]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark approximate (LSH) against brute force nearest neighbour search over game content.
+Reports build time, mean query latency and recall@k of LSH relative to the exact result.
+
+    $ python3 recommendation_system/benchmarks/content_benchmark.py --games 100000
+"""
+from argparse import ArgumentParser
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from api.utilities import content, lsh  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def run(n_games, n_queries, k, n_tables):
+    """
+    Run the benchmark and print its results.
+    :param n_games: (int) size of the synthetic game catalogue
+    :param n_queries: (int) number of random games to query
+    :param k: (int) number of neighbours per query
+    :param n_tables: (int) number of LSH tables
+    :return: None
+    """
+    games = synthetic.games(n_games)
+    start = time.perf_counter()
+    vectors, names = content.encode(games)
+    encoded = time.perf_counter()
+    index = lsh.build(vectors, games["game_id"].to_numpy(), n_tables=n_tables)
+    built = time.perf_counter()
+    print("games: {}  features: {}  encode: {:.2f}s  build: {:.2f}s".format(
+        n_games, len(names), encoded - start, built - encoded))
+
+    queries = np.random.default_rng(1).choice(n_games, n_queries, replace=False)
+    timings = {"lsh": 0.0, "brute force": 0.0}
+    recall = 0
+    for position in queries:
+        start = time.perf_counter()
+        approximate, _ = lsh.query(index, index.vectors[position], k)
+        timings["lsh"] += time.perf_counter() - start
+        start = time.perf_counter()
+        exact, _ = lsh.brute_force(index, index.vectors[position], k)
+        timings["brute force"] += time.perf_counter() - start
+        recall += len(set(approximate).intersection(exact)) / k
+
+    for method, total in timings.items():
+        print("{:>12}: {:.3f}ms / query".format(method, 1000 * total / n_queries))
+    print("recall@{}: {:.3f}".format(k, recall / n_queries))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="LSH vs brute force game content similarity benchmark")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--tables", type=int, default=8)
+    arguments = parser.parse_args()
+    run(arguments.games, arguments.queries, arguments.k, arguments.tables)
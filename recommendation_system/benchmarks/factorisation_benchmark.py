@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark the matrix factorisation (ALS) recommender against user-user collaborative filtering:
+the time to train a model from scratch and to retrain it warm started after new reviews, and the
+median time to recommend games to the most active users, whose neighbourhoods are the largest.
+
+    $ python3 recommendation_system/benchmarks/factorisation_benchmark.py --reviews 1000000
+"""
+from argparse import ArgumentParser
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from api import config  # noqa: E402
+from api.utilities import factorisation, similarity, sparse  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def run(n_reviews, n_users, n_games, n_new, repeat):
+    """
+    Run the benchmark and print its results.
+    :param n_reviews: (int) number of synthetic reviews
+    :param n_users: (int) number of synthetic users
+    :param n_games: (int) number of synthetic games
+    :param n_new: (int) number of new reviews a warm started model is retrained after
+    :param repeat: (int) number of most active users recommendations are timed for
+    :return: None
+    """
+    review_df = synthetic.reviews(n_reviews + n_new, n_users, n_games)
+    matrix = sparse.rating_matrix(review_df.iloc[:n_reviews])
+    print("reviews: {} by {} users of {} games, {} factors".format(
+        len(matrix.data), len(matrix.row_ids), len(matrix.column_ids), config.ALS_FACTORS))
+
+    start = time.perf_counter()
+    model = _train(matrix, config.ALS_ITERATIONS)
+    print("{:>24}: {:>8.2f}s  ({} iterations)".format(
+        "train", time.perf_counter() - start, config.ALS_ITERATIONS))
+    updated = sparse.rating_matrix(review_df)
+    start = time.perf_counter()
+    _train(updated, config.ALS_WARM_ITERATIONS, model)
+    print("{:>24}: {:>8.2f}s  ({} iterations, after {} new reviews)".format(
+        "warm start", time.perf_counter() - start, config.ALS_WARM_ITERATIONS, n_new))
+
+    # most active users first
+    active = matrix.row_ids[np.argsort(-np.diff(matrix.indptr), kind="stable")[:repeat]]
+    print("most active users: {} to {} reviews".format(
+        np.diff(matrix.indptr).max(), np.sort(np.diff(matrix.indptr))[-repeat]))
+    for name, case in [
+        ("USER", lambda user_id: similarity.user_user_recommendations(matrix, user_id)),
+        ("ALS", lambda user_id: factorisation.user_recommendations(model, matrix, user_id)),
+    ]:
+        timings = []
+        for user_id in active:
+            start = time.perf_counter()
+            case(user_id)
+            timings.append(time.perf_counter() - start)
+        print("{:>24}: {:>8.2f}ms".format(name + " recommendations", 1000 * statistics.median(timings)))
+
+
+def _train(matrix, iterations, model=None):
+    return factorisation.train(matrix, config.ALS_FACTORS, config.ALS_REGULARISATION, iterations, model)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--reviews", type=int, default=1000000, help="Synthetic reviews.")
+    parser.add_argument("--users", type=int, default=50000, help="Synthetic users.")
+    parser.add_argument("--games", type=int, default=20000, help="Synthetic games.")
+    parser.add_argument("--new", type=int, default=10000, help="New reviews before a warm start.")
+    parser.add_argument("--repeat", type=int, default=20, help="Active users timed.")
+    arguments = parser.parse_args()
+    run(arguments.reviews, arguments.users, arguments.games, arguments.new, arguments.repeat)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark the loading of games and reviews tables as each endpoint declares them, with only the
+columns it uses and their dtypes, against parsing every column with inferred dtypes.
+Reports the median parse time and the memory held by the resulting DataFrame for each read.
+
+    $ python3 recommendation_system/benchmarks/loading_benchmark.py --games 100000 --reviews 2000000
+"""
+from argparse import ArgumentParser
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from api import games, recommendations, reviews  # noqa: E402
+from api.utilities import storage  # noqa: E402
+import synthetic  # noqa: E402
+
+# (name, table, columns read, dtypes declared) of each endpoint read
+reads = [
+    ("GET GAMES", "games", None, games.game_dtypes),
+    ("filter index", "games", games.game_terms, games.game_dtypes),
+    ("content index", "games", games.game_content_terms, games.game_dtypes),
+    ("GET REVIEWS", "reviews", None, reviews.review_dtypes),
+    ("review aggregates", "reviews", ["game_id"] + reviews.review_terms, reviews.review_dtypes),
+    (
+        "user recommendations",
+        "reviews",
+        ["user_id", "game_id", "overall_score"],
+        recommendations.review_dtypes
+    ),
+]
+
+
+def run(n_games, n_reviews, n_users, repeat):
+    """
+    Run the benchmark and print its results.
+    :param n_games: (int) number of synthetic games
+    :param n_reviews: (int) number of synthetic reviews
+    :param n_users: (int) number of synthetic users
+    :param repeat: (int) number of reads timed per case
+    :return: None
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        files = {
+            "games": os.path.join(directory, "games.csv"),
+            "reviews": os.path.join(directory, "reviews.csv"),
+        }
+        synthetic.games(n_games).to_csv(files["games"], index=False)
+        synthetic.reviews(n_reviews, n_users, n_games).to_csv(files["reviews"], index=False)
+        print("games: {}  reviews: {}  users: {}".format(n_games, n_reviews, n_users))
+
+        inferred = {table: _measure(file, None, None, repeat) for table, file in files.items()}
+        for table, (seconds, size) in inferred.items():
+            print("{:>22}: {:8.1f}ms {:9.1f}MB  (all columns, inferred dtypes)".format(
+                table, 1000 * seconds, size))
+        for name, table, columns, dtypes in reads:
+            seconds, size = _measure(files[table], columns, dtypes, repeat)
+            print("{:>22}: {:8.1f}ms {:9.1f}MB  ({:.1f}x faster, {:.1f}x less memory)".format(
+                name,
+                1000 * seconds,
+                size,
+                inferred[table][0] / seconds,
+                inferred[table][1] / size
+            ))
+
+
+def _measure(file, columns, dtypes, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = storage.read(file, columns, "CSV", dtypes)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=100000, help="Synthetic games.")
+    parser.add_argument("--reviews", type=int, default=2000000, help="Synthetic reviews.")
+    parser.add_argument("--users", type=int, default=50000, help="Synthetic users.")
+    parser.add_argument("--repeat", type=int, default=3, help="Reads timed per case.")
+    arguments = parser.parse_args()
+    run(arguments.games, arguments.reviews, arguments.users, arguments.repeat)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark aggregating a reviews table split into byte range shards, each aggregated by a worker
+process, against the number of workers. A single worker reads the table in chunks within the
+calling process. Reports the median time of each worker count, and its speedup over one worker.
+
+    $ python3 recommendation_system/benchmarks/parallel_benchmark.py --reviews 10000000
+"""
+from argparse import ArgumentParser
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from api import config, reviews  # noqa: E402
+from api.utilities import aggregates  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def run(n_reviews, n_users, n_games, workers, repeat):
+    """
+    Run the benchmark and print its results.
+    :param n_reviews: (int) number of synthetic reviews
+    :param n_users: (int) number of synthetic users
+    :param n_games: (int) number of synthetic games
+    :param workers: (int list) worker counts to time
+    :param repeat: (int) number of times each worker count is timed
+    :return: None
+    """
+    # every table is split, however small
+    config.PARALLEL_MIN_BYTES = 0
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, config.REVIEW_DATA)
+        synthetic.reviews(n_reviews, n_users, n_games).to_csv(file, index=False)
+        print("reviews: {} rows, {:.0f}MB, {} cores".format(
+            n_reviews, os.path.getsize(file) / 1024 ** 2, os.cpu_count()))
+
+        expected, baseline = None, None
+        for count in workers:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                aggregate_df = _aggregate(file, count)
+                timings.append(time.perf_counter() - start)
+            if expected is None:
+                expected, baseline = aggregate_df, statistics.median(timings)
+            pd.testing.assert_frame_equal(aggregate_df, expected)
+            print("{:>3} workers: {:>8.2f}s  ({:.2f}x)".format(
+                count, statistics.median(timings), baseline / statistics.median(timings)))
+
+
+def _aggregate(file, workers):
+    return aggregates.merge(
+        config.map_data_store(
+            file,
+            reviews.review_terms,
+            aggregates.build_chunks,
+            columns=["game_id"] + reviews.review_terms,
+            dtypes=reviews.review_dtypes,
+            workers=workers
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--reviews", type=int, default=10000000, help="Synthetic reviews.")
+    parser.add_argument("--users", type=int, default=100000, help="Synthetic users.")
+    parser.add_argument("--games", type=int, default=100000, help="Synthetic games.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts.")
+    parser.add_argument("--repeat", type=int, default=3, help="Times each worker count is timed.")
+    arguments = parser.parse_args()
+    run(arguments.reviews, arguments.users, arguments.games, arguments.workers, arguments.repeat)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark the throughput of the server mode against repeated CLI invocation, for the same GET
+requests against the local data store. The server is started in a separate process and queried
+by a number of concurrent clients, each holding a keep-alive connection.
+
+    $ python3 recommendation_system/benchmarks/server_benchmark.py --requests 2000 --clients 8
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# (path of the server request, equivalent cli arguments)
+requests = [
+    ("/GAMES?id=g1", ["-v", "GET", "-o", "GAMES", "--id", "g1"]),
+    ("/GAMES?sort_by=gameplay_score", ["-v", "GET", "-o", "GAMES", "--sort_by", "gameplay_score"]),
+    ("/COLLECTIONS?user_id=u_1", ["-v", "GET", "-o", "COLLECTIONS", "--user_id", "u_1"]),
+    ("/RECOMMENDATIONS?user_id=u_1", ["-v", "GET", "-o", "RECOMMENDATIONS", "--user_id", "u_1"]),
+]
+
+
+def run(n_requests, n_clients, n_invocations):
+    """
+    Run the benchmark and print its results.
+    :param n_requests: (int) number of requests made to the server
+    :param n_clients: (int) number of concurrent clients of the server
+    :param n_invocations: (int) number of CLI invocations
+    :return: None
+    """
+    start = time.perf_counter()
+    for i in range(n_invocations):
+        subprocess.run(
+            [sys.executable, os.path.join(root, "cli.py")] + requests[i % len(requests)][1],
+            check=True,
+            stdout=subprocess.DEVNULL
+        )
+    elapsed = time.perf_counter() - start
+    print("{:>8}: {:8.1f} requests/s  ({} invocations)".format(
+        "cli", n_invocations / elapsed, n_invocations))
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(root, "server.py"), "--port", str(port)],
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    try:
+        # wait for tables to be loaded
+        while not server.stdout.readline().startswith("Serving"):
+            pass
+
+        def client(n):
+            connection = http.client.HTTPConnection("127.0.0.1", port)
+            for i in range(n):
+                connection.request("GET", requests[i % len(requests)][0])
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise RuntimeError("request failed: {}".format(response.status))
+            connection.close()
+
+        shares = [n_requests // n_clients + (i < n_requests % n_clients) for i in range(n_clients)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_clients) as executor:
+            list(executor.map(client, shares))
+        elapsed = time.perf_counter() - start
+        print("{:>8}: {:8.1f} requests/s  ({} requests, {} clients)".format(
+            "server", n_requests / elapsed, n_requests, n_clients))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests made to the server.")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients of the server.")
+    parser.add_argument("--invocations", type=int, default=20, help="CLI invocations.")
+    arguments = parser.parse_args()
+    run(arguments.requests, arguments.clients, arguments.invocations)
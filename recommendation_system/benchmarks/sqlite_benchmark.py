@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark point lookups and rank queries against tables stored by the SQLITE backend, where rows
+are looked up by index and means calculated in SQL, against the CSV backend, where the table is
+read whole (as by a new process) or already held in memory (as by the table cache of a server).
+Reports the median time of each case.
+
+    $ python3 recommendation_system/benchmarks/sqlite_benchmark.py --games 1000000 --reviews 1000000
+"""
+from argparse import ArgumentParser
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from api import games, reviews  # noqa: E402
+from api.utilities import aggregates, storage  # noqa: E402
+import synthetic  # noqa: E402
+
+# games ranked by a rank query
+top = 10
+
+
+def run(n_games, n_reviews, n_users, repeat):
+    """
+    Run the benchmark and print its results.
+    :param n_games: (int) number of synthetic games
+    :param n_reviews: (int) number of synthetic reviews
+    :param n_users: (int) number of synthetic users
+    :param repeat: (int) number of times each case is timed
+    :return: None
+    """
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        files = {
+            "games": os.path.join(directory, "games.csv"),
+            "reviews": os.path.join(directory, "reviews.csv"),
+            "aggregates": os.path.join(directory, "review_aggregates.csv"),
+        }
+        review_df = synthetic.reviews(n_reviews, n_users, n_games)
+        tables = {
+            "games": synthetic.games(n_games),
+            "reviews": review_df,
+            "aggregates": aggregates.build(review_df),
+        }
+        for table, file in files.items():
+            start = time.perf_counter()
+            tables[table].to_csv(file, index=False)
+            storage.write(tables[table], file, "w", "SQLITE")
+            print("{:>10}: {} rows, migrated in {:.1f}s".format(
+                table, len(tables[table]), time.perf_counter() - start))
+
+        # random ids, so lookups are not served from the same pages each time
+        game_ids = ["g{}".format(n) for n in rng.integers(1, n_games + 1, repeat)]
+        user_ids = ["u_{}".format(n) for n in rng.integers(1, n_users + 1, repeat)]
+        cached = {
+            table: storage.read(file, dtypes=_dtypes(table)) for table, file in files.items()
+        }
+        cases = [
+            ("game by id",) + _lookups(files["games"], cached["games"], "game_id", game_ids),
+            ("reviews by user",) + _lookups(files["reviews"], cached["reviews"], "user_id", user_ids),
+            (
+                "rank aggregates",
+                lambda i: _rank(storage.read(files["aggregates"])),
+                lambda i: _rank(cached["aggregates"]),
+                lambda i: storage.query(
+                    files["aggregates"],
+                    aggregates.mean_statement() + " ORDER BY overall_score DESC LIMIT ?",
+                    (top,)
+                ),
+            ),
+            (
+                "rank reviews",
+                lambda i: _rank_reviews(
+                    storage.read(files["reviews"], ["game_id", "overall_score"], dtypes=_dtypes("reviews"))
+                ),
+                lambda i: _rank_reviews(cached["reviews"]),
+                lambda i: storage.query(
+                    files["reviews"],
+                    "SELECT game_id, AVG(overall_score) AS overall_score FROM {table} "
+                    "GROUP BY game_id ORDER BY overall_score DESC LIMIT ?",
+                    (top,)
+                ),
+            ),
+        ]
+        print("{:>16}  {:>12}  {:>12}  {:>12}".format("", "CSV read", "CSV cached", "SQLITE"))
+        for name, csv_read, csv_cached, sqlite in cases:
+            timings = [_measure(case, repeat) for case in [csv_read, csv_cached, sqlite]]
+            print("{:>16}  {:>10.2f}ms  {:>10.2f}ms  {:>10.2f}ms  ({:.1f}x CSV read)".format(
+                name, *[1000 * seconds for seconds in timings], timings[0] / timings[2]))
+
+
+def _dtypes(table):
+    return {"games": games.game_dtypes, "reviews": reviews.review_dtypes}.get(table)
+
+
+def _lookups(file, cached_df, column, values):
+    # (CSV read, CSV cached, SQLITE) lookups of the i-th value
+    dtypes = _dtypes(os.path.splitext(os.path.basename(file))[0])
+    return (
+        lambda i: _lookup(storage.read(file, dtypes=dtypes), column, values[i]),
+        lambda i: _lookup(cached_df, column, values[i]),
+        lambda i: storage.select(file, column, [values[i]], None, "SQLITE", dtypes),
+    )
+
+
+def _lookup(df, column, value):
+    return df.loc[df[column] == value]
+
+
+def _rank(aggregate_df):
+    return aggregates.mean_scores(aggregate_df)["overall_score"].nlargest(top)
+
+
+def _rank_reviews(review_df):
+    return review_df.groupby("game_id", observed=True)["overall_score"].mean().nlargest(top)
+
+
+def _measure(case, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        case(i)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=1000000, help="Synthetic games.")
+    parser.add_argument("--reviews", type=int, default=1000000, help="Synthetic reviews.")
+    parser.add_argument("--users", type=int, default=50000, help="Synthetic users.")
+    parser.add_argument("--repeat", type=int, default=5, help="Times each case is timed.")
+    arguments = parser.parse_args()
+    run(arguments.games, arguments.reviews, arguments.users, arguments.repeat)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark the start up time of the CLI for help, invalid arguments and a real query, against a
+bare interpreter. Each case is timed cold, with a fresh bytecode cache so every module is
+compiled again, and warm, as the median of repeated invocations.
+Help and invalid arguments must never import pandas, and must start within a budget of
+STARTUP_BUDGET_MS of warm time over the bare interpreter, otherwise the benchmark exits with 1.
+
+    $ python3 recommendation_system/benchmarks/startup_benchmark.py --repeat 10
+"""
+from argparse import ArgumentParser
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+cli = os.path.join(root, "cli.py")
+# (name, arguments, whether the case must stay within budget)
+cases = [
+    ("help", ["-h"], True),
+    ("object help", ["-v", "GET", "-o", "GAMES", "-h"], True),
+    ("invalid verb", ["-v", "FETCH", "-o", "GAMES"], True),
+    ("GET GAMES", ["-v", "GET", "-o", "GAMES", "--id", "g1"], False),
+]
+# milliseconds a budgeted case may take over the bare interpreter when warm
+STARTUP_BUDGET_MS = 100
+# prints whether pandas was imported by the given arguments
+pandas_check = """
+import sys
+sys.path.insert(0, {root!r})
+import cli
+from api.utilities.lazy import is_loaded
+try:
+    cli.start({args!r})
+except SystemExit:
+    pass
+sys.stdout = sys.__stdout__
+print(is_loaded("pandas"))
+"""
+
+
+def run(repeat):
+    """
+    Run the benchmark and print its results.
+    :param repeat: (int) number of warm invocations per case
+    :return: (bool) True if all budgeted cases are within budget and do not import pandas
+    """
+    bare_cold, bare_warm = _time([sys.executable, "-c", "pass"], repeat)
+    print("{:>14}: cold {:7.1f}ms  warm {:7.1f}ms".format("interpreter", bare_cold, bare_warm))
+
+    passed = True
+    for name, args, budgeted in cases:
+        cold, warm = _time([sys.executable, cli] + args, repeat)
+        line = "{:>14}: cold {:7.1f}ms  warm {:7.1f}ms  (+{:.1f}ms)".format(
+            name, cold, warm, warm - bare_warm)
+        if budgeted:
+            check = subprocess.run(
+                [sys.executable, "-c", pandas_check.format(root=root, args=args)],
+                capture_output=True,
+                text=True
+            )
+            imports_pandas = check.stdout.strip().splitlines()[-1] == "True"
+            within = warm - bare_warm <= STARTUP_BUDGET_MS and not imports_pandas
+            passed = passed and within
+            line += "  pandas imported: {}  {}".format(imports_pandas, "OK" if within else "OVER BUDGET")
+        print(line)
+    print("budget: +{}ms over the interpreter, without importing pandas".format(STARTUP_BUDGET_MS))
+    return passed
+
+
+def _time(command, repeat):
+    # cold: a fresh bytecode cache, so every module imported is compiled again
+    with tempfile.TemporaryDirectory() as cache_dir:
+        environment = dict(os.environ, PYTHONPYCACHEPREFIX=cache_dir)
+        cold = _elapsed(command, environment)
+    warm = statistics.median(_elapsed(command, dict(os.environ)) for _ in range(repeat))
+    return cold, warm
+
+
+def _elapsed(command, environment):
+    start = time.perf_counter()
+    subprocess.run(command, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return 1000 * (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=10, help="Warm invocations per case.")
+    arguments = parser.parse_args()
+    sys.exit(0 if run(arguments.repeat) else 1)
@@ -0,0 +1,61 @@
+"""
+Synthetic data store tables, in the format of sample_data, at a scale given by the caller.
+Used by the benchmarks in this directory.
+"""
+import numpy as np
+import pandas as pd
+
+game_types = ["Board Game", "Card Game", "Role Playing Game", "Miniature War Game"]
+genres = ["Fantasy", "Other", "Horror", "War"]
+
+
+def games(n_games, n_keywords=500, n_mechanics=50, seed=0):
+    """
+    Return synthetic game data.
+    :param n_games: (int) number of games
+    :param n_keywords: optional (int) size of keyword vocabulary
+    :param n_mechanics: optional (int) size of mechanic vocabulary
+    :param seed: optional (int) random seed
+    :return: (pd.DataFrame)
+    """
+    rng = np.random.default_rng(seed)
+    # zipf distributed terms, so a few are common and most are rare, as with real keywords
+    keywords = rng.zipf(1.5, (n_games, 3)) % n_keywords
+    mechanics = rng.zipf(1.5, (n_games, 2)) % n_mechanics
+    return pd.DataFrame({
+        "game_id": ["g" + str(i + 1) for i in range(n_games)],
+        "game_title": ["Game " + str(i + 1) for i in range(n_games)],
+        "game_description": "A synthetic game.",
+        "game_type": rng.choice(game_types, n_games),
+        "genre": rng.choice(genres, n_games),
+        "cost_usd": rng.gamma(2, 20, n_games).round(2),
+        "keywords": [", ".join(sorted({"keyword" + str(k) for k in row})) for row in keywords],
+        "mechanic": [", ".join(sorted({"mechanic" + str(m) for m in row})) for row in mechanics],
+        "player_count": rng.integers(1, 9, n_games),
+        "play_time_mins": rng.choice([15, 30, 45, 60, 90, 120, 180, 240], n_games),
+        "release_year": rng.integers(1990, 2021, n_games),
+        "row_creation_time_utc": "2020-12-01 12:00:00"
+    })
+
+
+def reviews(n_reviews, n_users, n_games, seed=0):
+    """
+    Return synthetic review data, of users reviewing games with scores from 1 to 5.
+    :param n_reviews: (int) number of reviews
+    :param n_users: (int) number of users
+    :param n_games: (int) number of games, as numbered by games
+    :param seed: optional (int) random seed
+    :return: (pd.DataFrame)
+    """
+    rng = np.random.default_rng(seed)
+    # zipf distributed games, so a few games are reviewed often and most rarely
+    game_numbers = rng.zipf(1.3, n_reviews) % n_games + 1
+    data = {
+        "review_id": ["r" + str(i + 1) for i in range(n_reviews)],
+        "user_id": ["u_" + str(i) for i in rng.integers(1, n_users + 1, n_reviews)],
+        "game_id": ["g" + str(i) for i in game_numbers],
+    }
+    for term in ["complexity_score", "gameplay_score", "visual_score", "overall_score"]:
+        data[term] = rng.integers(1, 6, n_reviews)
+    data["row_creation_time_utc"] = "2020-12-01 12:00:00"
+    return pd.DataFrame(data)
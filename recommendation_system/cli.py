@@ -4,14 +4,19 @@ The program processes user, game and review data as inputs and outputs an ordere
 recommendations for a given scenario.
 """
 from argparse import ArgumentParser, ArgumentTypeError, RawDescriptionHelpFormatter
+from contextlib import redirect_stderr, redirect_stdout
+import io
+import json
 import shutil
 import sys
 
-from api.config import *
-from api.games import games_help, games_usage
-from api.users import users_help, users_usage
-from api.collections import collections_help, collections_usage
-from api.recommendations import recommendations_help, recommendations_usage
+from api.utilities.lazy import lazy_import
+# numpy and pandas are only executed once first used, so that help
+# and invalid arguments never wait on them. Endpoint object modules
+# are likewise only imported once their object is given.
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+from api.config import *  # noqa: E402
 
 
 def start(args):
@@ -19,7 +24,173 @@ def start(args):
     Main module function.
     :return: None
     """
-    parser = ArgumentParser(
+    if "--batch" in args:
+        return start_batch(args)
+    parsed_arguments = parse_arguments(args)
+    initialise_data_store()
+    df = execute(parsed_arguments)
+
+    # return output as directed
+    if parsed_arguments.output == "JSON":
+        print(df.to_json(orient="records"))
+    else:
+        print(df)
+
+
+def start_batch(args):
+    """
+    Execute a stream of requests in a single process, one JSON object per line of the form
+        {"verb": "GET", "object": "GAMES", "args": {"sort_by": "gameplay_score"}}
+    where args are the options of the request by name, lists giving options several values.
+    Tables are loaded once for all requests, and writes are held in memory and flushed to the
+    data store once at the end (or every --flush_every requests), rather than once per request.
+    If the batch fails part way, e.g. the request file cannot be read, writes deferred since the
+    last flush are discarded rather than written.
+    The response to each request is streamed to stdout as a line of JSON, see execute_request.
+    :param args: (str list) command line arguments, with --batch naming the request file
+    ("-" for stdin) and an optional --flush_every
+    :return: None
+    """
+    parser = ArgumentParser(prog="RECOMMENDATION SYSTEM BATCH")
+    parser.add_argument(
+        "--batch",
+        type=str,
+        required=True,
+        help="JSON lines file of requests to execute, or - to read requests from stdin."
+    )
+    parser.add_argument(
+        "--flush_every",
+        type=int,
+        default=0,
+        help="Optional number of requests after which deferred writes are flushed, "
+             "only once all requests are executed if 0."
+    )
+    parsed_arguments = parser.parse_args(args)
+
+    initialise_data_store()
+    request_file = sys.stdin if parsed_arguments.batch == "-" else open(parsed_arguments.batch)
+    defer_writes()
+    try:
+        for line_number, line in enumerate(request_file, 1):
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                status, response = execute_request(
+                    request["verb"],
+                    request["object"],
+                    request_options(request.get("args", {}))
+                )
+            except (ValueError, KeyError, TypeError) as err:
+                status, response = 400, {"data": None, "messages": ["Invalid request: {}".format(err)]}
+            response = dict({"line": line_number, "status": status}, **response)
+            print(json.dumps(response), flush=True)
+            if parsed_arguments.flush_every and line_number % parsed_arguments.flush_every == 0:
+                flush_writes()
+    except BaseException:
+        # a batch which fails part way writes nothing since the last flush
+        discard_writes()
+        raise
+    finally:
+        defer_writes(False)
+        if request_file is not sys.stdin:
+            request_file.close()
+
+
+def execute_request(verb, object_arg, options):
+    """
+    Execute a single request given as a verb, object and options by name, as the CLI would.
+    :param verb: (str) verb of the request
+    :param object_arg: (str) endpoint object of the request
+    :param options: (tuple list) (name, value) pairs of options, repeated for several values
+    :return: (tuple) HTTP like status code (200, 400, 404 or 500) and JSON serialisable response
+    of the result as "data" records, along with any "messages" printed.
+    """
+    output = io.StringIO()
+    with redirect_stdout(output), redirect_stderr(output):
+        try:
+            df = execute(parse_request(verb, object_arg, options))
+            status = 200
+        except SystemExit:
+            # argparse has printed the reason arguments were invalid
+            df, status = None, 400
+        except FileNotFoundError as err:
+            print(err)
+            df, status = None, 404
+        except (TypeError, ValueError, KeyError) as err:
+            print(err)
+            df, status = None, 400
+        except Exception as err:
+            print("{}: {}".format(type(err).__name__, err))
+            df, status = None, 500
+    if isinstance(df, pd.DataFrame):
+        df = json.loads(df.to_json(orient="records"))
+    messages = [line for line in output.getvalue().splitlines() if line.strip()]
+    return status, {"data": df, "messages": messages}
+
+
+def parse_request(verb, object_arg, options):
+    """
+    Parse the options of a request by name (e.g. "game_id"), rather than command line arguments.
+    :param verb: (str) verb of the request
+    :param object_arg: (str) endpoint object of the request
+    :param options: (tuple list) (name, value) pairs of options, repeated for several values
+    :return: (Namespace) parsed arguments
+    :raises: SystemExit: if options are invalid
+    """
+    key = (str(verb).upper(), str(object_arg).upper())
+    if key not in _parsers:
+        _parsers[key] = build_parser(key[1], key[0])
+    parser = _parsers[key]
+
+    args = ["-v", verb, "-o", object_arg]
+    values = {}
+    for name, value in options:
+        values.setdefault(name, []).append(value)
+    for name, name_values in values.items():
+        args.append(parser.flags.get(name, "--" + name))
+        args.extend(name_values)
+    return parser.parse_args(args)
+
+
+def request_options(options):
+    """
+    Convert a dictionary of options by name to (name, value) pairs, as taken by parse_request.
+    :param options: (dict) option values by name, lists giving an option several values
+    :return: (tuple list)
+    :raises: TypeError: if options is not a dictionary
+    """
+    if not isinstance(options, dict):
+        raise TypeError("options must be a JSON object")
+    return [
+        (name, str(value))
+        for name, values in options.items()
+        for value in (values if isinstance(values, list) else [values])
+    ]
+
+
+def parse_arguments(args):
+    """
+    Parse command line arguments, with options specific to the given object and verb.
+    :param args: (str list) command line arguments
+    :return: (Namespace) parsed arguments
+    :raises: SystemExit: if arguments are invalid, or help was requested
+    """
+    # cache object and verb before parsing args
+    object_arg = _argument_value(args, "-o", "--object")
+    verb_arg = _argument_value(args, "-v", "--verb")
+    # will exit as soon as arguments parsed if -h is present
+    return build_parser(object_arg, verb_arg).parse_args(args)
+
+
+def build_parser(object_arg=None, verb_arg=None):
+    """
+    Build the argument parser, extended with options specific to the given object and verb.
+    :param object_arg: optional (str) endpoint object to extend options for
+    :param verb_arg: optional (str) verb to limit the scope of extended options
+    :return: parser: (RequestParser)
+    """
+    parser = RequestParser(
         prog="RECOMMENDATION SYSTEM\n",
         description="The program processes user, game and review data and outputs an ordered list\n"
                     "of game recommendations for a given user and scenario.\n"
@@ -49,43 +220,69 @@ def start(args):
     )
     parser.add_argument(
         "--output",
-        choices=["DataFrame", "JSON"],
+        choices=["DataFrame", "JSON", "NPZ"],
         default="DataFrame",
         type=str,
-        help="How you would like to view the return output of a given argument."
+        help="How you would like to view the return output of a given argument. "
+             "NPZ persists a rating matrix (-o RECOMMENDATIONS -f MATRIX) as a binary .npz file, "
+             "returning its location."
     )
 
-    # cache object and verb before parsing args
-    object_arg = None
-    verb_arg = None
-    if "-o" in args or "--object" in args:
-        object_index = args.index("-o" or "--object")
-        object_arg = args[object_index + 1]
-    if "-v" in args or "--verb" in args:
-        verb_index = args.index("-v" or "--verb")
-        verb_arg = args[verb_index + 1]
-
-    # test if help flag is present in args
-    # to extend help options if either verb or object is defined
-    if "-h" or "--help" in args:
-        # ADD GAMES
-        if object_arg == "GAMES":
-            games_help(parser, verb_arg)
-        # ADD USERS
-        if object_arg == "USERS":
-            users_help(parser, verb_arg)
-        # ADD COLLECTIONS
-        if object_arg == "COLLECTIONS":
-            collections_help(parser, verb_arg)
-        # ADD RECOMMENDATIONS
-        if object_arg == "RECOMMENDATIONS":
-            recommendations_help(parser, verb_arg)
+    # extend help options if the object is defined
+    # ADD GAMES
+    if object_arg == "GAMES":
+        from api.games import games_help
+        games_help(parser, verb_arg)
+    # ADD USERS
+    if object_arg == "USERS":
+        from api.users import users_help
+        users_help(parser, verb_arg)
+    # ADD COLLECTIONS
+    if object_arg == "COLLECTIONS":
+        from api.collections import collections_help
+        collections_help(parser, verb_arg)
+    # ADD RECOMMENDATIONS
+    if object_arg == "RECOMMENDATIONS":
+        from api.recommendations import recommendations_help
+        recommendations_help(parser, verb_arg)
+    # ADD REVIEWS
+    if object_arg == "REVIEWS":
+        from api.reviews import reviews_help
+        reviews_help(parser, verb_arg)
+    # ADD DATA STORE
+    if object_arg == "DATA_STORE":
+        from api.data_store import data_store_help
+        data_store_help(parser, verb_arg)
+    return parser
 
-    # will exit as soon as arguments parsed if -h is present
-    parsed_arguments = parser.parse_args(args)
 
-    # Check if local data store has been initialised
-    # with all required files
+class RequestParser(ArgumentParser):
+    """
+    ArgumentParser which records the flag of each option by the name it is parsed to
+    (e.g. "game_id": "--game-id") as options are added by the *_help functions, so requests
+    can give options by name (see parse_request).
+    """
+    def __init__(self, *args, **kwargs):
+        self.flags = {}
+        super().__init__(*args, **kwargs)
+
+    def add_argument(self, *args, **kwargs):
+        action = super().add_argument(*args, **kwargs)
+        if action.option_strings:
+            self.flags[action.dest] = action.option_strings[-1]
+        return action
+
+
+def initialise_data_store():
+    """
+    Check the local data store has been initialised with all required files,
+    that every table exists in the configured backend, and that collection games have been
+    migrated out of the collections table.
+    :return: None
+    """
+    from api.collections import migrate_collection_games
+    from api.data_store import data_files, migrate_data_store
+
     for file in REQUIRED_DATA_FILES:
         file_path = os.path.join(
             os.path.abspath(os.path.dirname(__file__)),
@@ -93,22 +290,51 @@ def start(args):
         )
         if not os.path.exists(file_path):
             copy_seed_data()
+    # tables of a binary backend are migrated from csv on first usage
+    for file_path in data_files:
+        if storage.exists(file_path, CSV_BACKEND) and not storage.exists(file_path, DATA_STORE_BACKEND):
+            migrate_data_store(DATA_STORE_BACKEND, [file_path])
+    migrate_collection_games()
+
 
-    # execute given argument
+def execute(parsed_arguments):
+    """
+    Execute parsed arguments against the controller of their endpoint object.
+    :param parsed_arguments: (Namespace) as returned by parse_arguments
+    :return: (*) result of given arguments
+    """
+    object_arg = parsed_arguments.object
+    if parsed_arguments.output == "NPZ" and getattr(parsed_arguments, "function", None) != "MATRIX":
+        raise ValueError("--output NPZ is only supported by GET RECOMMENDATIONS -f MATRIX")
     if object_arg == "GAMES":
+        from api.games import games_usage
         df = games_usage(parsed_arguments)
     if object_arg == "USERS":
+        from api.users import users_usage
         df = users_usage(parsed_arguments)
     if object_arg == "COLLECTIONS":
+        from api.collections import collections_usage
         df = collections_usage(parsed_arguments)
     if object_arg == "RECOMMENDATIONS":
+        from api.recommendations import recommendations_usage
         df = recommendations_usage(parsed_arguments)
+    if object_arg == "REVIEWS":
+        from api.reviews import reviews_usage
+        df = reviews_usage(parsed_arguments)
+    if object_arg == "DATA_STORE":
+        from api.data_store import data_store_usage
+        df = data_store_usage(parsed_arguments)
+    return df
 
-    # return output as directed
-    if parsed_arguments.output == "JSON":
-        print(df.to_json(orient="records"))
-    else:
-        print(df)
+
+_parsers = {}
+
+
+def _argument_value(args, *flags):
+    for flag in flags:
+        if flag in args and args.index(flag) + 1 < len(args):
+            return str(args[args.index(flag) + 1]).upper()
+    return None
 
 
 # TYPE VALIDATION
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Long-running HTTP server mode of the CLI, serving the same endpoints from a single process.
+Tables are loaded once at start up and kept warm in the table cache, so a request only pays for
+the work of its controller rather than interpreter start up, imports and parsing every table.
+
+Requests map onto the CLI's verbs, objects and options, e.g.
+
+    GET /GAMES?sort_by=gameplay_score&function=FILTERS
+    PATCH /COLLECTIONS?id=c_1&game_id=g3
+
+where repeated query parameters give options taking several values (e.g. weighting), and a JSON
+object body may be given instead of, or as well as, query parameters. Responses are JSON objects
+of the controller's result as "data" records, along with any "messages" it printed.
+
+    $ python3 recommendation_system/server.py --port 8080
+"""
+from argparse import ArgumentParser
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+from urllib.parse import parse_qsl, urlsplit
+
+import cli
+from api.collections import get_collection_membership
+from api.config import *
+
+
+def handle(verb, path, body=b""):
+    """
+    Execute a single request against the controllers, as the CLI would.
+    :param verb: (str) HTTP verb of the request
+    :param path: (str) request path of the endpoint object, with options as query parameters
+    :param body: optional (bytes) JSON object of further options
+    :return: (tuple) HTTP status code and JSON serialisable response
+    """
+    url = urlsplit(path)
+    options = parse_qsl(url.query, keep_blank_values=True)
+    try:
+        if body:
+            options.extend(cli.request_options(json.loads(body)))
+    except (TypeError, ValueError) as err:
+        return 400, {"data": None, "messages": ["Invalid JSON body: {}".format(err)]}
+    return cli.execute_request(verb, url.path.strip("/"), options)
+
+
+async def serve(host, port):
+    """
+    Serve requests until cancelled.
+    Connections are handled concurrently, while requests are executed one at a time, in the order
+    received, on a worker thread. So slow requests never block connections from being accepted
+    and read, and the printed messages of one request are never mixed with those of another.
+    :param host: (str) interface to listen on
+    :param port: (int) port to listen on
+    :return: None
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    loop = asyncio.get_running_loop()
+
+    async def connection(reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                verb, path, headers, body = request
+                status, response = await loop.run_in_executor(executor, handle, verb, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, response, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # the client has gone away, or sent a malformed request
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(connection, host, port)
+    print("Serving on http://{}:{}".format(host, port), flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def warm():
+    """
+    Initialise the data store, then make the GET requests of warm_requests, so each endpoint's
+    controllers read their tables into the table cache, with the columns, types and codes they
+    declare, and index their rows by id. Ids are looked up which match no rows, so that the
+    first requests are served from the cache without building a response for every row here.
+    :return: None
+    """
+    cli.initialise_data_store()
+    for path in warm_requests:
+        handle("GET", path)
+    # collection games are only read for the collections found, so are looked up directly
+    get_collection_membership(warm_id)
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    verb, path, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+    return verb, path, headers, body
+
+
+def _response(status, response, keep_alive):
+    body = json.dumps(response).encode("utf-8")
+    head = "HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n" \
+           "Connection: {}\r\n\r\n".format(
+               status,
+               _reasons.get(status, ""),
+               len(body),
+               "keep-alive" if keep_alive else "close"
+           )
+    return head.encode("latin-1") + body
+
+
+_reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+# id matching no rows, looked up by warm
+warm_id = "-"
+# GET requests made by warm, covering the reads of each endpoint's controllers
+warm_requests = [
+    "/GAMES?limit=1",
+    "/GAMES?id=" + warm_id,
+    "/REVIEWS?user_id=" + warm_id,
+    "/REVIEWS?game_id=" + warm_id,
+    "/USERS?id=" + warm_id,
+    "/COLLECTIONS?user_id=" + warm_id,
+    "/RECOMMENDATIONS?user_id=" + warm_id
+]
+
+
+if __name__ == "__main__":
+    argument_parser = ArgumentParser(description="Serve the recommendation system over HTTP.")
+    argument_parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to listen on.")
+    argument_parser.add_argument("--port", type=int, default=8080, help="Port to listen on.")
+    arguments = argument_parser.parse_args()
+    warm()
+    try:
+        asyncio.run(serve(arguments.host, arguments.port))
+    except KeyboardInterrupt:
+        pass
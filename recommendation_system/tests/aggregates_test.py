@@ -0,0 +1,159 @@
+"""
+Unit tests for review aggregates
+"""
+import os
+import pandas as pd
+import pytest
+from api import config
+from api.utilities import aggregates, calculations, oplog
+
+
+# Sample Data
+game_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    "../sample_data/games.csv"
+)
+review_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    "../sample_data/reviews.csv"
+)
+game_df = pd.read_csv(game_file)
+review_df = pd.read_csv(review_file)
+
+
+def test_arguments():
+    """
+    1) Expect TypeError if review data is not a data frame
+    2) Expect TypeError if aggregate data is not a data frame of review aggregates
+    :return: None
+    """
+    # Scenario 1
+    with pytest.raises(TypeError):
+        aggregates.build("a")
+    # Scenario 2
+    with pytest.raises(TypeError):
+        aggregates.update(review_df, review_df)
+    with pytest.raises(TypeError):
+        aggregates.mean_scores(review_df)
+
+
+def test_return():
+    """
+    1) Expect one aggregate row per reviewed game, with counts summing to the number of reviews
+    2) Expect incrementally updated aggregates to match those built from all reviews
+    3) Expect game_review_mean of aggregates to match game_review_mean of raw reviews
+    4) Expect no inconsistencies when checking consistent aggregates, and otherwise the game_id
+    :return: None
+    """
+    x = aggregates.build(review_df)
+    # scenario 1
+    assert len(x) == review_df["game_id"].nunique()
+    assert x[aggregates.count_term].sum() == len(review_df)
+    # scenario 2
+    y = aggregates.update(aggregates.build(review_df.iloc[:100]), review_df.iloc[100:])
+    assert len(aggregates.check(y, review_df)) == 0
+    # scenario 3
+    for weighting in [[0, 0, 0, 1], [1, 2, 3, 4]]:
+        from_reviews = calculations.game_review_mean(game_df, review_df, weighting=weighting)
+        from_aggregates = calculations.game_review_mean(game_df, x, weighting=weighting)
+        assert list(from_aggregates["mean"]) == pytest.approx(list(from_reviews["mean"]))
+    # scenario 4
+    assert len(aggregates.check(x, review_df)) == 0
+    stale = aggregates.build(review_df.iloc[1:])
+    inconsistent = aggregates.check(stale, review_df)
+    assert set(inconsistent["game_id"]) == {review_df.iloc[0]["game_id"]}
+
+
+def test_rank_return():
+    """
+    1) Expect a game with a single top review to be ranked first by mean, but not by BAYESIAN or
+    WILSON rank modes, which rank the same from aggregates as from raw reviews
+    2) Expect WILSON lower bound to equal the Wilson score interval of reviews of only the lowest
+    and highest scores, and to lie below the mean
+    3) Expect BAYESIAN score to lie between the mean of all reviews and the game's own mean
+    4) Expect TypeError if rank mode is not supported
+    :return: None
+    """
+    single = review_df.iloc[:1].assign(game_id="g_single", overall_score=5)
+    reviews = pd.concat([review_df, single], ignore_index=True)
+    games = pd.concat([game_df, game_df.iloc[:1].assign(game_id="g_single")], ignore_index=True)
+    # scenario 1
+    assert calculations.game_review_mean(games, reviews, limit=1)["game_id"].iloc[0] == "g_single"
+    for rank_mode in ["BAYESIAN", "WILSON"]:
+        x = calculations.game_review_mean(games, reviews, rank_mode=rank_mode)
+        assert x["game_id"].iloc[0] != "g_single"
+        y = calculations.game_review_mean(games, aggregates.build(reviews), rank_mode=rank_mode)
+        assert list(y["game_id"]) == list(x["game_id"])
+    # scenario 2
+    weights = [0, 0, 0, 1]
+    binary = pd.DataFrame({"game_id": "g1", "overall_score": [5] * 8 + [1] * 2})
+    for term in aggregates.review_terms[:-1]:
+        binary[term] = 1
+    x = aggregates.rank_scores(aggregates.build(binary), weights, "WILSON").iloc[0]
+    p, n, z = 0.8, 10, 1.96
+    wilson = (p + z ** 2 / (2 * n) - z * (p * (1 - p) / n + z ** 2 / (4 * n ** 2)) ** 0.5) / (1 + z ** 2 / n)
+    assert x["score"] == pytest.approx(1 + 4 * wilson)
+    assert x["lower_bound"] < x["mean"] < x["upper_bound"]
+    # scenario 3
+    x = aggregates.rank_scores(aggregates.build(reviews), weights, "BAYESIAN").loc["g_single"]
+    assert reviews["overall_score"].mean() < x["score"] < x["mean"]
+    # scenario 4
+    with pytest.raises(TypeError):
+        aggregates.rank_scores(aggregates.build(reviews), weights, "MEAN")
+    with pytest.raises(TypeError):
+        calculations.game_review_mean(games, reviews, rank_mode="MEDIAN")
+
+
+def test_chunk_return():
+    """
+    1) Expect aggregates of reviews in chunks, per game and per user, to match those of all reviews
+    :return: None
+    """
+    chunks = [review_df.iloc[start:start + 40] for start in range(0, len(review_df), 40)]
+    # scenario 1
+    for key in ["game_id", "user_id"]:
+        x = aggregates.build_chunks(chunks, key)
+        pd.testing.assert_frame_equal(x, aggregates.build(review_df, key))
+
+
+def test_parallel_return(tmp_path, monkeypatch):
+    """
+    1) Expect aggregates of reviews read in parallel shards, with logged inserts and deletes, to
+    match those of all reviews
+    2) Expect a table smaller than STREAM_MIN_BYTES to be processed whole, as a single chunk
+    3) Expect TypeError if no aggregates are merged, or workers is not a positive int
+    :return: None
+    """
+    stream_min_bytes = config.STREAM_MIN_BYTES
+    monkeypatch.setattr(config, "PARALLEL_MIN_BYTES", 0)
+    monkeypatch.setattr(config, "STREAM_MIN_BYTES", 0)
+    file = str(tmp_path / config.REVIEW_DATA)
+    review_df.iloc[:180].to_csv(file, index=False)
+    # a logged insert of an existing review is skipped
+    oplog.insert(file, review_df.iloc[170:])
+    oplog.delete(file, "game_id", [review_df["game_id"][0]])
+    expected = aggregates.build(oplog.replay(review_df.iloc[:180], oplog.read(file)[0], "review_id"))
+    # scenario 1
+    for workers in [1, 3]:
+        x = config.map_data_store(
+            file,
+            [],
+            aggregates.build_chunks,
+            ["game_id"] + aggregates.review_terms,
+            workers=workers,
+            chunk_rows=25
+        )
+        assert len(x) == (1 if workers == 1 else 4)
+        pd.testing.assert_frame_equal(aggregates.merge(x), expected)
+    # scenario 2
+    x = config.map_data_store(file, [], lambda chunks: len(list(chunks)), workers=1, chunk_rows=25)
+    assert x[0] > 1
+    monkeypatch.setattr(config, "STREAM_MIN_BYTES", stream_min_bytes)
+    x = config.map_data_store(file, [], lambda chunks: list(chunks), workers=3, chunk_rows=25)
+    assert len(x) == 1 and len(x[0]) == 1
+    pd.testing.assert_frame_equal(aggregates.build(x[0][0]), expected)
+    # scenario 3
+    with pytest.raises(TypeError):
+        aggregates.merge([])
+    with pytest.raises(TypeError):
+        config.map_data_store(file, [], aggregates.build_chunks, workers=0)
@@ -0,0 +1,60 @@
+"""
+Unit tests for append-only association tables
+"""
+import pandas as pd
+import pytest
+from api.utilities import association
+
+
+# Sample Data
+keys = ("collection_id", "game_id")
+association_df = pd.DataFrame({
+    "collection_id": ["c_1", "c_1", "c_2", "c_1", "c_2"],
+    "game_id": ["g1", "g2", "g1", "g1", "g3"],
+    "added_at": ["2020-01-01", "2020-01-02", "2020-01-03", None, "2020-01-05"],
+    "removed_at": [None, None, None, "2020-01-04", None]
+})
+
+
+def test_arguments():
+    """
+    1) Expect TypeError if association data is not a data frame
+    2) Expect TypeError if association data is missing key or change columns
+    :return: None
+    """
+    # Scenario 1
+    with pytest.raises(TypeError):
+        association.build_index("a", keys)
+    with pytest.raises(TypeError):
+        association.compact("a", keys)
+    # Scenario 2
+    with pytest.raises(TypeError):
+        association.build_index(association_df.drop(columns="removed_at"), keys)
+    with pytest.raises(TypeError):
+        association.compact(association_df.drop(columns="removed_at"), keys)
+
+
+def test_return():
+    """
+    1) Expect the latest row of each pair to decide whether it is current
+    2) Expect both keys to be indexed, along with the time each left key last changed
+    3) Expect appended rows applied to an index to match an index built from all rows
+    4) Expect compacted rows to drop superseded rows and build the same index
+    :return: None
+    """
+    x = association.build_index(association_df, keys)
+    # scenario 1
+    assert not association.is_member(x, "c_1", "g1")
+    assert association.is_member(x, "c_1", "g2")
+    assert list(association.current(x, left="c_2")["game_id"]) == ["g1", "g3"]
+    # scenario 2
+    assert list(association.current(x, right="g1")["collection_id"]) == ["c_2"]
+    assert x.updated == {"c_1": "2020-01-04", "c_2": "2020-01-05"}
+    # scenario 3
+    y = association.apply(association.build_index(association_df.iloc[:2], keys), association_df.iloc[2:])
+    assert (y.by_left, y.by_right, y.updated) == (x.by_left, x.by_right, x.updated)
+    # scenario 4
+    z = association.compact(association_df, keys)
+    assert list(z.index) == [1, 2, 3, 4]
+    z = association.build_index(z, keys)
+    assert (z.by_left, z.by_right, z.updated) == (x.by_left, x.by_right, x.updated)
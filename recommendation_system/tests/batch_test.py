@@ -0,0 +1,119 @@
+"""
+Unit tests for batch mode and deferred writes, against a copy of the sample data store
+"""
+import glob
+import json
+import os
+import shutil
+import pytest
+import cli
+from api import collections, config, reviews
+from api.utilities import cache, oplog, storage
+
+
+# Sample Data
+sample_data = os.path.join(os.path.abspath(os.path.dirname(__file__)), "../sample_data")
+review_scores = {"complexity_score": 1, "gameplay_score": 2, "visual_score": 3, "overall_score": 4}
+requests = [
+    {"verb": "POST", "object": "USERS", "args": {
+        "username": "batcher", "password": "pw", "name": "Bat Cher", "date_of_birth": "01/01/1990"
+    }},
+    {"verb": "POST", "object": "REVIEWS", "args": dict(user_id="u_1", game_id="g1", **review_scores)},
+    {"verb": "GET", "object": "REVIEWS", "args": {"user_id": "u_1", "game_id": "g1"}},
+    {"verb": "POST", "object": "REVIEWS", "args": dict(user_id="u_1", game_id="g1", **review_scores)},
+    {"verb": "PATCH", "object": "COLLECTIONS", "args": {"id": "c_1", "game_id": "g1"}},
+    {"verb": "DELETE", "object": "COLLECTIONS", "args": {"id": "c_2", "game_id": "g1"}},
+    {"verb": "DELETE", "object": "COLLECTIONS", "args": {"id": "c_3"}}
+]
+# columns holding the time a row was written, compared only on whether they are set
+time_columns = ["row_creation_time_utc", "row_updated_time_utc", "added_at", "removed_at"]
+
+
+def test_return(data_store, capsys):
+    """
+    1) Expect a batch of POST, PATCH and DELETE requests to leave the same tables and operation
+    logs as executing them one by one
+    2) Expect reads within a batch to see rows deferred by earlier requests
+    3) Expect a logged table rewritten within the batch (collections, migrated by the signup) to be
+    written as a snapshot, with only the operations deferred after it left in its log
+    :return: None
+    """
+    for request in requests:
+        cli.execute_request(request["verb"], request["object"], cli.request_options(request["args"]))
+    expected = _state(data_store)
+    _reset(data_store)
+    batch_file = str(data_store / "requests.jsonl")
+    with open(batch_file, "w") as requests_file:
+        requests_file.write("\n".join(json.dumps(request) for request in requests))
+    capsys.readouterr()
+    cli.start_batch(["--batch", batch_file])
+    responses = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    # scenario 1
+    assert [response["status"] for response in responses] == [200] * len(requests)
+    assert _state(data_store) == expected
+    # scenario 2
+    assert [review["overall_score"] for review in responses[2]["data"]] == [4]
+    assert "has already reviewed" in responses[3]["messages"][0]
+    # scenario 3
+    snapshot = storage.read(collections.collection_file)
+    assert "game_ids" not in snapshot.columns and "c_3" in set(snapshot["collection_id"])
+    operations = oplog.read(collections.collection_file)[0]
+    assert [operation["op"] for operation in operations] == [oplog.INSERT, oplog.DELETE]
+    x = config.validate_data_store(collections.collection_file, [])
+    assert "c_3" not in set(x["collection_id"])
+    assert len(x.loc[x["user_id"] == responses[0]["data"][0]["user_id"]]) == 1
+
+
+def test_failure(data_store, capsys, monkeypatch):
+    """
+    1) Expect a batch interrupted part way to write nothing deferred by its earlier requests
+    2) Expect writes flushed by --flush_every before the interruption to be kept
+    :return: None
+    """
+    batch_file = str(data_store / "requests.jsonl")
+    with open(batch_file, "w") as requests_file:
+        requests_file.write("\n".join(json.dumps(request) for request in requests[1:4]))
+    execute_request = cli.execute_request
+    executed = []
+
+    def interrupted(verb, object_arg, options):
+        # every third request is interrupted, once the two before it are executed
+        executed.append(verb)
+        if len(executed) % 3 == 0:
+            raise KeyboardInterrupt
+        return execute_request(verb, object_arg, options)
+
+    expected = _state(data_store)
+    monkeypatch.setattr(cli, "execute_request", interrupted)
+    # Scenario 1
+    with pytest.raises(KeyboardInterrupt):
+        cli.start_batch(["--batch", batch_file])
+    assert [json.loads(line)["status"] for line in capsys.readouterr().out.splitlines()] == [200, 200]
+    assert _state(data_store) == expected
+    assert not os.path.exists(oplog.log_path(reviews.review_file))
+    # Scenario 2
+    with pytest.raises(KeyboardInterrupt):
+        cli.start_batch(["--batch", batch_file, "--flush_every", "1"])
+    x = config.validate_data_store(reviews.review_file, [])
+    assert len(x.loc[(x["user_id"] == "u_1") & (x["game_id"] == "g1")]) == 1
+
+
+def _state(directory):
+    # every table with its operation log, without the times rows were written
+    state = {}
+    for file in sorted(glob.glob(str(directory / "*.csv"))):
+        table_df = config.validate_data_store(file, [])
+        for column in set(time_columns).intersection(table_df.columns):
+            table_df[column] = table_df[column].notna()
+        operations = oplog.read(file)[0]
+        for operation in operations:
+            for row in operation.get("rows", []):
+                row.update({column: row[column] is not None for column in time_columns if column in row})
+        state[os.path.basename(file)] = (json.loads(table_df.to_json(orient="records")), operations)
+    return state
+
+
+def _reset(directory):
+    shutil.rmtree(str(directory))
+    shutil.copytree(sample_data, str(directory), ignore=shutil.ignore_patterns("*.py"))
+    cache.invalidate()
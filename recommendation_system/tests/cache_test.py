@@ -0,0 +1,74 @@
+"""
+Unit tests for the data store table cache
+"""
+import os
+import shutil
+import pandas as pd
+from api import config
+from api.utilities import cache
+
+
+# Sample Data
+game_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    "../sample_data/games.csv"
+)
+
+
+def test_return(tmp_path):
+    """
+    1) Expect an unchanged table to be parsed only once
+    2) Expect returned tables to be copies, unaffected by changes made by the caller
+    3) Expect a table to be parsed again once written by the api, or changed on disk
+    4) Expect rows selected from a cached table to be those holding any given value, in table
+    order, copied from the table without parsing it again
+    :return: None
+    """
+    file = str(tmp_path / "games.csv")
+    shutil.copy(game_file, file)
+    cache.invalidate()
+    misses = cache.stats["misses"]
+    # scenario 1
+    x = config.validate_data_store(file, ["game_id"])
+    y = config.validate_data_store(file, ["game_id"])
+    assert cache.stats["misses"] == misses + 1
+    pd.testing.assert_frame_equal(x, y)
+    # scenario 2
+    x.loc[0, "game_id"] = "changed"
+    assert config.validate_data_store(file, ["game_id"]).loc[0, "game_id"] == "g1"
+    # scenario 3
+    config.write_data_store(y.iloc[:5], file, mode="w")
+    assert len(config.validate_data_store(file, ["game_id"])) == 5
+    with open(file, "a") as table:
+        table.write(",".join(["g_new"] + [""] * (len(y.columns) - 1)) + "\n")
+    assert len(config.validate_data_store(file, ["game_id"])) == 6
+    assert cache.stats["misses"] == misses + 3
+    # scenario 4
+    x = config.validate_data_store(file, ["game_id"])
+    y = config.select_data_store(file, ["game_id"], "game_id", ["g_new", "g2", "g_none", "g2"])
+    pd.testing.assert_frame_equal(y, x.loc[x["game_id"].isin(["g2", "g_new"])])
+    y.loc[y.index[0], "game_id"] = "changed"
+    assert list(config.select_data_store(file, ["game_id"], "game_id", "g2")["game_id"]) == ["g2"]
+    assert cache.stats["misses"] == misses + 4
+
+
+def test_eviction():
+    """
+    1) Expect least recently used entries to be evicted once the memory bound is exceeded
+    :return: None
+    """
+    df = pd.DataFrame({"a": range(1000)})
+    cache.invalidate()
+    cache.resize(df.memory_usage(index=True, deep=True).sum() * 2)
+    try:
+        for key in ["a", "b", "c"]:
+            cache.get((key,), (0,), lambda: df)
+        cache.get(("b",), (0,), lambda: df)
+        misses = cache.stats["misses"]
+        cache.get(("a",), (0,), lambda: df)
+        assert cache.stats["misses"] == misses + 1
+        cache.get(("b",), (0,), lambda: df)
+        assert cache.stats["misses"] == misses + 1
+    finally:
+        cache.resize(config.TABLE_CACHE_MAX_BYTES)
+        cache.invalidate()
@@ -4,7 +4,7 @@ Unit tests for mean calculations
 import os
 import pandas as pd
 import pytest
-from api.utilities import calculations
+from api.utilities import aggregates, calculations
 
 
 # Sample Data
@@ -61,3 +61,78 @@ def test_return():
     assert x.iloc[0]["mean"] >= x.iloc[1]["mean"] >= x.iloc[2]["mean"]
     # scenario 3
     assert x.iloc[0]["mean"] == pytest.approx(3.50)
+
+
+def test_weighted_return():
+    """
+    1) Expect weighted mean to match the weighted sum of each game's mean review scores
+    2) Expect float weightings to be accepted and return the same order as equivalent int weightings
+    3) Expect ValueError if weighting sums to zero
+    :return: None
+    """
+    x = calculations.game_review_mean(game_df, review_df, "overall_score", [1, 2, 3, 4])
+    # scenario 1
+    first = review_df[review_df["game_id"] == x.iloc[0]["game_id"]]
+    expected = (
+        first["complexity_score"].mean() * 1 + first["gameplay_score"].mean() * 2
+        + first["visual_score"].mean() * 3 + first["overall_score"].mean() * 4
+    ) / 10
+    assert len(x) == 50
+    assert x.iloc[0]["mean"] == pytest.approx(expected)
+    assert list(x["mean"]) == sorted(x["mean"], reverse=True)
+    # scenario 2
+    y = calculations.game_review_mean(game_df, review_df, "overall_score", [0.5, 1.0, 1.5, 2.0])
+    assert list(y["game_id"]) == list(x["game_id"])
+    # scenario 3
+    with pytest.raises(ValueError):
+        calculations.game_review_mean(game_df, review_df, "overall_score", [1, -1, 0, 0])
+
+
+def test_limit_return():
+    """
+    1) Expect limit and offset to return the same games as slicing the full ranking
+    2) Expect the k largest values in descending order, with equal values ranked by position
+    3) Expect TypeError if limit or offset is not a non-negative int
+    :return: None
+    """
+    x = calculations.game_review_mean(game_df, review_df)
+    # scenario 1
+    y = calculations.game_review_mean(game_df, review_df, limit=5, offset=3)
+    pd.testing.assert_frame_equal(y, x.iloc[3:8])
+    assert len(calculations.game_review_mean(game_df, review_df, limit=5, offset=60)) == 0
+    # scenario 2
+    assert list(calculations.top_positions([1, 3, 2, 3, 0], 3)) == [1, 3, 2]
+    assert list(calculations.top_positions([2, 1, 2, 2], 2)) == [0, 2]
+    assert list(calculations.top_positions([1, 2], 5)) == [1, 0]
+    # scenario 3
+    with pytest.raises(TypeError):
+        calculations.game_review_mean(game_df, review_df, limit=-1)
+    with pytest.raises(TypeError):
+        calculations.game_review_mean(game_df, review_df, offset=1.5)
+
+
+def test_normalised_return():
+    """
+    1) Expect every user's scores to be centred around their own mean, matching each user's
+    reviews normalised alone
+    2) Expect review data not to be modified
+    3) Expect maintained per-user aggregates, updated as reviews are added, to give the same result
+    4) Expect TypeError if user_aggregate_df is not per-user aggregates
+    :return: None
+    """
+    before = review_df.copy()
+    x = calculations.user_normalised_reviews(review_df)
+    # scenario 1
+    for _, user_reviews in review_df.groupby("user_id"):
+        expected = calculations.user_normalised_reviews(user_reviews.drop(columns="user_id"))
+        pd.testing.assert_frame_equal(x.loc[user_reviews.index].drop(columns="user_id"), expected)
+    assert x.groupby("user_id")["overall_score"].mean().abs().max() == pytest.approx(0)
+    # scenario 2
+    pd.testing.assert_frame_equal(review_df, before)
+    # scenario 3
+    user_aggregates = aggregates.build(review_df.iloc[:100], "user_id")
+    user_aggregates = aggregates.update(user_aggregates, review_df.iloc[100:], "user_id")
+    pd.testing.assert_frame_equal(calculations.user_normalised_reviews(review_df, user_aggregates), x)
+    # scenario 4
+    with pytest.raises(TypeError):
+        calculations.user_normalised_reviews(review_df, aggregates.build(review_df))
@@ -0,0 +1,36 @@
+"""
+Unit tests for the collections endpoint, against a copy of the sample data store
+"""
+from api import collections, config
+
+
+def test_return(data_store, monkeypatch):
+    """
+    1) Expect the migration to be skipped once collection_games exists, without reading collections
+    2) Expect a single collection's games to be changed and read without indexing every collection
+    3) Expect compaction to drop superseded rows of collection_games, leaving collections unchanged
+    :return: None
+    """
+    def read_all(*args, **kwargs):
+        raise AssertionError("every row was read")
+
+    # scenario 1
+    with monkeypatch.context() as m:
+        m.setattr(collections, "validate_data_store", read_all)
+        assert not collections.migrate_collection_games()
+    # scenario 2
+    with monkeypatch.context() as m:
+        m.setattr(collections, "get_collection_game_index", read_all)
+        input_df = collections.get_collections("c_1")
+        collections.add_game_to_collection(input_df, "c_1", "g1")
+        x = collections.remove_game_from_collection(input_df, "c_1", "g14")
+        assert x["game_ids"].iloc[0] == "g16, g18, g23, g25, g3, g31, g50, g1"
+        assert list(collections.get_collection_games("c_1")["game_id"]) == x["game_ids"].iloc[0].split(", ")
+    # scenario 3
+    y = collections.get_collections()
+    config.compact_data_store(collections.collection_game_file)
+    x = config.validate_data_store(collections.collection_game_file, collections.collection_game_terms)
+    assert not x.duplicated(["collection_id", "game_id"]).any()
+    assert list(x.loc[x["removed_at"].notna(), "game_id"]) == ["g14"]
+    assert collections.get_collections().equals(y)
+    assert config.compact_data_store(collections.collection_game_file) == 0
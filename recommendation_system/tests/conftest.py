@@ -1,3 +1,6 @@
+import glob
+import os
+import shutil
 import pytest
 
 @pytest.fixture
@@ -229,4 +232,31 @@ def mock_invalid_verb_cli_arguments():
 
     return Namespace(
         verb='TEST'
-    )
\ No newline at end of file
+    )
+@pytest.fixture
+def data_store(tmp_path, monkeypatch):
+    """
+    Point every endpoint and the CLI at a copy of the sample data store in a temporary directory,
+    so tests can write to it, with collection games migrated as initialise_data_store does.
+    Returns the directory.
+    """
+    import cli
+    from api import collections, config, data_store, games, recommendations, reviews, users
+
+    sample_data = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../sample_data")
+    for file in glob.glob(os.path.join(sample_data, "*.csv")):
+        shutil.copy(file, str(tmp_path))
+    directory = str(tmp_path) + os.sep
+    for module in [config, collections, data_store, games, recommendations, reviews, users, cli]:
+        for name, value in list(vars(module).items()):
+            if name.endswith("_file") and isinstance(value, str):
+                monkeypatch.setattr(module, name, os.path.join(directory, os.path.basename(value)))
+            elif name.endswith("_files") and isinstance(value, list):
+                monkeypatch.setattr(
+                    module, name, [os.path.join(directory, os.path.basename(file)) for file in value]
+                )
+        for name in ["API_DATA_STORE", "MAIN_DATA_STORE"]:
+            if hasattr(module, name):
+                monkeypatch.setattr(module, name, directory)
+    collections.migrate_collection_games()
+    return tmp_path
@@ -0,0 +1,58 @@
+"""
+Unit tests for game content encoding and approximate nearest neighbour search
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from api.utilities import content, lsh
+
+
+# Sample Data
+game_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    "../sample_data/games.csv"
+)
+game_df = pd.read_csv(game_file)
+
+
+def test_arguments():
+    """
+    1) Expect TypeError if game data is not a data frame
+    2) Expect KeyError if game data is missing content columns
+    3) Expect TypeError if vectors do not match ids
+    :return: None
+    """
+    # Scenario 1
+    with pytest.raises(TypeError):
+        content.encode("a")
+    # Scenario 2
+    with pytest.raises(KeyError):
+        content.encode(game_df.drop(columns=["keywords"]))
+    # Scenario 3
+    with pytest.raises(TypeError):
+        lsh.build(np.zeros((3, 2)), ["g1", "g2"])
+
+
+def test_return():
+    """
+    1) Expect one fixed width vector per game, with a feature per term of each content column
+    2) Expect comma separated terms to be encoded individually
+    3) Expect LSH neighbours to match brute force when every bucket is probed
+    :return: None
+    """
+    vectors, names = content.encode(game_df)
+    # scenario 1
+    assert vectors.shape == (len(game_df), len(names))
+    assert "keywords=Adventure" in names and "keywords=Fantasy, Adventure" not in names
+    # scenario 2
+    first = dict(zip(names, vectors[0]))
+    assert first["keywords=Fantasy"] == pytest.approx(first["keywords=Adventure"])
+    assert first["keywords=Fantasy"] > 0
+    # scenario 3
+    index = lsh.build(vectors, game_df["game_id"].to_numpy(), n_tables=4, n_bits=1)
+    for position in range(0, len(game_df), 7):
+        approximate, similarities = lsh.query(index, vectors[position], 5)
+        exact, _ = lsh.brute_force(index, vectors[position], 5)
+        assert list(approximate) == list(exact)
+        assert list(similarities) == sorted(similarities, reverse=True)
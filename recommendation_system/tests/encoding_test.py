@@ -0,0 +1,106 @@
+"""
+Unit tests for dictionary encoding of ids
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import cli
+from api import config, games, reviews
+from api.utilities import encoding
+
+
+# Sample Data
+registered = ["g1", "g10", "g2", "g10"]
+
+
+def test_arguments():
+    """
+    1) Expect TypeError if encoding or fallback is not an IdEncoding
+    2) Expect TypeError if an id column is not encoded
+    :return: None
+    """
+    # Scenario 1
+    with pytest.raises(TypeError):
+        encoding.encode(registered, ["g1"])
+    with pytest.raises(TypeError):
+        encoding.decode(registered, [0])
+    with pytest.raises(TypeError):
+        encoding.encode(encoding.build(registered), ["g1"], registered)
+    with pytest.raises(TypeError):
+        encoding.extend(registered, ["g1"])
+    # Scenario 2
+    with pytest.raises(TypeError):
+        config.encode_ids(pd.DataFrame({"username": ["u"]}), ["username"])
+
+
+def test_return():
+    """
+    1) Expect codes to be the position ids were first registered at, as int32
+    2) Expect null ids to be encoded as MISSING_CODE and unregistered ids as UNKNOWN_CODE, both
+    decoded as None
+    3) Expect categorical ids to be encoded as their categories are
+    4) Expect only unique, unregistered ids to be returned in order of first appearance
+    5) Expect ids outwith an encoding to be encoded and decoded by its fallback, whose codes
+    start after its own
+    :return: None
+    """
+    x = encoding.build(registered)
+    # scenario 1
+    codes = encoding.encode(x, ["g2", "g10", "g1"])
+    assert codes.dtype == np.int32
+    assert list(codes) == [2, 1, 0]
+    assert list(encoding.decode(x, codes)) == ["g2", "g10", "g1"]
+    # scenario 2
+    codes = encoding.encode(x, ["g3", None, "g1"])
+    assert list(codes) == [encoding.UNKNOWN_CODE, encoding.MISSING_CODE, 0]
+    assert list(encoding.decode(x, codes)) == [None, None, "g1"]
+    # scenario 3
+    values = pd.Series(["g10", "g3", None, "g10"], dtype="category")
+    assert list(encoding.encode(x, values)) == [1, encoding.UNKNOWN_CODE, encoding.MISSING_CODE, 1]
+    # scenario 4
+    assert encoding.unregistered(x, values) == ["g3"]
+    assert encoding.unregistered(x, ["g4", "g1", "g3", "g4"]) == ["g4", "g3"]
+    # scenario 5
+    y = encoding.extend(encoding.build([], 100), ["g4", "g1", "g4"])
+    assert encoding.extend(y, ["g1"]) is y
+    codes = encoding.encode(y, ["g1", "g2", "g4", "g5", None], x)
+    assert list(codes) == [101, 2, 100, encoding.UNKNOWN_CODE, encoding.MISSING_CODE]
+    assert list(encoding.decode(y, codes, x)) == ["g1", "g2", "g4", None, None]
+
+
+def test_data_store_return(data_store):
+    """
+    1) Expect reads, including a GET of every game, to encode ids without registering them
+    2) Expect ids read by separate tables to be given the same code, and decoded back to the ids
+    3) Expect an unknown id to match no rows, not even those with a null id
+    4) Expect ids to be registered once written, keeping the code they were first read with
+    :return: None
+    """
+    review_df = pd.read_csv(reviews.review_file)
+    # a review without a user
+    review_df.iloc[:1].assign(user_id=None).to_csv(reviews.review_file, mode="a", header=False, index=False)
+    id_code_file = os.path.join(str(data_store), config.ID_CODE_DATA)
+    # ids of collections and their games are registered as collection games are migrated
+    registered = len(config.validate_data_store(id_code_file, []))
+    # scenario 1
+    assert cli.execute_request("GET", "GAMES", [])[0] == 200
+    game_df = config.validate_data_store(games.game_file, [], codes=["game_id"])
+    x = config.validate_data_store(reviews.review_file, [], codes=["user_id", "game_id"])
+    assert len(config.validate_data_store(id_code_file, [])) == registered
+    # scenario 2
+    assert x["game_id"].dtype == np.int32
+    assert len(pd.merge(x, game_df[["game_id"]], on="game_id")) == len(x)
+    y = config.decode_ids(x, ["user_id", "game_id"])
+    assert list(y["game_id"]) == list(review_df["game_id"]) + [review_df["game_id"][0]]
+    assert list(y["user_id"][:-1]) == list(review_df["user_id"]) and pd.isna(y["user_id"].iloc[-1])
+    # scenario 3
+    assert config.encode_id("user_id", "u_unknown") == encoding.UNKNOWN_CODE
+    assert (x["user_id"] == encoding.MISSING_CODE).sum() == 1
+    assert len(config.select_data_store(reviews.review_file, [], "user_id", "u_unknown", codes=["user_id"])) == 0
+    # scenario 4
+    code = config.encode_id("game_id", "g1")
+    reviews.add_review("u_new", "g1", [1, 2, 3, 4])
+    assert {"u_new", "g1"} <= set(config.validate_data_store(id_code_file, [])["id"])
+    assert config.encode_id("game_id", "g1") == code
+    assert config.encode_id("user_id", "u_new") < config.LOCAL_ID_CODE_START
@@ -0,0 +1,125 @@
+"""
+Unit tests for matrix factorisation recommendations
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from api.utilities import factorisation, sparse
+
+
+# Sample Data
+review_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    "../sample_data/reviews.csv"
+)
+review_df = pd.read_csv(review_file)
+matrix = sparse.rating_matrix(review_df)
+
+
+def error(model, ratings):
+    """
+    Root mean squared error of a model's predictions of the entries of a rating matrix.
+    """
+    users = pd.Index(model.user_ids).get_indexer(ratings.row_ids)[sparse.row_positions(ratings)]
+    games = pd.Index(model.game_ids).get_indexer(ratings.column_ids)[ratings.indices]
+    factors = np.sum(model.user_factors[users] * model.game_factors[games], axis=1)
+    predicted = model.user_means[users] + factors
+    return np.sqrt(np.mean((predicted - ratings.data) ** 2))
+
+
+def test_arguments():
+    """
+    1) Expect TypeError if matrix or model are not as expected
+    2) Expect TypeError if factors, iterations, regularisation or user_means are not as expected
+    :return: None
+    """
+    # Scenario 1
+    with pytest.raises(TypeError):
+        factorisation.train(review_df)
+    with pytest.raises(TypeError):
+        factorisation.train(matrix, model=matrix)
+    with pytest.raises(TypeError):
+        factorisation.user_recommendations(matrix, matrix, "u_1")
+    # Scenario 2
+    with pytest.raises(TypeError):
+        factorisation.train(matrix, factors=0)
+    with pytest.raises(TypeError):
+        factorisation.train(matrix, iterations=1.5)
+    with pytest.raises(TypeError):
+        factorisation.train(matrix, regularisation=0)
+    with pytest.raises(TypeError):
+        factorisation.train(matrix, user_means=np.zeros(len(matrix.row_ids) + 1))
+
+
+def test_return():
+    """
+    1) Expect each batch solved row to match its own regularised least squares solution
+    2) Expect training to fit reviews more closely than each user's mean score
+    3) Expect recommendations to score every unreviewed game, by the user's mean plus the dot
+    product of factors, in desc. order of predicted_score
+    4) Expect no recommendations for a user without reviews
+    5) Expect factors to be fit around given user means, with users without a mean (NaN) taking
+    the mean of their row
+    :return: None
+    """
+    model = factorisation.train(matrix, factors=4, iterations=10)
+    centred = sparse.centre_rows(matrix)
+    # scenario 1
+    x = factorisation._solve_rows(centred, model.game_factors, 0.1)
+    for row in [0, 7]:
+        start, end = centred.indptr[row], centred.indptr[row + 1]
+        vectors = model.game_factors[centred.indices[start:end]]
+        expected = np.linalg.solve(
+            vectors.T @ vectors + 0.1 * (end - start) * np.eye(4),
+            vectors.T @ centred.data[start:end]
+        )
+        np.testing.assert_allclose(x[row], expected)
+    # scenario 2
+    assert error(model, matrix) < np.sqrt(np.mean(centred.data ** 2))
+    # scenario 3
+    x = factorisation.user_recommendations(model, matrix, "u_1")
+    reviewed = review_df.loc[review_df["user_id"] == "u_1", "game_id"]
+    assert set(x["game_id"]) == set(matrix.column_ids) - set(reviewed)
+    assert x["predicted_score"].is_monotonic_decreasing
+    user, game = list(model.user_ids).index("u_1"), list(model.game_ids).index(x["game_id"][0])
+    assert x["predicted_score"][0] == pytest.approx(
+        model.user_means[user] + model.user_factors[user] @ model.game_factors[game]
+    )
+    # scenario 4
+    assert len(factorisation.user_recommendations(model, matrix, "u_0")) == 0
+    # scenario 5
+    means = sparse.row_means(matrix)
+    means[0] = np.nan
+    x = factorisation.train(matrix, factors=4, iterations=10, user_means=means)
+    np.testing.assert_allclose(x.user_factors, model.user_factors)
+    means = sparse.row_means(matrix) + 1
+    x = factorisation.train(matrix, factors=4, iterations=10, user_means=means)
+    np.testing.assert_allclose(x.user_means, means)
+    assert error(x, matrix) < np.sqrt(np.mean(sparse.centre_rows(matrix, means).data ** 2))
+
+
+def test_warm_return(tmp_path):
+    """
+    1) Expect a persisted model to load equal to the model
+    2) Expect a model warm started after new reviews to hold factors for new users and games,
+    and to fit better after a single iteration than a model trained from scratch
+    :return: None
+    """
+    file = str(tmp_path / "factor_model.npz")
+    model = factorisation.train(matrix, iterations=10)
+    # scenario 1
+    factorisation.save(model, file)
+    x = factorisation.load(file)
+    for name in factorisation.FactorModel._fields:
+        np.testing.assert_array_equal(getattr(x, name), getattr(model, name))
+    # scenario 2
+    new_reviews = pd.DataFrame({
+        "user_id": ["u_new", "u_1"],
+        "game_id": ["g1", "g_new"],
+        "overall_score": [4, 2]
+    })
+    ratings = sparse.rating_matrix(pd.concat([review_df, new_reviews], ignore_index=True))
+    warm = factorisation.train(ratings, iterations=1, model=x)
+    assert {"u_new"} < set(warm.user_ids) and {"g_new"} < set(warm.game_ids)
+    assert error(warm, ratings) < error(factorisation.train(ratings, iterations=1), ratings)
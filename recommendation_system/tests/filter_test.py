@@ -53,3 +53,36 @@ def test_return():
     x = filter.data_frame(game_df, {"game_type": "Board Game", "game_id": "g1"})
     assert isinstance(x, pd.DataFrame)
     assert len(x) == 1
+
+
+def test_index_return():
+    """
+    1) Expect a single term to match games holding it within a comma separated value
+    2) Expect "," to combine terms in AND fashion, "|" in OR fashion and "!" to negate a term
+    3) Expect matching to be case-insensitive, and results identical with a prebuilt index
+    4) Expect ValueError if a given index was not built from the input
+    :return: None
+    """
+    terms = game_df["keywords"].fillna("").str.split(",").apply(lambda x: {t.strip() for t in x})
+    # scenario 1
+    x = filter.data_frame(game_df, {"keywords": "Adventure"})
+    assert set(x["game_id"]) == set(game_df.loc[terms.apply(lambda t: "Adventure" in t), "game_id"])
+    assert "g1" in set(x["game_id"])
+    # scenario 2
+    x = filter.data_frame(game_df, {"keywords": "Fantasy, Adventure"})
+    assert set(x["game_id"]) == set(
+        game_df.loc[terms.apply(lambda t: {"Fantasy", "Adventure"} <= t), "game_id"]
+    )
+    x = filter.data_frame(game_df, {"keywords": "Fantasy, !Adventure | Maze"})
+    expected = terms.apply(lambda t: ("Fantasy" in t and "Adventure" not in t) or "Maze" in t)
+    assert set(x["game_id"]) == set(game_df.loc[expected, "game_id"])
+    x = filter.data_frame(game_df, {"genre": "!Fantasy", "game_type": "Board Game | Card Game"})
+    expected = (game_df["genre"] != "Fantasy") & game_df["game_type"].isin(["Board Game", "Card Game"])
+    assert set(x["game_id"]) == set(game_df.loc[expected, "game_id"])
+    # scenario 3
+    index = filter.build_index(game_df)
+    y = filter.data_frame(game_df, {"genre": "!fantasy", "game_type": "board game | CARD GAME"}, index)
+    assert list(y["game_id"]) == list(x["game_id"])
+    # scenario 4
+    with pytest.raises(ValueError):
+        filter.data_frame(game_df.iloc[:5], {"genre": "War"}, index)
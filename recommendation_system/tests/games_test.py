@@ -0,0 +1,23 @@
+"""
+Unit tests for the games endpoint, against a copy of the sample data store
+"""
+import pandas as pd
+from api import games
+
+
+def test_details_return(data_store):
+    """
+    1) Expect games to be filtered and ranked without reading columns not needed to do so
+    2) Expect the details of ranked games to match ranking the full game data, in the same order
+    :return: None
+    """
+    filter_dict = {"genre": "Fantasy"}
+    # scenario 1
+    x = games.get_games(None, filter_dict, columns=games.game_rank_terms)
+    assert list(x.columns) == games.game_rank_terms
+    # scenario 2
+    for limit, rank_mode in [(5, "MEAN"), (None, "BAYESIAN")]:
+        y = games.get_game_details(games.post_games(x, limit=limit, rank_mode=rank_mode))
+        expected = games.post_games(games.get_games(None, filter_dict), limit=limit, rank_mode=rank_mode)
+        assert "game_description" in y.columns
+        pd.testing.assert_frame_equal(y, expected)
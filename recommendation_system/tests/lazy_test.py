@@ -0,0 +1,38 @@
+"""
+Unit tests for lazy imports
+"""
+import sys
+import pytest
+from api.utilities.lazy import is_loaded, lazy_import
+
+
+def test_arguments():
+    """
+    1) Expect ModuleNotFoundError if the module cannot be found
+    :return: None
+    """
+    # Scenario 1
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import("missing_module")
+
+
+def test_return(tmp_path, monkeypatch):
+    """
+    1) Expect the module not to be executed by lazy_import, or an import statement of it
+    2) Expect the module to be executed once an attribute is first accessed
+    3) Expect an already imported module to be returned as is
+    :return: None
+    """
+    (tmp_path / "lazy_sample.py").write_text("executions = [1]\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "lazy_sample", raising=False)
+    x = lazy_import("lazy_sample")
+    # scenario 1
+    import lazy_sample
+    assert lazy_sample is x
+    assert not is_loaded("lazy_sample")
+    # scenario 2
+    assert x.executions == [1]
+    assert is_loaded("lazy_sample")
+    # scenario 3
+    assert lazy_import("lazy_sample") is sys.modules["lazy_sample"]
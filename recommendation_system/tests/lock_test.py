@@ -0,0 +1,75 @@
+"""
+Unit tests for table locks, stressed by concurrent writers in separate processes
+"""
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from api import config
+from api.utilities import lock, storage
+
+# Sample Data
+n_processes = 8
+n_writes = 25
+association_df = pd.DataFrame({
+    "collection_id": ["c_0"],
+    "game_id": ["g0"],
+    "added_at": ["2020-01-01"],
+    "removed_at": [None]
+})
+
+
+def test_arguments(tmp_path):
+    """
+    1) Expect locks to be re-entrant within a process, and released by the outermost hold
+    :return: None
+    """
+    file = str(tmp_path / "users.csv")
+    # Scenario 1
+    with lock.exclusive(file):
+        with lock.exclusive(file):
+            assert lock.is_held(file)
+        assert lock.is_held(file)
+    assert not lock.is_held(file)
+
+
+def test_return(tmp_path):
+    """
+    1) Expect no lost updates from concurrent processes reading, modifying and replacing a table
+    2) Expect no lost rows from concurrent processes appending to a logged table while it is
+    repeatedly compacted
+    :return: None
+    """
+    # scenario 1
+    file = str(tmp_path / "counters.csv")
+    storage.write(pd.DataFrame({"counter": [0]}), file)
+    with ProcessPoolExecutor(max_workers=n_processes) as executor:
+        list(executor.map(_increment, [file] * n_processes))
+    assert storage.read(file)["counter"][0] == n_processes * n_writes
+    # scenario 2
+    file = str(tmp_path / config.COLLECTION_GAME_DATA)
+    config.write_data_store(association_df, file)
+    with ProcessPoolExecutor(max_workers=n_processes) as executor:
+        futures = [executor.submit(_append, file, i) for i in range(n_processes - 1)]
+        futures.append(executor.submit(_compact, file))
+        [future.result() for future in futures]
+    rows = config.validate_data_store(file, [])
+    assert len(rows) == 1 + (n_processes - 1) * n_writes
+    assert rows["game_id"].is_unique
+
+
+def _increment(file):
+    for _ in range(n_writes):
+        with lock.exclusive(file):
+            df = storage.read(file)
+            df["counter"] += 1
+            storage.write(df, file)
+
+
+def _append(file, process):
+    for i in range(n_writes):
+        rows_df = association_df.assign(game_id="g{}_{}".format(process, i))
+        config.write_data_store(rows_df, file, mode="a")
+
+
+def _compact(file):
+    for _ in range(n_writes):
+        config.compact_data_store(file)
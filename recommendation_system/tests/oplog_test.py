@@ -0,0 +1,76 @@
+"""
+Unit tests for table operation logs
+"""
+import os
+import pandas as pd
+from api.utilities import oplog
+
+
+# Sample Data
+user_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    "../sample_data/users.csv"
+)
+user_df = pd.read_csv(user_file)
+
+
+def test_arguments():
+    """
+    1) Expect no operations and offset 0 if a table has no log
+    :return: None
+    """
+    # Scenario 1
+    assert oplog.read("missing.csv") == ([], 0)
+
+
+def test_return(tmp_path):
+    """
+    1) Expect replayed inserts and deletes to match applying them to the table directly
+    2) Expect replaying operations already within the table to leave it unchanged
+    3) Expect a partially written last line to be ignored, and dropped before the next append
+    4) Expect truncating to an offset to keep only operations logged after it
+    :return: None
+    """
+    file = str(tmp_path / "users.csv")
+    snapshot = user_df.iloc[:10]
+    oplog.insert(file, user_df.iloc[10:15])
+    oplog.delete(file, "user_id", [user_df["user_id"][0], user_df["user_id"][12]])
+    oplog.insert(file, user_df.iloc[15:20])
+    operations, offset = oplog.read(file)
+    x = oplog.replay(snapshot, operations, "user_id")
+    expected = user_df.iloc[:20].drop(index=[0, 12]).reset_index(drop=True)
+    # scenario 1
+    assert x["user_id"].tolist() == expected["user_id"].tolist()
+    assert x["username"].tolist() == expected["username"].tolist()
+    # scenario 2
+    assert oplog.replay(x, operations, "user_id")["user_id"].tolist() == x["user_id"].tolist()
+    # scenario 3
+    with open(oplog.log_path(file), "ab") as log_file:
+        log_file.write(b'{"op": "insert", "ro')
+    assert oplog.read(file) == (operations, offset)
+    oplog.delete(file, "user_id", [user_df["user_id"][1]])
+    assert len(oplog.read(file)[0]) == len(operations) + 1
+    # scenario 4
+    oplog.truncate(file, offset)
+    assert oplog.read(file)[0] == [{"op": oplog.DELETE, "column": "user_id", "values": [user_df["user_id"][1]]}]
+    oplog.truncate(file, None)
+    assert oplog.signature(file) is None
+
+
+def test_chunk_return(tmp_path):
+    """
+    1) Expect replaying operations on a snapshot read in chunks to match replaying them on the
+    whole snapshot, including inserts of keys already within the snapshot and deleted keys
+    :return: None
+    """
+    file = str(tmp_path / "users.csv")
+    snapshot = user_df.iloc[:10]
+    oplog.insert(file, user_df.iloc[[3, 10, 11]])
+    oplog.delete(file, "user_id", [user_df["user_id"][2], user_df["user_id"][10]])
+    oplog.insert(file, user_df.iloc[[2, 12]])
+    operations = oplog.read(file)[0]
+    expected = oplog.replay(snapshot, operations, "user_id")
+    # scenario 1
+    chunks = [snapshot.iloc[start:start + 3] for start in range(0, len(snapshot), 3)]
+    x = pd.concat(oplog.replay_chunks(chunks, operations, "user_id"), ignore_index=True)
+    pd.testing.assert_frame_equal(x, expected)
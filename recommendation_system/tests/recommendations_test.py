@@ -0,0 +1,194 @@
+"""
+Unit tests for the recommendations endpoint, against a copy of the sample data store
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import cli
+from api import recommendations, reviews
+from api.utilities import aggregates, similarity, sparse
+
+
+def test_arguments(data_store):
+    """
+    1) Expect FileNotFoundError if neighbour lists have not been built, rather than a rebuild
+    :return: None
+    """
+    # Scenario 1
+    with pytest.raises(FileNotFoundError):
+        recommendations.get_item_item_recommendations("u_1")
+    assert not os.path.exists(recommendations.neighbour_file)
+
+
+def test_user_return(data_store):
+    """
+    1) Expect user-user recommendations from maintained per-user means to match those from means
+    calculated over every review, once a review has been added
+    :return: None
+    """
+    reviews.add_review("u_1", "g1", [1, 2, 3, 4])
+    review_df = reviews.get_reviews()
+    # scenario 1
+    x = recommendations.get_user_user_recommendations("u_1", neighbours=5)
+    assert os.path.exists(reviews.user_aggregate_file)
+    expected = similarity.user_user_recommendations(sparse.rating_matrix(review_df), "u_1", 5)
+    assert len(x) > 0
+    # games of equal predicted_score may be ordered apart, so scores are compared per game
+    x = x.set_index("game_id")["predicted_score"].sort_index()
+    expected = expected.set_index("game_id")["predicted_score"].sort_index()
+    pd.testing.assert_series_equal(x, expected, check_index_type=False)
+
+
+def test_item_return(data_store, monkeypatch):
+    """
+    1) Expect a user's history to be the games of their own reviews and collections
+    2) Expect item-item recommendations to exclude the user's history
+    3) Expect neighbour lists not to be rebuilt on GET once reviews change, only by a rebuild
+    4) Expect item-item recommendations to select only the rows of the user's history, and match
+    those from the neighbour lists of every game
+    :return: None
+    """
+    recommendations.rebuild_game_neighbours()
+    interactions = recommendations.get_user_game_interactions()
+    # scenario 1
+    x = recommendations.get_user_game_history("u_1")
+    assert sorted(x) == sorted(interactions.loc[interactions["user_id"] == "u_1", "game_id"])
+    assert recommendations.get_user_game_history("u_0") == []
+    # scenario 2
+    y = recommendations.get_item_item_recommendations("u_1")
+    assert len(y) > 0
+    assert not set(y["game_id"]) & set(x)
+    # scenario 3
+    written = os.stat(recommendations.neighbour_file).st_mtime_ns
+    reviews.add_review("u_1", "g1", [1, 2, 3, 4])
+    assert "g1" in recommendations.get_user_game_history("u_1")
+    recommendations.get_item_item_recommendations("u_1")
+    recommendations.get_game_neighbours()
+    assert os.stat(recommendations.neighbour_file).st_mtime_ns == written
+    # scenario 4
+    def read_all(*args, **kwargs):
+        raise AssertionError("every row was read")
+
+    expected = similarity.item_item_recommendations(
+        similarity.neighbour_lists(recommendations.get_game_neighbours()),
+        recommendations.get_user_game_history("u_1")
+    )
+    with monkeypatch.context() as m:
+        m.setattr(recommendations, "validate_data_store", read_all)
+        m.setattr(recommendations, "get_collection_games", read_all)
+        y = recommendations.get_item_item_recommendations("u_1")
+    pd.testing.assert_frame_equal(y[expected.columns], expected, check_dtype=False)
+
+
+def test_matrix_arguments(data_store):
+    """
+    1) Expect TypeError if score is not a review score
+    2) Expect TypeError if weighting is not 4 int or float values
+    3) Expect ValueError if weighting is negative or sums to zero, before any matrix is written
+    :return: None
+    """
+    # Scenario 1
+    with pytest.raises(TypeError):
+        recommendations.get_rating_matrix("score")
+    # Scenario 2
+    for weighting in [[1, 1, 1], [1, 1, 1, "1"], [1, 1, 1, True]]:
+        with pytest.raises(TypeError):
+            recommendations.rating_matrix_file(weighting=weighting)
+    # Scenario 3
+    for weighting in [[0, 0, 0, 0], [1, 1, 1, -1]]:
+        with pytest.raises(ValueError):
+            recommendations.rebuild_rating_matrix(weighting=weighting)
+    assert not [file for file in os.listdir(str(data_store)) if file.endswith(".npz")]
+
+
+def test_matrix_return(data_store):
+    """
+    1) Expect matrices to be persisted in the data store, named by score or weighting
+    2) Expect a weighted matrix to hold the weighted mean of each review's scores
+    3) Expect a matrix to be reloaded until reviews change, then rebuilt with the new review
+    4) Expect --output NPZ to return the location of the persisted matrix
+    :return: None
+    """
+    # scenario 1
+    x = recommendations.rating_matrix_file()
+    assert x == str(data_store / "rating_matrix_overall_score.npz")
+    y = recommendations.rating_matrix_file(weighting=[1, 0.5, 0, 2])
+    assert y == str(data_store / "rating_matrix_weighted_1_0.5_0_2.npz")
+    # scenario 2
+    matrix = recommendations.get_rating_matrix(weighting=[1, 0.5, 0, 2])
+    assert os.path.exists(y)
+    review_df = reviews.get_reviews()
+    weighted = review_df[reviews.review_terms].to_numpy(dtype=float) @ np.array([1, 0.5, 0, 2]) / 3.5
+    expected = sparse.rating_matrix(review_df.assign(score=weighted), "score")
+    np.testing.assert_allclose(matrix.data, expected.data)
+    assert list(matrix.row_ids) == list(expected.row_ids)
+    # scenario 3
+    recommendations.get_rating_matrix()
+    written = os.stat(x).st_mtime_ns
+    recommendations.get_rating_matrix()
+    assert os.stat(x).st_mtime_ns == written
+    reviews.add_review("u_1", "g1", [1, 2, 3, 4])
+    matrix = recommendations.get_rating_matrix()
+    assert os.stat(x).st_mtime_ns != written
+    entries = sparse.to_frame(matrix, ("user_id", "game_id", "score"))
+    assert entries.loc[(entries["user_id"] == "u_1") & (entries["game_id"] == "g1"), "score"].tolist() == [4]
+    # scenario 4
+    status, response = cli.execute_request(
+        "GET",
+        "RECOMMENDATIONS",
+        cli.request_options({"function": "MATRIX", "output": "NPZ", "weighting": [1, 0.5, 0, 2]})
+    )
+    assert status == 200 and response["data"] == y
+    np.testing.assert_allclose(sparse.load(response["data"]).data, sparse.load(y).data)
+
+
+def test_factor_return(data_store, monkeypatch):
+    """
+    1) Expect a model to be trained once, then reloaded until reviews change
+    2) Expect the model to be retrained once a review is added, and its game no longer recommended
+    3) Expect a model trained by another process while waiting for the lock to be loaded, not
+    trained again
+    4) Expect PUT RECOMMENDATIONS -f MODEL to retrain the model and return its dimensions
+    5) Expect the model to be fit around each user's mean from the maintained per-user aggregates
+    :return: None
+    """
+    file = recommendations.factor_model_file()
+    # scenario 1
+    x = recommendations.get_factor_recommendations("u_1")
+    assert len(x) > 0 and os.path.exists(file)
+    # the model is replaced by a new file each time it is written
+    written = os.stat(file).st_ino
+    recommendations.get_factor_model()
+    assert os.stat(file).st_ino == written
+    # scenario 2
+    reviews.add_review("u_1", x["game_id"][0], [1, 2, 3, 4])
+    recommendations.get_factor_model()
+    assert os.stat(file).st_ino != written
+    assert x["game_id"][0] not in set(recommendations.get_factor_recommendations("u_1")["game_id"])
+    # scenario 3
+    reviews.add_review("u_1", x["game_id"][1], [1, 2, 3, 4])
+    assert recommendations.file_outdated(file, [reviews.review_file])
+    lock_data_store = recommendations.lock_data_store
+
+    def contended(lock_file):
+        os.utime(lock_file)
+        return lock_data_store(lock_file)
+
+    with monkeypatch.context() as contention:
+        contention.setattr(recommendations, "lock_data_store", contended)
+        contention.setattr(recommendations, "train_factor_model", None)
+        assert recommendations.get_factor_model().user_factors.shape[1] == recommendations.ALS_FACTORS
+    # scenario 4
+    written = os.stat(file).st_ino
+    status, response = cli.execute_request("PUT", "RECOMMENDATIONS", [("function", "MODEL")])
+    model = recommendations.get_factor_model()
+    assert status == 200 and os.stat(file).st_ino != written
+    assert response["data"] == [{
+        "user_count": len(model.user_ids),
+        "game_count": len(model.game_ids),
+        "factors": recommendations.ALS_FACTORS
+    }]
+    # scenario 5
+    means = aggregates.mean_scores(reviews.get_user_aggregates(), "user_id")["overall_score"]
+    np.testing.assert_allclose(model.user_means, means.reindex(model.user_ids).to_numpy(dtype=float))
@@ -0,0 +1,47 @@
+"""
+Unit tests for the reviews endpoint, against a copy of the sample data store
+"""
+import pandas as pd
+import pytest
+from api import config, reviews
+
+
+def test_arguments(data_store):
+    """
+    1) Expect ValueError if a declared column is not within the table
+    2) Expect ValueError if a required column of the endpoint is missing from the table
+    :return: None
+    """
+    # Scenario 1
+    with pytest.raises(ValueError):
+        config.validate_data_store(reviews.review_file, [], columns=["game_id", "helpful_votes"])
+    # Scenario 2
+    pd.read_csv(reviews.review_file).drop(columns=["overall_score"]).to_csv(reviews.review_file, index=False)
+    with pytest.raises(ValueError):
+        reviews.get_reviews()
+    with pytest.raises(ValueError):
+        reviews.rebuild_review_aggregates()
+
+
+def test_columns_return(data_store):
+    """
+    1) Expect reviews to be read with declared dtypes: user and game ids as categories, review ids
+    as strings and scores as int8, whether read whole or selected by id
+    2) Expect only the declared columns to be read, in the order declared
+    :return: None
+    """
+    # scenario 1
+    for x in [reviews.get_reviews(), reviews.get_reviews(user_id="u_1")]:
+        assert isinstance(x["user_id"].dtype, pd.CategoricalDtype)
+        assert isinstance(x["game_id"].dtype, pd.CategoricalDtype)
+        assert pd.api.types.is_string_dtype(x["review_id"].dtype)
+        assert all(x[term].dtype == "int8" for term in reviews.review_terms)
+    # scenario 2
+    x = config.validate_data_store(
+        reviews.review_file,
+        reviews.review_terms,
+        columns=["game_id", "overall_score"],
+        dtypes=reviews.review_dtypes
+    )
+    assert list(x.columns) == ["game_id", "overall_score"]
+    assert isinstance(x["game_id"].dtype, pd.CategoricalDtype) and x["overall_score"].dtype == "int8"
@@ -0,0 +1,34 @@
+"""
+Unit tests for persisted sequences
+"""
+from concurrent.futures import ProcessPoolExecutor
+from api.utilities import sequence
+
+
+def test_arguments(tmp_path):
+    """
+    1) Expect start to only be called to initialise a sequence
+    :return: None
+    """
+    file = str(tmp_path / "users.csv")
+    calls = []
+    # Scenario 1
+    assert sequence.next_value(file, lambda: calls.append(1) or 20) == 21
+    assert sequence.next_value(file, lambda: calls.append(1) or 20) == 22
+    assert calls == [1]
+
+
+def test_return(tmp_path):
+    """
+    1) Expect concurrent processes never to be issued the same number
+    :return: None
+    """
+    file = str(tmp_path / "users.csv")
+    # scenario 1
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        values = list(executor.map(_next_value, [file] * 200))
+    assert sorted(values) == list(range(1, 201))
+
+
+def _next_value(file):
+    return sequence.next_value(file, lambda: 0)
@@ -0,0 +1,72 @@
+"""
+Unit tests for the server mode
+"""
+import server
+from api.utilities import cache
+
+
+def test_arguments():
+    """
+    1) Expect status 400 if an option is not valid for the given object and verb
+    2) Expect status 400 if the object is not valid
+    3) Expect status 400 if the body is not a JSON object
+    :return: None
+    """
+    # Scenario 1
+    status, response = server.handle("GET", "/GAMES?bogus=1")
+    assert status == 400
+    assert response["data"] is None
+    assert "unrecognized arguments: --bogus 1" in response["messages"][-1]
+    # Scenario 2
+    assert server.handle("GET", "/BOGUS")[0] == 400
+    # Scenario 3
+    assert server.handle("POST", "/REVIEWS", b"{")[0] == 400
+    assert server.handle("POST", "/REVIEWS", b"[1, 2]")[0] == 400
+
+
+def test_return(data_store):
+    """
+    1) Expect status 200 and the controller's result as JSON records on a successful GET
+    2) Expect a POST given as a JSON body to be written, with its printed messages captured
+    3) Expect options to be given by name where their flag differs (game_id as --game-id)
+    :return: None
+    """
+    # Scenario 1
+    status, response = server.handle("GET", "/GAMES?id=g1")
+    assert status == 200
+    assert [game["game_id"] for game in response["data"]] == ["g1"]
+    # Scenario 2
+    body = b'{"user_id": "u_1", "game_id": "g1", "complexity_score": 1, "gameplay_score": 2, ' \
+           b'"visual_score": 3, "overall_score": 4}'
+    status, response = server.handle("POST", "/REVIEWS", body)
+    assert status == 200
+    assert response["data"][0]["overall_score"] == 4
+    assert "was successfully created" in response["messages"][-1]
+    status, response = server.handle("GET", "/REVIEWS?user_id=u_1&game_id=g1")
+    assert status == 200
+    assert [review["overall_score"] for review in response["data"]] == [4]
+    # Scenario 3
+    status, response = server.handle("PATCH", "/COLLECTIONS?id=c_1&game_id=g1")
+    assert status == 200
+    assert "g1" in response["data"][0]["game_ids"].split(", ")
+    assert "successfully added" in response["messages"][-1]
+
+
+def test_warm(data_store):
+    """
+    1) Expect the first GET of each endpoint after warming to be served from the table cache
+    :return: None
+    """
+    server.warm()
+    misses = cache.stats["misses"]
+    # scenario 1
+    for path in [
+        "/GAMES?limit=5",
+        "/GAMES?id=g1",
+        "/REVIEWS?user_id=u_1",
+        "/USERS?id=u_1",
+        "/COLLECTIONS?user_id=u_1",
+        "/RECOMMENDATIONS?user_id=u_1"
+    ]:
+        assert server.handle("GET", path)[0] == 200
+    assert cache.stats["misses"] == misses
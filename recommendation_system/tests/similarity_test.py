@@ -0,0 +1,113 @@
+"""
+Unit tests for similarity based recommendations
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from api.utilities import similarity, sparse
+
+
+# Sample Data
+review_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    "../sample_data/reviews.csv"
+)
+review_df = pd.read_csv(review_file)
+matrix = sparse.rating_matrix(review_df)
+
+
+def test_arguments():
+    """
+    1) Expect TypeError if matrix is not a sparse.RatingMatrix
+    2) Expect TypeError if neighbours is not a positive int, or similarity is not supported
+    3) Expect TypeError if user_means is not an array of a mean per row
+    :return: None
+    """
+    # Scenario 1
+    with pytest.raises(TypeError):
+        similarity.user_user_recommendations(review_df, "u_1")
+    # Scenario 2
+    with pytest.raises(TypeError):
+        similarity.user_user_recommendations(matrix, "u_1", neighbours=0)
+    with pytest.raises(TypeError):
+        similarity.user_user_recommendations(matrix, "u_1", similarity="jaccard")
+    # Scenario 3
+    with pytest.raises(TypeError):
+        similarity.user_user_recommendations(matrix, "u_1", user_means=list(sparse.row_means(matrix)))
+    with pytest.raises(TypeError):
+        similarity.user_user_recommendations(matrix, "u_1", user_means=sparse.row_means(matrix)[1:])
+
+
+@pytest.mark.parametrize("measure", ["pearson", "cosine"])
+def test_return(measure):
+    """
+    1) Expect no recommendations for an unknown user
+    2) Expect only games unreviewed by the user, in desc. order of predicted_score
+    3) Expect predicted scores to match a dense calculation over all users
+    4) Expect the same recommendations from given user means, where missing means are calculated
+    :return: None
+    """
+    # scenario 1
+    assert len(similarity.user_user_recommendations(matrix, "u_0", similarity=measure)) == 0
+    # scenario 2
+    x = similarity.user_user_recommendations(matrix, "u_1", neighbours=5, similarity=measure)
+    reviewed = set(review_df.loc[review_df["user_id"] == "u_1", "game_id"])
+    assert len(x) > 0
+    assert not reviewed.intersection(x["game_id"])
+    assert list(x["predicted_score"]) == sorted(x["predicted_score"], reverse=True)
+    # scenario 3
+    pivot = review_df.pivot_table(index="user_id", columns="game_id", values="overall_score")
+    values = pivot.sub(pivot.mean(axis=1), axis=0) if measure == "pearson" else pivot
+    values = values.fillna(0).to_numpy()
+    user = list(pivot.index).index("u_1")
+    norms = np.linalg.norm(values, axis=1)
+    sims = values @ values[user] / np.where(norms * norms[user] > 0, norms * norms[user], 1)
+    sims[user] = 0
+    top = np.argsort(-sims)[:5]
+    top = top[sims[top] > 0]
+    rated = pivot.notna().to_numpy()[top]
+    game = list(pivot.columns).index(x.iloc[0]["game_id"])
+    expected = (sims[top] * values[top, game])[rated[:, game]].sum() / sims[top][rated[:, game]].sum()
+    if measure == "pearson":
+        expected += pivot.iloc[user].mean()
+    assert x.iloc[0]["predicted_score"] == pytest.approx(expected)
+    # scenario 4
+    user_means = sparse.row_means(matrix)
+    user_means[::2] = np.nan
+    y = similarity.user_user_recommendations(matrix, "u_1", 5, measure, user_means)
+    pd.testing.assert_frame_equal(y, x)
+
+
+def test_item_item_return(monkeypatch):
+    """
+    1) Expect at most the given number of neighbours per game, in desc. order of similarity
+    2) Expect similarity to be the cosine of two games' binary user interactions
+    3) Expect recommendations to exclude history, ranked by summed similarity to history games
+    4) Expect the same neighbours whether games are counted in one block or many
+    :return: None
+    """
+    interactions = review_df[["user_id", "game_id"]].assign(interaction=1)
+    x = similarity.item_item_neighbours(sparse.rating_matrix(interactions, "interaction"), 3)
+    # scenario 1
+    assert x.groupby("game_id").size().max() == 3
+    for _, neighbours in x.groupby("game_id"):
+        assert list(neighbours["similarity"]) == sorted(neighbours["similarity"], reverse=True)
+    # scenario 2
+    pivot = interactions.pivot_table(index="user_id", columns="game_id", values="interaction")
+    pivot = pivot.fillna(0)
+    first = x.iloc[0]
+    a, b = pivot[first["game_id"]], pivot[first["neighbour_id"]]
+    assert first["similarity"] == pytest.approx((a * b).sum() / np.sqrt(a.sum() * b.sum()))
+    # scenario 3
+    history = ["g1", "g2"]
+    y = similarity.item_item_recommendations(similarity.neighbour_lists(x), history)
+    assert not set(history).intersection(y["game_id"])
+    expected = x[x["game_id"].isin(history) & ~x["neighbour_id"].isin(history)]
+    expected = expected.groupby("neighbour_id")["similarity"].sum()
+    assert y.iloc[0]["similarity_score"] == pytest.approx(expected.max())
+    assert len(y) == len(expected)
+    # scenario 4
+    monkeypatch.setattr(similarity, "neighbour_block_pairs", 50)
+    z = similarity.item_item_neighbours(sparse.rating_matrix(interactions, "interaction"), 3)
+    pd.testing.assert_frame_equal(z, x)
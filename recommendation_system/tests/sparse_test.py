@@ -0,0 +1,95 @@
+"""
+Unit tests for sparse rating matrices
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from api.utilities import sparse
+
+
+# Sample Data
+review_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    "../sample_data/reviews.csv"
+)
+review_df = pd.read_csv(review_file)
+
+
+def dense(matrix):
+    """
+    Expand a sparse matrix for comparison, with NaN where there is no entry.
+    """
+    output = np.full((len(matrix.row_ids), len(matrix.column_ids)), np.nan)
+    output[sparse.row_positions(matrix), matrix.indices] = matrix.data
+    return output
+
+
+def test_arguments():
+    """
+    1) Expect TypeError if review data is not a data frame
+    2) Expect TypeError if score is not a column of review data
+    :return: None
+    """
+    # Scenario 1
+    with pytest.raises(TypeError):
+        sparse.rating_matrix("a")
+    # Scenario 2
+    with pytest.raises(TypeError):
+        sparse.rating_matrix(review_df, "my_score")
+
+
+def test_return():
+    """
+    1) Expect matrix entries to match a dense pivot of the review data
+    2) Expect transpose, row means and centred rows to match their dense equivalents
+    3) Expect gathered rows to return the entries of the given rows only
+    :return: None
+    """
+    x = sparse.rating_matrix(review_df, "visual_score")
+    pivot = review_df.pivot_table(index="user_id", columns="game_id", values="visual_score")
+    # scenario 1
+    assert list(x.row_ids) == list(pivot.index)
+    assert list(x.column_ids) == list(pivot.columns)
+    np.testing.assert_array_equal(dense(x), pivot.to_numpy())
+    # scenario 2
+    np.testing.assert_array_equal(dense(sparse.transpose(x)), pivot.to_numpy().T)
+    np.testing.assert_allclose(sparse.row_means(x), pivot.mean(axis=1).to_numpy())
+    np.testing.assert_allclose(
+        dense(sparse.centre_rows(x)),
+        pivot.sub(pivot.mean(axis=1), axis=0).to_numpy()
+    )
+    # scenario 3
+    owner, columns, values = sparse.gather_rows(x, [3, 1])
+    for position, row in enumerate([3, 1]):
+        expected = pivot.iloc[row].dropna()
+        assert list(x.column_ids[columns[owner == position]]) == list(expected.index)
+        assert list(values[owner == position]) == list(expected)
+
+
+def test_persist_return(tmp_path):
+    """
+    1) Expect a saved matrix to load equal to the matrix, with entries memory-mapped
+    2) Expect entries as coordinates to match the review data
+    3) Expect TypeError if matrix is not a RatingMatrix, and ValueError if file is not a matrix
+    :return: None
+    """
+    file = str(tmp_path / "rating_matrix.npz")
+    matrix = sparse.rating_matrix(review_df, "gameplay_score")
+    sparse.save(matrix, file)
+    # scenario 1
+    for mmap in [True, False]:
+        x = sparse.load(file, mmap)
+        assert isinstance(x.data, np.memmap) == mmap
+        for name in sparse.RatingMatrix._fields:
+            np.testing.assert_array_equal(getattr(x, name), getattr(matrix, name))
+        assert x.row_ids.dtype == object
+    # scenario 2
+    x = sparse.to_frame(x, ("user_id", "game_id", "gameplay_score"))
+    expected = review_df.groupby(["user_id", "game_id"])["gameplay_score"].last()
+    assert x.set_index(["user_id", "game_id"])["gameplay_score"].sort_index().tolist() == expected.tolist()
+    # scenario 3
+    with pytest.raises(TypeError):
+        sparse.save(review_df, file)
+    with pytest.raises(ValueError):
+        sparse.load(review_file)
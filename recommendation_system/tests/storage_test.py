@@ -0,0 +1,179 @@
+"""
+Unit tests for data store storage backends
+"""
+import os
+import shutil
+import stat
+import pandas as pd
+import pytest
+from api.utilities import storage
+
+
+# Sample Data
+game_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    "../sample_data/games.csv"
+)
+game_df = pd.read_csv(game_file)
+review_file = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    "../sample_data/reviews.csv"
+)
+
+
+def test_arguments():
+    """
+    1) Expect ValueError if backend is not supported
+    2) Expect ValueError if write mode is not "w" or "a"
+    3) Expect FileNotFoundError if table does not exist
+    4) Expect ValueError if backend does not support queries
+    5) Expect ValueError if columns are not within the table
+    6) Expect TypeError if chunk_rows is not a positive int
+    :return: None
+    """
+    # Scenario 1
+    with pytest.raises(ValueError):
+        storage.read(game_file, backend="XLS")
+    # Scenario 2
+    with pytest.raises(ValueError):
+        storage.write(game_df, game_file, mode="r")
+    # Scenario 3
+    with pytest.raises(FileNotFoundError):
+        storage.read("missing.csv", backend="NPY")
+    with pytest.raises(FileNotFoundError):
+        storage.read("missing.csv", backend="SQLITE")
+    # Scenario 4
+    with pytest.raises(ValueError):
+        storage.query(game_file, "SELECT * FROM {table}", backend="CSV")
+    # Scenario 5
+    with pytest.raises(ValueError):
+        list(storage.read_chunks(game_file, ["game_id", "missing"]))
+    # Scenario 6
+    with pytest.raises(TypeError):
+        storage.read_chunks(game_file, chunk_rows=0)
+
+
+@pytest.mark.parametrize("backend", ["CSV", "NPY", "SQLITE"])
+def test_return(tmp_path, backend):
+    """
+    1) Expect migrated table to read back equal to the CSV table, including nulls
+    2) Expect only requested columns to be returned
+    3) Expect appended rows to follow existing rows
+    4) Expect table signature to change on write
+    5) Expect only rows holding the given values to be selected in table order, and deleted
+    6) Expect chunks of a table to concatenate to the table
+    :return: None
+    """
+    file = str(tmp_path / "games.csv")
+    shutil.copy(game_file, file)
+    # scenario 1
+    assert storage.migrate(file, backend) == len(game_df)
+    assert storage.exists(file, backend)
+    x = storage.read(file, backend=backend)
+    pd.testing.assert_frame_equal(x, game_df, check_dtype=False)
+    # scenario 2
+    x = storage.read(file, ["game_id", "genre"], backend)
+    assert list(x.columns) == ["game_id", "genre"]
+    # scenario 3
+    before = storage.signature(file, backend)
+    storage.write(game_df.iloc[:2], file, "a", backend)
+    x = storage.read(file, ["game_id"], backend)
+    assert len(x) == len(game_df) + 2
+    assert list(x["game_id"].iloc[-2:]) == list(game_df["game_id"].iloc[:2])
+    # scenario 4
+    assert storage.signature(file, backend) != before
+    # scenario 5
+    x = storage.select(file, "game_id", ["g2", "g3"], ["game_id", "genre"], backend)
+    # g2 was also appended
+    assert list(x["game_id"]) == ["g2", "g3", "g2"] and list(x.columns) == ["game_id", "genre"]
+    storage.delete(file, "game_id", ["g1", "g2"], backend)
+    x = storage.read(file, ["game_id"], backend)
+    assert len(x) == len(game_df) - 2
+    assert not x["game_id"].isin(["g1", "g2"]).any()
+    # scenario 6
+    chunks = list(storage.read_chunks(file, ["game_id", "genre"], backend, chunk_rows=7))
+    assert max(len(chunk) for chunk in chunks) == 7
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True),
+        storage.read(file, ["game_id", "genre"], backend)
+    )
+
+
+def test_shard_return():
+    """
+    1) Expect shards of a table to concatenate to the table, for any number of shards
+    2) Expect no more shards than the table holds rows, or than min_bytes allows
+    3) Expect ValueError if backend does not support shards
+    :return: None
+    """
+    columns = ["game_id", "overall_score"]
+    expected = storage.read(review_file, columns)
+    for count in [1, 2, 7]:
+        shards = storage.shards(review_file, count)
+        # scenario 1
+        chunks = [
+            chunk for shard in shards for chunk in storage.read_shard(review_file, shard, columns, chunk_rows=9)
+        ]
+        assert len(shards) == count
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+    # scenario 2
+    assert len(storage.shards(review_file, 10 * len(expected))) <= len(expected)
+    assert len(storage.shards(review_file, 4, min_bytes=os.path.getsize(review_file))) == 1
+    # scenario 3
+    with pytest.raises(ValueError):
+        storage.shards(review_file, 2, "SQLITE")
+
+
+def test_query(tmp_path):
+    """
+    1) Expect SQL queries to run against the table
+    :return: None
+    """
+    file = str(tmp_path / "games.csv")
+    storage.write(game_df, file, backend="SQLITE")
+    # scenario 1
+    x = storage.query(file, "SELECT COUNT(*) AS n FROM {table} WHERE game_id = ?", ("g2",))
+    assert x["n"][0] == 1
+
+
+def test_replace_file(tmp_path):
+    """
+    1) Expect a file to be replaced whole by what the writer writes
+    2) Expect a failed write to leave the file unchanged, and no temporary file behind
+    3) Expect a new file to take its mode from the umask, and a replaced file to keep its mode
+    :return: None
+    """
+    file = str(tmp_path / "replaced.txt")
+    # scenario 1
+    for text in ["first", "second"]:
+        storage.replace_file(file, lambda path: _write_text(path, text))
+        with open(file) as replaced_file:
+            assert replaced_file.read() == text
+
+    # scenario 2
+    def failed(path):
+        with open(path, "w") as temp_file:
+            temp_file.write("partial")
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        storage.replace_file(file, failed)
+    with open(file) as replaced_file:
+        assert replaced_file.read() == "second"
+    assert os.listdir(str(tmp_path)) == ["replaced.txt"]
+    # scenario 3
+    umask = os.umask(0o022)
+    try:
+        new_file = str(tmp_path / "new.txt")
+        storage.replace_file(new_file, lambda path: _write_text(path, "new"))
+        assert stat.S_IMODE(os.stat(new_file).st_mode) == 0o644
+    finally:
+        os.umask(umask)
+    os.chmod(file, 0o640)
+    storage.replace_file(file, lambda path: _write_text(path, "third"))
+    assert stat.S_IMODE(os.stat(file).st_mode) == 0o640
+
+
+def _write_text(path, text):
+    with open(path, "w") as text_file:
+        text_file.write(text)